@@ -1,4 +1,3 @@
-import time
 import os
 from fastapi.responses import Response
 from fastapi import FastAPI, Depends, Request
@@ -16,11 +15,17 @@ from backend.auth import jwt_auth
 from backend.routers.metrics import router as metrics_router
 from backend.auth.middleware import get_auth, inject_tenant_headers
 from backend.routers.exports import router as exports_router
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CONTENT_TYPE_LATEST
+from idsideai.metrics import PrometheusMiddleware, render_latest
+from idsideai.responses import FastJSONResponse, FastRoute
+from idsideai.routers.exports import router as export_jobs_router
+from idsideai.services.export_jobs import export_jobs
 from security_toolkit.security_utils import wire_security
 from security_toolkit.hardening import wire_security_full
 
-app = FastAPI(openapi_version="3.0.3", title="IDECIDE Graph API (Neo4j)", version="0.1.0")
+app = FastAPI(openapi_version="3.0.3", title="IDECIDE Graph API (Neo4j)", version="0.1.0",
+              default_response_class=FastJSONResponse)
+app.router.route_class = FastRoute
 app = wire_security_full(app)  # security headers + optional rate limiting
 app.add_middleware(TenantContextMiddleware)
 app.add_middleware(
@@ -48,30 +53,29 @@ async def healthz():
     return {"status": "ok"}
 
 
-EXPORT_DIR = os.path.join(os.path.dirname(__file__), "exports")
+# Export jobs (POST /export-jobs, poll, download) run off the request path; finished files
+# are also served statically from EXPORT_DIR until retention cleanup removes them.
+EXPORT_DIR = str(export_jobs.directory)
 os.makedirs(EXPORT_DIR, exist_ok=True)
+app.include_router(export_jobs_router)
 app.mount("/exports", StaticFiles(directory=EXPORT_DIR), name="exports")
 
+@app.on_event("startup")
+def _cleanup_exports():
+    export_jobs.cleanup()
+
+@app.on_event("shutdown")
+def _stop_export_jobs():
+    export_jobs.shutdown()
+
 # 0
 
-REQUEST_COUNT = Counter("http_requests_total","Total HTTP requests",["method","path","status"])
-REQUEST_LATENCY = Histogram("http_request_latency_seconds","Request latency",["path"])
-
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    start = time.time()
-    response = await call_next(request)
-    dur = time.time()-start
-    try:
-        REQUEST_COUNT.labels(request.method, request.url.path, str(response.status_code)).inc()
-        REQUEST_LATENCY.labels(request.url.path).observe(dur)
-    except Exception as e:
-        print(f"Error in metrics middleware: {e}")
-    return response
+# request count/latency/size by route template (see idsideai.metrics)
+app.add_middleware(PrometheusMiddleware)
 
 @app.get("/metrics")
 def metrics():
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/metrics/whoami", summary="Current identity/context")
 async def whoami(request: Request):
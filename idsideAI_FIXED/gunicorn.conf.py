@@ -0,0 +1,19 @@
+# gunicorn -c gunicorn.conf.py idsideai.main:app
+# Multi-worker deployments aggregate Prometheus metrics through PROMETHEUS_MULTIPROC_DIR.
+import os, shutil
+
+bind = os.getenv("BIND", "0.0.0.0:8013")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/idsideai-prometheus")
+
+def on_starting(server):
+    # stale files from a previous run would otherwise be summed into the new counters
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -4,9 +4,43 @@ import os
 load_dotenv()
 class Settings(BaseModel):
     database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./idsideai.db")
+    postgres_uri: str | None = os.getenv("POSTGRES_URI")  # takes precedence over DATABASE_URL
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout_s: float = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+    db_pool_recycle_s: int = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+    sqlite_read_pool: int = int(os.getenv("SQLITE_READ_POOL", "8"))
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_cache_kb: int = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+    sqlite_mmap_bytes: int = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
     openai_api_key: str | None = os.getenv("OPENAI_API_KEY")
+    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
     anthropic_api_key: str | None = os.getenv("ANTHROPIC_API_KEY")
+    anthropic_base_url: str = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+    anthropic_version: str = os.getenv("ANTHROPIC_VERSION", "2023-06-01")
     azure_openai_endpoint: str | None = os.getenv("AZURE_OPENAI_ENDPOINT")
     azure_openai_key: str | None = os.getenv("AZURE_OPENAI_KEY")
+    azure_openai_api_version: str = os.getenv("AZURE_OPENAI_API_VERSION", "2024-06-01")
+    provider_failover_timeout_ms: int = int(os.getenv("PROVIDER_FAILOVER_TIMEOUT_MS", "0"))
     allow_fake_provider: bool = os.getenv("ALLOW_FAKE_PROVIDER", "true").lower() == "true"
+    engine_max_concurrency: int = int(os.getenv("ENGINE_MAX_CONCURRENCY", "8"))
+    response_cache_default: bool = os.getenv("RESPONSE_CACHE_DEFAULT", "false").lower() == "true"
+    response_cache_max_bytes: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    response_cache_ttl_s: float = float(os.getenv("RESPONSE_CACHE_TTL_S", "3600"))
+    response_cache_path: str | None = os.getenv("RESPONSE_CACHE_PATH")
+    provider_coalesce: bool = os.getenv("PROVIDER_COALESCE", "true").lower() == "true"
+    provider_hedge: bool = os.getenv("PROVIDER_HEDGE", "false").lower() == "true"
+    provider_limit_initial: int = int(os.getenv("PROVIDER_LIMIT_INITIAL", "20"))
+    provider_limit_max: int = int(os.getenv("PROVIDER_LIMIT_MAX", "200"))
+    # How long a call over a provider's concurrency limit queues for a slot (also capped by the run deadline).
+    provider_queue_timeout_s: float = float(os.getenv("PROVIDER_QUEUE_TIMEOUT_S", "10"))
+    provider_latency_target_ms: float = float(os.getenv("PROVIDER_LATENCY_TARGET_MS", "0"))
+    breaker_error_rate: float = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+    breaker_min_calls: int = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    breaker_open_s: float = float(os.getenv("BREAKER_OPEN_S", "30"))
+    breaker_slow_ms: float = float(os.getenv("BREAKER_SLOW_MS", "0"))
+    export_dir: str = os.getenv("EXPORT_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", "exports"))
+    export_workers: int = int(os.getenv("EXPORT_WORKERS", "2"))
+    export_retention_s: float = float(os.getenv("EXPORT_RETENTION_S", "86400"))
+    export_dedupe_s: float = float(os.getenv("EXPORT_DEDUPE_S", "300"))
 settings = Settings()
@@ -1,6 +1,70 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from idsideai.config import settings
 class Base(DeclarativeBase): pass
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+
+def async_url(url: str) -> str:
+    """``postgres://`` and ``postgresql://`` URIs use the asyncpg driver."""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+DATABASE_URL = async_url(settings.postgres_uri) if settings.postgres_uri else settings.database_url
+
+def _sqlite_file(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:") \
+        and url.query.get("mode") != "memory"
+
+def sqlite_pragmas(read_only: bool = False) -> Dict[str, str]:
+    pragmas = {"busy_timeout": str(settings.sqlite_busy_timeout_ms), "journal_mode": "WAL", "synchronous": "NORMAL",
+               "cache_size": str(-settings.sqlite_cache_kb), "mmap_size": str(settings.sqlite_mmap_bytes),
+               "temp_store": "MEMORY"}
+    if read_only:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+def make_engine(url: str = DATABASE_URL, read_only: bool = False) -> AsyncEngine:
+    """Async engine tuned for ``url``'s backend.
+
+    SQLite files run in WAL mode, so readers never wait for the writer. Since SQLite takes
+    one writer at a time anyway, the write engine is a single pooled connection: writers
+    queue in the pool instead of contending for the file lock. ``read_only`` engines get a
+    pool of ``sqlite_read_pool`` query-only connections. Postgres goes through asyncpg with
+    a sized, pre-pinged pool; other URLs get SQLAlchemy's defaults.
+    """
+    u = make_url(url)
+    if u.get_backend_name() == "postgresql":
+        return create_async_engine(url, pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow,
+                                   pool_timeout=settings.db_pool_timeout_s, pool_recycle=settings.db_pool_recycle_s,
+                                   pool_pre_ping=True)
+    if not _sqlite_file(u):
+        return create_async_engine(url, echo=False, future=True)
+    # aiosqlite defaults to NullPool (a new connection, and pragma round, per checkout)
+    engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=settings.sqlite_read_pool if read_only else 1,
+                                 max_overflow=0, pool_timeout=settings.db_pool_timeout_s)
+    pragmas = sqlite_pragmas(read_only)
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return engine
+
+# ``engine``/``SessionLocal`` write (and create tables); ``read_engine``/``ReadSessionLocal``
+# serve queries. They are the same engine unless the database is a SQLite file.
+engine = make_engine(DATABASE_URL)
+read_engine = make_engine(DATABASE_URL, read_only=True) if _sqlite_file(make_url(DATABASE_URL)) else engine
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
+async def get_session():
+    async with SessionLocal() as session:
+        yield session
+async def get_read_session():
+    async with ReadSessionLocal() as session:
+        yield session
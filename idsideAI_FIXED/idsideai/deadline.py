@@ -0,0 +1,30 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Absolute time.monotonic() by which the current run/step must finish; None means unbounded.
+_deadline: ContextVar[Optional[float]] = ContextVar("idsideai_deadline", default=None)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none."""
+    d = _deadline.get()
+    return None if d is None else d - time.monotonic()
+
+def clear():
+    """Drop the deadline in the current context (for work shared by callers with their own budgets)."""
+    _deadline.set(None)
+
+@contextmanager
+def scope(seconds: Optional[float]) -> Iterator[None]:
+    """Tighten the deadline for this context; an enclosing, earlier deadline still wins."""
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
@@ -1,23 +1,79 @@
-import httpx, asyncio
+import httpx, asyncio, json, os
+from typing import AsyncIterator
+from idsideai import deadline
 
 _client: httpx.AsyncClient | None = None
 
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "0").lower() in ("1", "true")
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("HTTP_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+
 async def get_client() -> httpx.AsyncClient:
     global _client
     if _client is None:
-        limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
-        _client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=3.0), limits=limits)
+        limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                              keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=3.0), limits=limits,
+                                    http2=HTTP_HTTP2 and _http2_available())
     return _client
 
+def _bounded(kw: dict) -> dict:
+    # Cap the request timeout by the caller's run/step deadline (see idsideai.deadline).
+    left = deadline.remaining()
+    if left is not None and "timeout" not in kw:
+        return {**kw, "timeout": max(left, 0.001)}
+    return kw
+
+async def _backoff(attempt: int):
+    delay = 0.25 * (2 ** attempt)
+    left = deadline.remaining()
+    if left is not None and left <= delay:
+        raise httpx.TimeoutException("deadline exceeded before retry")
+    await asyncio.sleep(delay)
+
 async def aget(url, **kw):
     cl = await get_client()
     for attempt in range(3):
         try:
-            return await cl.get(url, **kw)
+            return await cl.get(url, **_bounded(kw))
         except httpx.RequestError:
             if attempt == 2:
                 raise
-            await asyncio.sleep(0.25 * (2 ** attempt))
+            await _backoff(attempt)
+
+async def apost(url, **kw):
+    # POSTs are not idempotent: only retry when the connection was never established.
+    cl = await get_client()
+    for attempt in range(3):
+        try:
+            return await cl.post(url, **_bounded(kw))
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if attempt == 2:
+                raise
+            await _backoff(attempt)
+
+async def apost_sse(url, **kw) -> AsyncIterator[dict]:
+    """POST and yield the JSON payload of each server-sent ``data:`` line until ``[DONE]``."""
+    cl = await get_client()
+    async with cl.stream("POST", url, **_bounded(kw)) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            if data:
+                yield json.loads(data)
 
 async def shutdown():
     global _client
@@ -1,11 +1,20 @@
 from fastapi.responses import Response
 from fastapi.responses import JSONResponse
-from fastapi import Request
 import time
 import os
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from idsideai.routers import decision_models, telemetry
+from idsideai.routers import decision_models, exports, telemetry
+from idsideai import http as http_client
+from idsideai.metrics import PrometheusMiddleware, render_latest
+from idsideai.responses import FastJSONResponse, FastRoute
+from idsideai import tracing
+from idsideai.tracing import TracingMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST
+from idsideai.database import engine
+from idsideai.migrations import upgrade_schema
+from idsideai.services.audit_log import writer as execution_log
+from idsideai.services.export_jobs import export_jobs
 from security_toolkit.security_utils import wire_security
 from security_toolkit.hardening import wire_security_full
 from dotenv import load_dotenv
@@ -18,8 +27,10 @@ app = FastAPI(
     ],
     docs_url='/docs',
     openapi_version='3.0.3',
-    title='idsideAI - Decision Layer'
+    title='idsideAI - Decision Layer',
+    default_response_class=FastJSONResponse,  # orjson; MessagePack when Accept asks for it
 )
+app.router.route_class = FastRoute
 
 from backend.router_autoinclude import autoload_routers
 autoload_routers(app, "backend.routers")
@@ -28,11 +39,18 @@ autoload_routers(app, "backend.routers")
 app = wire_security_full(app)
 
 # Dev-only healthz bypass so perf skims don't hit rate limits
-@app.middleware("http")
-async def _dev_bypass_healthz(request: Request, call_next):
-    if os.getenv("APP_ENV", "dev") == "dev" and request.url.path == "/healthz":
-        return JSONResponse({"status": "ok"})
-    return await call_next(request)
+class _DevHealthzBypass:
+    def __init__(self, app):
+        self.app = app
+        self.enabled = os.getenv("APP_ENV", "dev") == "dev"
+    async def __call__(self, scope, receive, send):
+        if self.enabled and scope["type"] == "http" and scope["path"] == "/healthz":
+            return await JSONResponse({"status": "ok"})(scope, receive, send)
+        await self.app(scope, receive, send)
+
+app.add_middleware(_DevHealthzBypass)
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(TracingMiddleware)
 
 # Simple /status endpoint with uptime
 START_TS = time.time()
@@ -40,6 +58,11 @@ START_TS = time.time()
 async def status():
     return {"status": "ok", "uptime_s": int(time.time() - START_TS)}
 
+# Prometheus scrape: all workers' metrics when PROMETHEUS_MULTIPROC_DIR is set
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Quiet auto-requested icons/favicons
 @app.get("/apple-touch-icon.png")
 @app.get("/apple-touch-icon-precomposed.png")
@@ -53,9 +76,30 @@ async def _icons():
 async def healthz():
     return {"status": "ok"}
 
+@app.on_event("startup")
+async def _start_execution_log():
+    tracing.init_from_env()
+    export_jobs.cleanup()
+    try:
+        async with engine.begin() as conn:
+            applied = await conn.run_sync(upgrade_schema)
+        if applied:
+            print(f"Schema upgraded: {', '.join(applied)}")
+    except Exception as e:
+        print(f"Schema upgrade skipped: {e}")
+    await execution_log.start()
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    await execution_log.stop()
+    await http_client.shutdown()
+    tracing.shutdown()
+    export_jobs.shutdown()
+
 # --- auto-wired routers ---
 app.include_router(telemetry.router)
 app.include_router(decision_models.router)
+app.include_router(exports.router)
 
 # --- CORS for local Vite dev server ---
 from fastapi.middleware.cors import CORSMiddleware
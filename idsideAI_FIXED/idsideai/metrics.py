@@ -0,0 +1,153 @@
+import os, re, time
+from typing import Dict, List, Optional, Tuple
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Set in the environment of every worker (and cleared by the process manager at start) to
+# aggregate metrics across processes; prometheus_client then keeps values in mmap'd files.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+def route_template(scope: Scope) -> str:
+    """Path label for a finished request: the matched route's template, never the raw path."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:  # mounted app (e.g. StaticFiles): label by mount point
+        return scope.get("root_path") or "/"
+    return "<unmatched>"
+
+class HttpMetrics:
+    """HTTP request metrics with label children cached per (method, route, status)."""
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        self.requests = Counter("http_requests_total", "Total HTTP requests", ["method", "path", "status"], registry=registry)
+        self.latency = Histogram("http_request_latency_seconds", "Request latency", ["path"], registry=registry)
+        self.inflight = Gauge("http_requests_in_flight", "Requests currently being served", ["method"],
+                              multiprocess_mode="livesum", registry=registry)
+        self.response_size = Histogram("http_response_size_bytes", "Response body size", ["path"],
+                                       buckets=SIZE_BUCKETS, registry=registry)
+        self._children: Dict[Tuple[str, str, int], tuple] = {}
+        self._inflight: Dict[str, Gauge] = {}
+    def inflight_for(self, method: str):
+        child = self._inflight.get(method)
+        if child is None:
+            child = self._inflight[method] = self.inflight.labels(method)
+        return child
+    def observe(self, method: str, path: str, status: int, seconds: float, size: int):
+        key = (method, path, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (self.requests.labels(method, path, str(status)),
+                                              self.latency.labels(path), self.response_size.labels(path))
+        children[0].inc()
+        children[1].observe(seconds)
+        children[2].observe(size)
+
+class EngineMetrics:
+    """Decision engine metrics: run and step latency, provider calls and state, response cache lookups."""
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        self.runs = Histogram("idsideai_run_seconds", "Decision model run latency", ["outcome"],
+                              buckets=self.LATENCY_BUCKETS, registry=registry)
+        self.steps = Histogram("idsideai_step_seconds", "Step latency", ["type", "outcome"],
+                               buckets=self.LATENCY_BUCKETS, registry=registry)
+        self.providers = Histogram("idsideai_provider_seconds", "Provider call latency", ["provider", "outcome"],
+                                   buckets=self.LATENCY_BUCKETS, registry=registry)
+        self.cache = Counter("idsideai_response_cache_lookups_total", "Response cache lookups", ["result"], registry=registry)
+        # Limits and in-flight calls are per worker, so workers add up; a breaker counts as open if any worker's is.
+        self.provider_limit = Gauge("idsideai_provider_concurrency_limit", "Adaptive concurrency limit", ["provider"],
+                                    multiprocess_mode="livesum", registry=registry)
+        self.provider_inflight = Gauge("idsideai_provider_in_flight", "Provider calls in flight", ["provider"],
+                                       multiprocess_mode="livesum", registry=registry)
+        self.provider_breaker = Gauge("idsideai_provider_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+                                      ["provider"], multiprocess_mode="livemax", registry=registry)
+        self._children: Dict[tuple, object] = {}
+    def _child(self, metric, *labels):
+        key = (metric, *labels)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = metric.labels(*labels)
+        return child
+    def observe_run(self, outcome: str, seconds: float):
+        self._child(self.runs, outcome).observe(seconds)
+    def observe_step(self, step_type: str, outcome: str, seconds: float):
+        self._child(self.steps, step_type, outcome).observe(seconds)
+    def observe_provider(self, provider: str, ok: bool, seconds: float):
+        self._child(self.providers, provider, "ok" if ok else "error").observe(seconds)
+    def provider_state(self, provider: str, limit: int, inflight: int, breaker_state: str):
+        self._child(self.provider_limit, provider).set(limit)
+        self._child(self.provider_inflight, provider).set(inflight)
+        self._child(self.provider_breaker, provider).set(self.BREAKER_STATES[breaker_state])
+    def cache_lookup(self, result: str):
+        """``result`` is "hit", "disk_hit" or "miss"; hit rate is hits / all lookups."""
+        self._child(self.cache, result).inc()
+
+http_metrics = HttpMetrics()
+engine_metrics = EngineMetrics()
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def cleanup_dead_workers(path: Optional[str] = None) -> List[int]:
+    """Mark workers whose pid no longer exists as dead, dropping their live gauge files.
+
+    Counter and histogram files of dead workers are kept so totals never go backwards.
+    Gunicorn deployments also call ``mark_process_dead`` from ``child_exit``.
+    """
+    path = path or MULTIPROC_DIR
+    if not path or not os.path.isdir(path):
+        return []
+    pids = {int(m.group(1)) for m in (re.search(r"_(\d+)\.db$", f) for f in os.listdir(path)) if m}
+    dead = sorted(pid for pid in pids if pid != os.getpid() and not _pid_alive(pid))
+    for pid in dead:
+        multiprocess.mark_process_dead(pid, path)
+    return dead
+
+def render_latest(path: Optional[str] = None) -> bytes:
+    """Exposition text for /metrics: aggregated over all workers in multiprocess mode."""
+    path = path or MULTIPROC_DIR
+    if not path:
+        return generate_latest(REGISTRY)
+    cleanup_dead_workers(path)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return generate_latest(registry)
+
+class PrometheusMiddleware:
+    """ASGI middleware recording request count, latency, size and in-flight requests.
+
+    Labels use the route template (``/decision-models/{model_id}``), so cardinality is
+    bounded by the number of routes rather than by the ids clients send.
+    """
+    def __init__(self, app: ASGIApp, metrics: HttpMetrics = http_metrics):
+        self.app = app
+        self.metrics = metrics
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"] if scope["method"] in _METHODS else "OTHER"
+        status, size = 500, 0
+        async def send_observed(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+        inflight = self.metrics.inflight_for(method)
+        inflight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            inflight.dec()
+            self.metrics.observe(method, route_template(scope), status, time.perf_counter() - start, size)
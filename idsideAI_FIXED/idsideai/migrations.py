@@ -0,0 +1,41 @@
+"""In-place schema upgrades for databases created by an older ``Base.metadata.create_all``.
+
+``create_all`` only creates missing tables, so column changes to existing tables are
+applied here. Every upgrade checks the live schema first and is a no-op once applied.
+"""
+from typing import List
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from idsideai.models import ExecutionLog
+
+def _execution_log_model_fk(conn: Connection, ops: Operations) -> bool:
+    """``execution_logs.decision_model_id`` is nullable (ad-hoc runs) and set to NULL when its model is deleted."""
+    insp = inspect(conn)
+    column = next(c for c in insp.get_columns("execution_logs") if c["name"] == "decision_model_id")
+    fk = next((f for f in insp.get_foreign_keys("execution_logs") if f["referred_table"] == "decision_models"), None)
+    if column["nullable"] and fk is not None and (fk.get("options") or {}).get("ondelete", "").upper() == "SET NULL":
+        return False
+    if conn.dialect.name == "sqlite":
+        # SQLite cannot alter constraints: rebuild the table from the current model definition.
+        with ops.batch_alter_table("execution_logs", copy_from=ExecutionLog.__table__, recreate="always"):
+            pass
+        return True
+    ops.alter_column("execution_logs", "decision_model_id", nullable=True, existing_type=column["type"])
+    if fk is not None and fk.get("name"):
+        ops.drop_constraint(fk["name"], "execution_logs", type_="foreignkey")
+    ops.create_foreign_key("execution_logs_decision_model_id_fkey", "execution_logs", "decision_models",
+                           ["decision_model_id"], ["id"], ondelete="SET NULL")
+    return True
+
+UPGRADES = [("execution_logs", _execution_log_model_fk)]
+
+def upgrade_schema(conn: Connection) -> List[str]:
+    """Apply pending upgrades on a sync connection (``await conn.run_sync(upgrade_schema)``); returns what ran."""
+    ops = Operations(MigrationContext.configure(conn))
+    applied = []
+    for table, upgrade in UPGRADES:
+        if inspect(conn).has_table(table) and upgrade(conn, ops):
+            applied.append(upgrade.__name__.lstrip("_"))
+    return applied
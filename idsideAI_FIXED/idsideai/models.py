@@ -23,7 +23,7 @@ class DecisionModel(Base):
 class ExecutionLog(Base):
     __tablename__ = "execution_logs"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    decision_model_id: Mapped[int] = mapped_column(ForeignKey("decision_models.id"))
+    decision_model_id: Mapped[int | None] = mapped_column(ForeignKey("decision_models.id", ondelete="SET NULL"), nullable=True)
     input_payload: Mapped[dict] = mapped_column(JSON)
     output_payload: Mapped[dict] = mapped_column(JSON)
     telemetry: Mapped[dict] = mapped_column(JSON)
@@ -0,0 +1,97 @@
+"""Fast JSON responses: orjson encoding, optional MessagePack, and no re-encoding of plain dicts.
+
+``FastJSONResponse`` renders with orjson and, when the client's ``Accept`` prefers
+``application/msgpack`` (and msgpack is installed), sends MessagePack instead.
+
+FastAPI runs every return value through ``jsonable_encoder`` before the response class
+sees it, which for large nested dicts (run results, telemetry) costs more than encoding
+them. Routes built with ``FastRoute`` whose response class is ``FastJSONResponse`` and
+that have no ``response_model`` hand a returned ``dict``/``list`` straight to the response
+instead; anything orjson does not know natively (pydantic models, Decimal, sets, ...) still
+goes through ``jsonable_encoder``, one value at a time.
+"""
+from typing import Any, Callable
+import orjson
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.dependencies.utils import is_coroutine_callable
+from starlette.routing import request_response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is only offered when installed
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _default(value: Any):
+    return jsonable_encoder(value)
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+def _quality(accept: str, media_types) -> float:
+    best = 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        if media_type.strip().lower() in media_types:
+            q = 1.0
+            for p in params.split(";"):
+                k, _, v = p.strip().partition("=")
+                if k == "q":
+                    try:
+                        q = float(v)
+                    except ValueError:
+                        q = 0.0
+            best = max(best, q)
+    return best
+
+def wants_msgpack(accept: str) -> bool:
+    """True when ``accept`` ranks a MessagePack type above zero and at least as high as JSON."""
+    if msgpack is None or "msgpack" not in accept:
+        return False
+    q = _quality(accept, MSGPACK_TYPES)
+    return q > 0 and q >= _quality(accept, ("application/json", "*/*", "application/*"))
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+    def __init__(self, content: Any = None, *args, **kwargs):
+        self.content = content
+        super().__init__(content, *args, **kwargs)
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if msgpack is not None:
+            accept = next((v.decode("latin-1") for k, v in scope.get("headers", ()) if k == b"accept"), "")
+            if wants_msgpack(accept):
+                self.body = msgpack.packb(self.content, default=_default)
+                self.raw_headers = [(k, v) for k, v in self.raw_headers if k not in (b"content-type", b"content-length")]
+                self.raw_headers += [(b"content-type", b"application/msgpack"), (b"content-length", str(len(self.body)).encode())]
+            self.raw_headers.append((b"vary", b"Accept"))
+        await super().__call__(scope, receive, send)
+
+def _response_class(route: APIRoute):
+    cls = route.response_class
+    return cls.value if isinstance(cls, DefaultPlaceholder) else cls
+
+class FastRoute(APIRoute):
+    """APIRoute that returns plain ``dict``/``list`` results as ``FastJSONResponse`` directly."""
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        cls = _response_class(self)
+        if self.response_model is not None or self.dependant.response_param_name or not issubclass(cls, FastJSONResponse):
+            return  # validation, headers set on an injected Response or another class: keep FastAPI's path
+        call, status_code = self.dependant.call, self.status_code or 200
+        is_async = is_coroutine_callable(call)
+        async def fast_call(**values):
+            result = await call(**values) if is_async else await run_in_threadpool(call, **values)
+            if type(result) in (dict, list):
+                return cls(result, status_code=status_code)
+            return result
+        self.dependant.call = fast_call
+        self.app = request_response(self.get_route_handler())
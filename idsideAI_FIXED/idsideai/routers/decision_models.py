@@ -1,14 +1,125 @@
-from fastapi import APIRouter, HTTPException, Body
-from pydantic import BaseModel
-from idsideai.services.dsl import parse_sdl, DecisionModelSpec
-from idsideai.services.engine import run_model
-router = APIRouter(prefix="/decision-models", tags=["decision-models"])
+import asyncio, json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Body, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from idsideai.database import get_read_session, get_session
+from idsideai.models import DecisionModel
+from idsideai.responses import FastRoute
+from idsideai.services.dsl import DecisionModelSpec, parse_sdl
+from idsideai.services.plan_cache import CompiledPlan, compile_spec, plan_cache, stored_plans
+from idsideai.services.engine import run_plan, iter_batch, StepTimeout
+from idsideai.services.providers.registry import ProviderUnavailable
+from idsideai.services.audit_log import writer as execution_log
+router = APIRouter(prefix="/decision-models", tags=["decision-models"], route_class=FastRoute)
 class RunRequest(BaseModel):
     sdl_text: str
     inputs: dict = {}
+class RunByIdRequest(BaseModel):
+    inputs: dict = {}
+class BatchRunRequest(BaseModel):
+    sdl_text: Optional[str] = None
+    model_id: Optional[int] = None
+    inputs: List[dict] = Field(..., max_length=10000)
+    concurrency: int = Field(8, ge=1, le=64)
+    model_config = {"protected_namespaces": ()}  # allow the model_id field
+class DecisionModelIn(BaseModel):
+    name: str
+    description: str = ""
+    sdl_text: Optional[str] = None
+    sdl: Optional[dict] = None
+class DecisionModelOut(BaseModel):
+    id: int
+    name: str
+    description: str
+    sdl: dict
+    version: int
+    created_at: datetime
+    model_config = {"from_attributes": True}
+
+def _run_error(e: Exception) -> HTTPException:
+    if isinstance(e, KeyError):
+        return HTTPException(status_code=422, detail=f"Missing input: {e.args[0]}")
+    if isinstance(e, StepTimeout):
+        return HTTPException(status_code=504, detail=f"Step timed out: {e.step_id}")
+    if isinstance(e, ProviderUnavailable):
+        return HTTPException(status_code=503, detail=f"Provider unavailable: {e}")
+    return HTTPException(status_code=500, detail="Execution error")
+
+_STREAM_TYPES = ("application/x-ndjson", "text/event-stream")
+
+def _stream_run(plan: CompiledPlan, inputs: dict, media_type: str, model_id: Optional[int] = None) -> StreamingResponse:
+    sse = media_type == "text/event-stream"
+    def _frame(event: dict) -> str:
+        data = json.dumps(event, default=str)
+        return f"event: {event['event']}\ndata: {data}\n\n" if sse else data + "\n"
+    async def _events():
+        # Bounded so a slow client applies backpressure to the run instead of buffering it all.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+        trace: list = []  # rebuilt from step events: emit mode does not accumulate one
+        async def _emit(event: dict):
+            if event["event"] == "step":
+                trace.append({"id": event["id"], "type": event["type"], "result": event["result"]})
+            await queue.put(event)
+        async def _run():
+            try:
+                out = await run_plan(plan, inputs, emit=_emit)
+                await _audit(model_id, inputs, {**out, "trace": trace})
+                await queue.put({"event": "done", "telemetry": out["telemetry"], "timings": out["timings"]})
+            except Exception as e:
+                err = _run_error(e)
+                await queue.put({"event": "error", "status": err.status_code, "error": err.detail})
+            await queue.put(None)
+        task = asyncio.ensure_future(_run())
+        try:
+            while (event := await queue.get()) is not None:
+                yield _frame(event)
+        finally:
+            task.cancel()
+    return StreamingResponse(_events(), media_type=media_type)
+
+async def _audit(model_id: Optional[int], inputs: dict, result: dict):
+    await execution_log.submit(model_id, inputs, {"trace": result["trace"]},
+                               {"events": result["telemetry"], "timings": result["timings"]})
+
+async def _execute(plan: CompiledPlan, inputs: dict, request: Optional[Request] = None, model_id: Optional[int] = None):
+    accept = request.headers.get("accept", "") if request is not None else ""
+    for media_type in _STREAM_TYPES:
+        if media_type in accept:
+            return _stream_run(plan, inputs, media_type, model_id)
+    try:
+        result = await run_plan(plan, inputs)
+    except Exception as e:
+        raise _run_error(e)
+    await _audit(model_id, inputs, result)
+    return result
+
+def _validated_sdl(body: DecisionModelIn) -> dict:
+    try:
+        if body.sdl_text is not None:
+            spec = parse_sdl(body.sdl_text)
+        elif body.sdl is not None:
+            spec = DecisionModelSpec(**body.sdl)
+        else:
+            raise ValueError("one of sdl_text or sdl is required")
+        compile_spec(spec)
+    except Exception as e:
+        raise HTTPException(400, f"SDL parse error: {e}")
+    return spec.model_dump(exclude_none=True)
+
+async def _get_row(session: AsyncSession, model_id: int) -> DecisionModel:
+    row = await session.get(DecisionModel, model_id)
+    if row is None:
+        raise HTTPException(404, "Decision model not found")
+    return row
 
 @router.post("/run")
 async def run_decision_model(
+        request: Request,
         req: RunRequest = Body(
             ...,
             example={
@@ -24,13 +135,109 @@ async def run_decision_model(
 ):
 
     try:
-        spec: DecisionModelSpec = parse_sdl(req.sdl_text)
+        plan: CompiledPlan = plan_cache.get(req.sdl_text)
     except Exception as e:
         raise HTTPException(400, f"SDL parse error: {e}")
+    # Accept: application/x-ndjson or text/event-stream streams step results and provider tokens.
+    return await _execute(plan, req.inputs, request)
+
+@router.get("/plan-cache")
+async def plan_cache_stats():
+    return {"sdl": plan_cache.stats(), "stored": stored_plans.stats()}
+
+@router.post("", response_model=DecisionModelOut, status_code=201)
+async def create_decision_model(body: DecisionModelIn, session: AsyncSession = Depends(get_session)):
+    row = DecisionModel(name=body.name, description=body.description, sdl=_validated_sdl(body), version=1)
+    session.add(row)
+    await session.commit()
+    return row
+
+@router.get("", response_model=List[DecisionModelOut])
+async def list_decision_models(limit: int = 100, offset: int = 0, session: AsyncSession = Depends(get_read_session)):
+    rows = await session.scalars(select(DecisionModel).order_by(DecisionModel.id).limit(limit).offset(offset))
+    return rows.all()
+
+@router.get("/{model_id}", response_model=DecisionModelOut)
+async def get_decision_model(model_id: int, session: AsyncSession = Depends(get_read_session)):
+    return await _get_row(session, model_id)
+
+@router.put("/{model_id}", response_model=DecisionModelOut)
+async def update_decision_model(model_id: int, body: DecisionModelIn, session: AsyncSession = Depends(get_session)):
+    row = await _get_row(session, model_id)
+    row.name, row.description = body.name, body.description
+    if body.sdl_text is not None or body.sdl is not None:
+        row.sdl = _validated_sdl(body)
+        row.version += 1
+    await session.commit()
+    stored_plans.invalidate(model_id)
+    return row
+
+@router.delete("/{model_id}", status_code=204)
+async def delete_decision_model(model_id: int, session: AsyncSession = Depends(get_session)):
+    await session.delete(await _get_row(session, model_id))
     try:
-        result = await run_model(spec, req.inputs)
-    except KeyError as e:
-        raise HTTPException(status_code=422, detail=f"Missing input: {e.args[0]}")
-    except Exception:
-        raise HTTPException(status_code=500, detail="Execution error")
-    return result
+        await session.commit()
+    except IntegrityError:  # execution_logs FK without ON DELETE SET NULL (schema not upgraded yet)
+        await session.rollback()
+        raise HTTPException(409, "Decision model has execution logs; run the schema upgrade to allow deleting it")
+    stored_plans.invalidate(model_id)
+    return Response(status_code=204)
+
+async def _stored_plan(session: AsyncSession, model_id: int) -> CompiledPlan:
+    # Only the version column is read per request; the SDL is loaded and compiled on a cache miss.
+    version = await session.scalar(select(DecisionModel.version).where(DecisionModel.id == model_id))
+    if version is None:
+        raise HTTPException(404, "Decision model not found")
+    plan = stored_plans.get(model_id, version)
+    if plan is None:
+        row = await _get_row(session, model_id)
+        try:
+            plan = compile_spec(DecisionModelSpec(**row.sdl))
+        except Exception as e:
+            raise HTTPException(400, f"SDL parse error: {e}")
+        stored_plans.put(model_id, row.version, plan)
+    return plan
+
+@router.post("/{model_id}/run")
+async def run_stored_decision_model(model_id: int, request: Request, req: RunByIdRequest = Body(...),
+                                    session: AsyncSession = Depends(get_read_session)):
+    plan = await _stored_plan(session, model_id)
+    await session.close()  # hand the connection back before the provider round trips
+    return await _execute(plan, req.inputs, request, model_id)
+
+@router.post("/run-batch")
+async def run_decision_model_batch(req: BatchRunRequest, request: Request, session: AsyncSession = Depends(get_read_session)):
+    """Run one model over many input sets.
+
+    Returns ``{"results": [...]}`` in input order, or NDJSON lines in completion order
+    when the client sends ``Accept: application/x-ndjson``. Each item carries its
+    ``index`` and either ``result`` or ``status``/``error``.
+    """
+    if (req.sdl_text is None) == (req.model_id is None):
+        raise HTTPException(400, "Provide exactly one of sdl_text or model_id")
+    if req.model_id is not None:
+        plan = await _stored_plan(session, req.model_id)
+        await session.close()  # not held for the whole batch
+    else:
+        try:
+            plan = plan_cache.get(req.sdl_text)
+        except Exception as e:
+            raise HTTPException(400, f"SDL parse error: {e}")
+
+    async def _item(index: int, result: Optional[dict], error: Optional[Exception]) -> dict:
+        if error is None:
+            await _audit(req.model_id, req.inputs[index], result)
+            return {"index": index, "ok": True, "result": result}
+        http_error = _run_error(error)
+        return {"index": index, "ok": False, "status": http_error.status_code, "error": http_error.detail}
+
+    batch = iter_batch(plan, req.inputs, req.concurrency)
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        async def _lines():
+            async for index, result, error in batch:
+                yield json.dumps(await _item(index, result, error), default=str) + "\n"
+        return StreamingResponse(_lines(), media_type="application/x-ndjson")
+    results: List[Optional[dict]] = [None] * len(req.inputs)
+    async for index, result, error in batch:
+        results[index] = await _item(index, result, error)
+    return {"results": results}
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from idsideai.responses import FastRoute
+from idsideai.services.export_jobs import ExportQueueFull, export_jobs
+router = APIRouter(prefix="/export-jobs", tags=["exports"], route_class=FastRoute)
+class ExportJobRequest(BaseModel):
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson"
+    compress: bool = True
+    decision_model_id: Optional[int] = None
+    since: Optional[datetime] = None
+
+def _out(job) -> dict:
+    d = job.to_dict()
+    d["download_url"] = f"{router.prefix}/{job.id}/download" if job.status == "done" else None
+    return d
+
+def _job(job_id: str):
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Export job not found")
+    return job
+
+@router.post("", status_code=202)
+async def submit_export(req: ExportJobRequest):
+    """Queue an execution-log export; an identical recent request returns the existing job."""
+    try:
+        return _out(export_jobs.submit(req.format, req.compress, req.decision_model_id, req.since))
+    except ExportQueueFull as e:
+        raise HTTPException(503, str(e))
+@router.get("")
+async def export_stats():
+    return export_jobs.stats()
+@router.get("/{job_id}")
+async def get_export(job_id: str):
+    return _out(_job(job_id))
+@router.get("/{job_id}/download")
+async def download_export(job_id: str):
+    job = _job(job_id)
+    if job.status != "done":
+        raise HTTPException(409, f"Export job is {job.status}")
+    path = export_jobs.path(job)
+    if not path.exists():
+        raise HTTPException(410, "Export file has expired")
+    return FileResponse(path, filename=job.filename)
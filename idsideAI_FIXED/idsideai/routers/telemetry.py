@@ -1,6 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from idsideai.responses import FastRoute
 from idsideai.services.telemetry import Telemetry
-router = APIRouter(prefix="/telemetry", tags=["telemetry"])
+from idsideai.services.providers.registry import registry
+from idsideai.services.engine import inflight
+from idsideai.services.audit_log import writer as execution_log
+from idsideai.services.response_cache import response_cache
+router = APIRouter(prefix="/telemetry", tags=["telemetry"], route_class=FastRoute)
 @router.get("")
-async def get_telemetry():
-    return {"events": Telemetry.dump()}
+async def get_telemetry(limit: int = Query(100, ge=0, le=1000)):
+    return {"events": Telemetry.recent(limit), "aggregates": Telemetry.aggregates()}
+@router.get("/providers")
+async def get_provider_stats():
+    return {"providers": registry.stats(), "hedges": registry.hedges, "fallbacks": registry.fallbacks, "coalescing": inflight.stats()}
+@router.get("/execution-log")
+async def get_execution_log_stats():
+    return execution_log.stats()
+@router.get("/response-cache")
+async def get_response_cache_stats():
+    return response_cache.stats()
@@ -0,0 +1,115 @@
+import asyncio, os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from idsideai.database import SessionLocal
+from idsideai.models import ExecutionLog
+
+_STOP = object()
+
+class ExecutionLogWriter:
+    """Write-behind queue that persists ExecutionLog rows in bulk INSERTs.
+
+    ``submit`` only enqueues; a background task flushes once ``batch_size`` records are
+    waiting or ``flush_interval`` seconds after the first one arrived. When the queue is
+    full, ``submit`` waits up to ``put_timeout`` seconds and then drops the record.
+    Nothing is written until ``start`` has been called (normally at app startup);
+    ``stop`` drains the queue.
+    """
+    def __init__(self, session_factory=SessionLocal, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.5, put_timeout: float = 0.05):
+        self.session_factory = session_factory
+        self.max_queue, self.batch_size = max_queue, batch_size
+        self.flush_interval, self.put_timeout = flush_interval, put_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = self.dropped = self.failed = self.flushes = 0
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    async def start(self):
+        if not self.running:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+    async def stop(self):
+        if self.running:
+            await self._queue.put(_STOP)
+            await self._task
+        self._queue = self._task = None
+    async def submit(self, decision_model_id: Optional[int], inputs: dict, output: dict, telemetry: dict) -> bool:
+        if not self.running:
+            return False
+        record = {"decision_model_id": decision_model_id, "input_payload": inputs, "output_payload": output,
+                  "telemetry": telemetry, "created_at": datetime.utcnow()}
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            pass
+        try:
+            await asyncio.wait_for(self._queue.put(record), self.put_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            return False
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+            batch: List[Dict[str, Any]] = [item]
+            deadline = loop.time() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                return
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        async with self.session_factory() as session:
+            await session.execute(insert(ExecutionLog), rows)
+            await session.commit()
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            await self._insert(batch)
+            self.written += len(batch); self.flushes += 1
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                print(f"ExecutionLog flush failed (1 row): {e}")
+                return
+            print(f"ExecutionLog batch of {len(batch)} rows failed, retrying row by row: {e}")
+        # One bad row (say, a model deleted since the run) must not take the rest of the batch with it.
+        self.flushes += 1
+        for row in batch:
+            try:
+                await self._insert([row])
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"ExecutionLog row dropped (decision_model_id={row['decision_model_id']}): {e}")
+    def stats(self) -> dict:
+        return {"running": self.running, "queued": self._queue.qsize() if self._queue is not None else 0,
+                "written": self.written, "dropped": self.dropped, "failed": self.failed, "flushes": self.flushes}
+
+writer = ExecutionLogWriter(
+    max_queue=int(os.getenv("EXECUTION_LOG_QUEUE", "10000")),
+    batch_size=int(os.getenv("EXECUTION_LOG_BATCH", "500")),
+    flush_interval=float(os.getenv("EXECUTION_LOG_FLUSH_S", "0.5")),
+)
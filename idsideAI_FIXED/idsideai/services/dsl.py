@@ -1,5 +1,6 @@
 import yaml
-from pydantic import BaseModel, Field
+from idsideai import tracing
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import List, Literal, Optional, Dict, Any
 class Step(BaseModel):
     id: str
@@ -8,13 +9,21 @@ class Step(BaseModel):
     prompt: Optional[str] = None
     inputs: Dict[str, Any] = Field(default_factory=dict)
     next: Optional[str] = None
+    depends_on: List[str] = Field(default_factory=list)
+    cache: Optional[bool] = None  # None follows RESPONSE_CACHE_DEFAULT
+    timeout_ms: Optional[int] = Field(default=None, ge=1)
+    hedge: Optional[bool] = None  # None follows PROVIDER_HEDGE
+    _template: Any = PrivateAttr(default=None)  # PromptTemplate, set by compile_spec
 class DecisionModelSpec(BaseModel):
     name: str
     description: str = ""
     steps: List[Step]
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+    deadline_ms: Optional[int] = Field(default=None, ge=1)
 def parse_sdl(text: str) -> DecisionModelSpec:
     try:
-        data = yaml.safe_load(text)
-        return DecisionModelSpec(**data)
+        with tracing.span("sdl.parse", {"sdl.bytes": len(text)}):
+            data = yaml.safe_load(text)
+            return DecisionModelSpec(**data)
     except Exception as e:
         raise ValueError(f"SDL parse error: {e}")
@@ -1,18 +1,82 @@
+import asyncio, contextvars, time
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from idsideai import deadline, tracing
+from idsideai.metrics import engine_metrics
 from idsideai.services.dsl import DecisionModelSpec, Step
-from idsideai.services.providers import openai_provider
+from idsideai.services.providers.registry import registry as providers
 from idsideai.config import settings
 from idsideai.services.telemetry import Telemetry
+from idsideai.services.plan_cache import CompiledPlan, compile_spec
+from idsideai.services.templates import compile_template
+from idsideai.services.response_cache import response_cache
+from idsideai.services.singleflight import SingleFlight
+class StepTimeout(TimeoutError):
+    def __init__(self, step_id: str):
+        super().__init__(f"step '{step_id}' timed out")
+        self.step_id = step_id
+Emit = Callable[[dict], Awaitable[None]]
+inflight = SingleFlight()
+# Set by run_plan(emit=...) so prompt steps stream provider tokens to the caller.
+_emit: ContextVar[Optional[Emit]] = ContextVar("idsideai_emit", default=None)
+def _clear_caller_state():
+    deadline.clear(); _emit.set(None)
+def _detached_context() -> contextvars.Context:
+    """Context for a coalesced upstream call: no caller's deadline or emit callback.
+
+    Each waiter bounds its own wait (``_run_step``'s ``wait_for``); the shared call is
+    cancelled only once every waiter has given up.
+    """
+    ctx = contextvars.copy_context()
+    ctx.run(_clear_caller_state)
+    return ctx
+def _cacheable(result: dict) -> bool:
+    meta = result.get("provider_meta") or {}
+    return not meta.get("fallback") and not meta.get("error")
+async def _prompt_step(step: Step, context: dict) -> dict:
+    template = step._template or compile_template(step.prompt)
+    prompt = template.render(context)
+    model = step.model or "gpt-4o-mini"
+    emit = _emit.get()
+    key = None
+    if step.cache if step.cache is not None else settings.response_cache_default:
+        provider, sep, model_name = model.partition(":")
+        explicit = sep and providers.get(provider) is not None  # "ft:gpt-4o-mini:..." is a model name
+        key = response_cache.key(provider if explicit else "auto", model_name if explicit else model, prompt)
+        cached = await response_cache.get(key)
+        if cached is not None:
+            Telemetry.log("cache", {"hit": 1})
+            if emit is not None:
+                await emit({"event": "token", "id": step.id, "delta": cached.get("text", "")})
+            return cached
+    if emit is not None:
+        async def _on_delta(delta: str):
+            await emit({"event": "token", "id": step.id, "delta": delta})
+        result = await providers.stream_complete(prompt, model, _on_delta)
+        if key is not None and _cacheable(result):
+            await response_cache.set(key, result)
+        return result
+    hedge = step.hedge if step.hedge is not None else settings.provider_hedge
+    async def _upstream() -> dict:
+        result = await providers.complete(prompt, model, hedge=hedge)
+        if key is not None and _cacheable(result):
+            await response_cache.set(key, result)
+        return result
+    if not settings.provider_coalesce:
+        return await _upstream()
+    # Identical concurrent prompts share one upstream call; every caller's run gets its telemetry.
+    async def _shared() -> tuple:
+        with Telemetry.run_scope() as run:
+            return await _upstream(), run.events
+    flight = (model, prompt, hedge, key is not None)
+    if flight in inflight:
+        Telemetry.log("singleflight", {"shared": 1})
+    result, events = await inflight.do(flight, _shared, context=_detached_context())
+    Telemetry.attach(events)
+    return result
 async def execute_step(step: Step, context: dict) -> dict:
     if step.type == "prompt":
-        prompt = (step.prompt or "").format(**context)
-        if settings.openai_api_key:
-            res = await openai_provider.run_openai(prompt, step.model or "gpt-4o-mini", settings.openai_api_key)
-            out_text = res.get("response",{}).get("choices",[{}])[0].get("message",{}).get("content","")
-            return {"text": out_text, "provider_meta": res}
-        elif settings.allow_fake_provider:
-            Telemetry.log("fake", {"latency_ms": 5}); return {"text": f"[FAKE_PROVIDER ECHO]\n{prompt}"}
-        else:
-            raise RuntimeError("No provider configured and fake provider disabled.")
+        return await _prompt_step(step, context)
     elif step.type == "tool":
         Telemetry.log("tool", {"name": step.model or "tool", "calls": 1})
         return {"result": f"Tool {step.model} executed with {step.inputs}"}
@@ -22,13 +86,112 @@ async def execute_step(step: Step, context: dict) -> dict:
         return {"branch": "default"}
     else: raise ValueError(f"Unknown step type: {step.type}")
 async def run_model(spec: DecisionModelSpec, inputs: dict) -> dict:
-    context = dict(inputs); trace = []
-    next_id = spec.steps[0].id if spec.steps else None
-    step_map = {s.id: s for s in spec.steps}
-    while next_id:
-        step = step_map[next_id]
-        result = await execute_step(step, context)
+    return await run_plan(compile_spec(spec), inputs)
+async def _run_step(step: Step, context: dict) -> dict:
+    # The step budget is its own timeout_ms capped by the run deadline; provider HTTP calls inherit it.
+    budget = step.timeout_ms / 1000 if step.timeout_ms else None
+    left = deadline.remaining()
+    if left is not None:
+        budget = left if budget is None else min(budget, left)
+        if budget <= 0:
+            raise StepTimeout(step.id)
+    outcome, t0 = "error", time.perf_counter()
+    with Telemetry.step_scope(step.id), deadline.scope(budget), \
+            tracing.span("decision.step", {"step.id": step.id, "step.type": step.type}):
+        try:
+            result = await asyncio.wait_for(execute_step(step, context), budget)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            if budget is None:
+                raise
+            outcome = "timeout"
+            raise StepTimeout(step.id) from None
+        finally:
+            engine_metrics.observe_step(step.type, outcome, time.perf_counter() - t0)
+    emit = _emit.get()
+    if emit is not None:
+        await emit({"event": "step", "id": step.id, "type": step.type, "result": result})
+    return result
+def _record(trace: Optional[list], context: dict, step: Step, result: dict):
+    if trace is not None:
         trace.append({"id": step.id, "type": step.type, "result": result})
-        context[step.id] = result
+    context[step.id] = result
+async def _run_linear(plan: CompiledPlan, context: dict, trace: Optional[list]):
+    next_id = plan.entry
+    while next_id:
+        step = plan.step_map[next_id]
+        _record(trace, context, step, await _run_step(step, context))
         next_id = step.next
-    return {"trace": trace, "telemetry": Telemetry.dump()}
+async def _run_dag(plan: CompiledPlan, context: dict, trace: Optional[list], limit: int):
+    """Start each step as soon as its own dependencies have completed, at most ``limit`` at a time."""
+    sem = asyncio.Semaphore(limit)
+    async def _bounded(step: Step) -> dict:
+        async with sem:
+            return await _run_step(step, context)
+    waiting = {sid: set(ds) for sid, ds in plan.deps.items()}
+    running: Dict[asyncio.Future, Step] = {}
+    def _start(sid: str):
+        del waiting[sid]
+        running[asyncio.ensure_future(_bounded(plan.step_map[sid]))] = plan.step_map[sid]
+    for sid in [sid for sid, ds in waiting.items() if not ds]:
+        _start(sid)
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in [t for t in running if t in done]:  # start order keeps the trace deterministic
+                step = running.pop(task)
+                _record(trace, context, step, task.result())
+                for sid in plan.dependents[step.id]:
+                    waiting[sid].discard(step.id)
+                    if not waiting[sid]:
+                        _start(sid)
+    except BaseException:
+        for t in running: t.cancel()
+        raise
+async def run_plan(plan: CompiledPlan, inputs: dict, max_concurrency: Optional[int] = None,
+                   emit: Optional[Emit] = None, deadline_ms: Optional[int] = None) -> dict:
+    """Execute a compiled plan.
+
+    With ``emit``, every step result (and every provider token of prompt steps) is sent to
+    the callback as it happens and the trace is not accumulated (``"trace"`` is ``None``).
+    ``deadline_ms`` (default: the spec's ``deadline_ms``) bounds the whole run; a step that
+    runs out of time raises ``StepTimeout``.
+    """
+    missing = plan.required_inputs - inputs.keys()
+    if missing:
+        raise KeyError(min(missing))
+    context = dict(inputs)
+    trace: Optional[list] = [] if emit is None else None
+    emit_token = _emit.set(emit)
+    outcome, t0 = "error", time.perf_counter()
+    try:
+        run_budget = deadline_ms or plan.spec.deadline_ms
+        with Telemetry.run_scope() as run, deadline.scope(run_budget / 1000 if run_budget else None), \
+                tracing.span("decision.run", {"decision.model": plan.spec.name, "decision.steps": len(plan.step_map)}):
+            if plan.deps is None:
+                await _run_linear(plan, context, trace)
+            else:
+                await _run_dag(plan, context, trace, max_concurrency or plan.spec.max_concurrency or settings.engine_max_concurrency)
+        outcome = "ok"
+    except StepTimeout:
+        outcome = "timeout"
+        raise
+    finally:
+        _emit.reset(emit_token)
+        engine_metrics.observe_run(outcome, time.perf_counter() - t0)
+    return {"trace": trace, "telemetry": run.events, "timings": run.steps}
+async def iter_batch(plan: CompiledPlan, inputs_list: List[dict], concurrency: int) -> AsyncIterator[Tuple[int, Optional[dict], Optional[Exception]]]:
+    """Run one plan over many input sets, yielding ``(index, result, error)`` in completion order."""
+    sem = asyncio.Semaphore(concurrency)
+    async def _one(index: int, inputs: dict):
+        async with sem:
+            try:
+                return index, await run_plan(plan, inputs), None
+            except Exception as e:
+                return index, None, e
+    tasks = [asyncio.ensure_future(_one(i, inputs)) for i, inputs in enumerate(inputs_list)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks: t.cancel()
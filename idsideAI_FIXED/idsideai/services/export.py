@@ -1,12 +1,199 @@
-import csv, json
-from typing import List, Dict, Any
+import csv, gzip, io, json, os, uuid
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+import anyio
+from sqlalchemy import func, select
+from idsideai.database import ReadSessionLocal
+from idsideai.models import ExecutionLog
+
+# Exports stream rows to a temporary file next to the target and rename it into place at
+# the end, so readers never see a half-written file and memory use does not grow with the
+# number of rows.
+
+EXECUTION_LOG_COLUMNS = ("id", "decision_model_id", "created_at", "input_payload", "output_payload", "telemetry")
+FORMATS = ("ndjson", "csv", "parquet")
+
+def _default(value: Any):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _scalar(value: Any):
+    """Flat representation for CSV/Parquet cells: nested values become JSON text."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_default, separators=(",", ":"))
+    return value.isoformat() if isinstance(value, datetime) else value
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[Path]:
+    """Yield a temp path in the target's directory; rename it to ``path`` on success."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def _open(path: Path, compress: bool):
+    return gzip.open(path, "wb", compresslevel=6) if compress else open(path, "wb")
+
+class NDJSONWriter:
+    def __init__(self, path: Path, columns: Sequence[str], compress: bool = False):
+        self.f = _open(path, compress)
+    def write(self, rows: List[Dict[str, Any]]):
+        self.f.write("".join(json.dumps(r, default=_default, separators=(",", ":")) + "\n" for r in rows).encode("utf-8"))
+    def close(self):
+        self.f.close()
+
+class CSVWriter:
+    def __init__(self, path: Path, columns: Sequence[str], compress: bool = False):
+        self.raw = _open(path, compress)
+        self.f = io.TextIOWrapper(self.raw, encoding="utf-8", newline="")
+        self.w = csv.DictWriter(self.f, fieldnames=list(columns), extrasaction="ignore")
+        self.w.writeheader()
+    def write(self, rows: List[Dict[str, Any]]):
+        self.w.writerows({k: _scalar(v) for k, v in r.items()} for r in rows)
+    def close(self):
+        self.f.close()
+
+class ParquetWriter:
+    """One row group per batch. Nested values and datetimes are stored as JSON/ISO strings;
+    other column types are inferred from the first batch (all-null columns become strings).
+    Needs pyarrow.
+    """
+    def __init__(self, path: Path, columns: Sequence[str], compress: bool = False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export requires pyarrow") from e
+        self.pa, self.pq, self.path, self.columns = pa, pq, str(path), list(columns)
+        self.w: Optional[Any] = None
+    def _schema(self, data: Dict[str, list]):
+        pa = self.pa
+        if tuple(self.columns) == EXECUTION_LOG_COLUMNS:
+            return pa.schema([(c, pa.int64() if c.endswith("id") else pa.string()) for c in self.columns])
+        inferred = pa.Table.from_pydict(data).schema
+        return pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in inferred])
+    def write(self, rows: List[Dict[str, Any]]):
+        data = {c: [_scalar(r.get(c)) for r in rows] for c in self.columns}
+        if self.w is None:
+            self.w = self.pq.ParquetWriter(self.path, self._schema(data), compression="zstd")
+        for f in self.w.schema:
+            if self.pa.types.is_string(f.type):
+                data[f.name] = [None if v is None else str(v) for v in data[f.name]]
+        self.w.write_table(self.pa.Table.from_pydict(data, schema=self.w.schema))
+    def close(self):
+        if self.w is None:  # no rows: still produce a valid, empty file
+            self.w = self.pq.ParquetWriter(self.path, self._schema({c: [] for c in self.columns}), compression="zstd")
+        self.w.close()
+
+WRITERS = {"ndjson": NDJSONWriter, "csv": CSVWriter, "parquet": ParquetWriter}
+
+def detect_format(path: str) -> tuple:
+    """``runs.ndjson.gz`` -> ("ndjson", True); ``.jsonl`` counts as NDJSON."""
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    compress = bool(suffixes) and suffixes[-1] == ".gz"
+    ext = (suffixes[-2] if compress and len(suffixes) > 1 else suffixes[-1] if suffixes else "").lstrip(".")
+    fmt = "ndjson" if ext == "jsonl" else ext
+    if fmt not in FORMATS:
+        raise ValueError(f"unsupported export format for {path!r}; use one of {FORMATS} (optionally .gz)")
+    return fmt, compress
+
+def write_rows(path: str, batches: Iterable[List[Dict[str, Any]]], columns: Sequence[str],
+               fmt: Optional[str] = None, compress: Optional[bool] = None) -> int:
+    """Stream batches of rows to ``path`` atomically; returns the number of rows written."""
+    detected, gz = detect_format(path) if fmt is None else (fmt, False)
+    count = 0
+    with atomic_path(path) as tmp:
+        writer = WRITERS[detected](tmp, columns, gz if compress is None else compress)
+        try:
+            for batch in batches:
+                writer.write(batch); count += len(batch)
+        finally:
+            writer.close()
+    return count
+
+def _filtered(stmt, decision_model_id: Optional[int], since: Optional[datetime]):
+    table = ExecutionLog.__table__
+    if decision_model_id is not None:
+        stmt = stmt.where(table.c.decision_model_id == decision_model_id)
+    if since is not None:
+        stmt = stmt.where(table.c.created_at >= since)
+    return stmt
+
+async def count_execution_logs(decision_model_id: Optional[int] = None, since: Optional[datetime] = None,
+                               session_factory=ReadSessionLocal) -> int:
+    async with session_factory() as session:
+        return (await session.execute(_filtered(select(func.count()).select_from(ExecutionLog.__table__),
+                                                decision_model_id, since))).scalar_one()
+
+async def iter_execution_logs(batch_size: int = 1000, decision_model_id: Optional[int] = None,
+                              since: Optional[datetime] = None, session_factory=ReadSessionLocal) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield ExecutionLog rows as plain dicts, ``batch_size`` at a time, in id order.
+
+    Uses keyset pagination (``id > last``) with a short-lived session per batch, so neither
+    the session nor the database cursor holds more than one batch.
+    """
+    table = ExecutionLog.__table__
+    last_id = 0
+    while True:
+        stmt = _filtered(select(*(table.c[c] for c in EXECUTION_LOG_COLUMNS)).where(table.c.id > last_id),
+                         decision_model_id, since)
+        async with session_factory() as session:
+            rows = (await session.execute(stmt.order_by(table.c.id).limit(batch_size))).mappings().all()
+        if not rows:
+            return
+        yield [dict(r) for r in rows]
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+async def export_execution_logs(path: str, fmt: Optional[str] = None, compress: Optional[bool] = None,
+                                batch_size: int = 1000, decision_model_id: Optional[int] = None,
+                                since: Optional[datetime] = None, session_factory=ReadSessionLocal,
+                                progress: Optional[Callable[[int], None]] = None) -> int:
+    """Export execution logs to NDJSON/CSV/Parquet (gzip by ``.gz`` suffix or ``compress``).
+
+    Encoding and file writes run in a worker thread one batch at a time; ``progress`` is
+    called with the running row count after each batch.
+    """
+    detected, gz = detect_format(path) if fmt is None else (fmt, False)
+    compress = gz if compress is None else compress
+    count = 0
+    with atomic_path(path) as tmp:
+        writer = await anyio.to_thread.run_sync(WRITERS[detected], tmp, EXECUTION_LOG_COLUMNS, compress)
+        try:
+            async for batch in iter_execution_logs(batch_size, decision_model_id, since, session_factory):
+                await anyio.to_thread.run_sync(writer.write, batch)
+                count += len(batch)
+                if progress is not None:
+                    progress(count)
+        finally:
+            await anyio.to_thread.run_sync(writer.close)
+    return count
+
 def export_json(path: str, payload: Dict[str, Any]):
-    Path(path).write_text(json.dumps(payload, indent=2))
-def export_csv(path: str, rows: List[Dict[str, Any]]):
-    if not rows:
-        Path(path).write_text(""); return
-    import csv
-    from pathlib import Path
-    with open(path,"w",newline="",encoding="utf-8") as f:
-        w=csv.DictWriter(f, fieldnames=list(rows[0].keys())); w.writeheader(); w.writerows(rows)
+    with atomic_path(path) as tmp, open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, default=_default)
+
+def export_csv(path: str, rows: Iterable[Dict[str, Any]]):
+    """Columns come from the first row; ``rows`` may be any iterable, consumed lazily."""
+    it = iter(rows)
+    first = next(it, None)
+    if first is None:
+        with atomic_path(path) as tmp:
+            tmp.write_text("")
+        return
+    def batches():
+        batch = [first]
+        for row in it:
+            batch.append(row)
+            if len(batch) >= 1000:
+                yield batch; batch = []
+        if batch:
+            yield batch
+    write_rows(path, batches(), list(first.keys()), fmt="csv")
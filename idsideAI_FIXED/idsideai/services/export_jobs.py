@@ -0,0 +1,141 @@
+import asyncio, hashlib, json, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from idsideai.config import settings
+from idsideai.database import DATABASE_URL, make_engine
+from idsideai.services.export import FORMATS, count_execution_logs, export_execution_logs
+
+_PREFIX = "execution-logs-"
+
+class ExportQueueFull(RuntimeError):
+    pass
+
+@dataclass
+class ExportJob:
+    id: str
+    key: str
+    format: str
+    compress: bool
+    decision_model_id: Optional[int]
+    since: Optional[datetime]
+    filename: str
+    status: str = "queued"  # queued -> running -> done | failed
+    rows: int = 0
+    total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        del d["key"]
+        d["since"] = self.since.isoformat() if self.since else None
+        d["progress"] = 1.0 if self.status == "done" else round(self.rows / self.total, 4) if self.total else 0.0
+        return d
+
+class ExportJobManager:
+    """Runs execution-log exports in the background and keeps their files for a while.
+
+    Jobs run on a pool of ``workers`` threads, each in its own event loop with its own
+    database engine, so a large export never shares the API's event loop or connection
+    pool. A request identical to one that is queued, running or finished less than
+    ``dedupe_s`` ago returns that job instead of starting another. Files in ``directory``
+    are deleted ``retention_s`` after they were written (checked on every submit and by
+    ``cleanup``).
+    """
+    def __init__(self, directory: str = settings.export_dir, workers: int = settings.export_workers,
+                 retention_s: float = settings.export_retention_s, dedupe_s: float = settings.export_dedupe_s,
+                 max_queued: int = 100, batch_size: int = 1000, database_url: str = DATABASE_URL):
+        self.directory = Path(directory)
+        self.workers, self.retention_s, self.dedupe_s = workers, retention_s, dedupe_s
+        self.max_queued, self.batch_size, self.database_url = max_queued, batch_size, database_url
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, ExportJob] = {}
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.deduped = self.removed = 0
+    @staticmethod
+    def request_key(fmt: str, compress: bool, decision_model_id: Optional[int], since: Optional[datetime]) -> str:
+        canonical = json.dumps({"format": fmt, "compress": compress, "decision_model_id": decision_model_id,
+                                "since": since.isoformat() if since else None}, sort_keys=True)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+    def path(self, job: ExportJob) -> Path:
+        return self.directory / job.filename
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self._jobs.get(job_id)
+    def _reusable(self, job: ExportJob, now: float) -> bool:
+        if job.status in ("queued", "running"):
+            return True
+        return job.status == "done" and now - job.finished_at < self.dedupe_s and self.path(job).exists()
+    def submit(self, fmt: str = "ndjson", compress: bool = True, decision_model_id: Optional[int] = None,
+               since: Optional[datetime] = None) -> ExportJob:
+        if fmt not in FORMATS:
+            raise ValueError(f"unsupported export format {fmt!r}; use one of {FORMATS}")
+        compress = compress and fmt != "parquet"  # parquet pages are already zstd-compressed
+        key = self.request_key(fmt, compress, decision_model_id, since)
+        self.cleanup()
+        with self._lock:
+            job = self._jobs.get(self._by_key.get(key, ""))
+            if job is not None and self._reusable(job, time.time()):
+                self.deduped += 1
+                return job
+            if sum(j.status == "queued" for j in self._jobs.values()) >= self.max_queued:
+                raise ExportQueueFull(f"{self.max_queued} exports already queued")
+            job_id = uuid.uuid4().hex
+            job = ExportJob(job_id, key, fmt, compress, decision_model_id, since,
+                            f"{_PREFIX}{job_id}.{fmt}{'.gz' if compress else ''}")
+            self._jobs[job_id] = job
+            self._by_key[key] = job_id
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export")
+        self._pool.submit(self._run, job)
+        return job
+    def _run(self, job: ExportJob):
+        job.status = "running"
+        try:
+            rows, status = asyncio.run(self._export(job)), "done"
+        except Exception as e:
+            rows, status, job.error = job.rows, "failed", f"{type(e).__name__}: {e}"
+        job.rows, job.finished_at = rows, time.time()
+        job.status = status
+    async def _export(self, job: ExportJob) -> int:
+        engine = make_engine(self.database_url, read_only=True)
+        try:
+            sessions = async_sessionmaker(engine, expire_on_commit=False)
+            job.total = await count_execution_logs(job.decision_model_id, job.since, sessions)
+            return await export_execution_logs(str(self.path(job)), job.format, job.compress, self.batch_size,
+                                               job.decision_model_id, job.since, sessions,
+                                               progress=lambda n: setattr(job, "rows", n))
+        finally:
+            await engine.dispose()
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Delete export files older than ``retention_s`` and forget jobs that finished before then."""
+        cutoff = (time.time() if now is None else now) - self.retention_s
+        removed = 0
+        if self.directory.is_dir():
+            for p in self.directory.iterdir():  # only our own files: the directory may be shared
+                if p.name.startswith((_PREFIX, "." + _PREFIX)) and p.is_file() and p.stat().st_mtime < cutoff:
+                    p.unlink(missing_ok=True); removed += 1
+        with self._lock:
+            for job in [j for j in self._jobs.values() if j.finished_at is not None and j.finished_at < cutoff]:
+                del self._jobs[job.id]
+                if self._by_key.get(job.key) == job.id:
+                    del self._by_key[job.key]
+        self.removed += removed
+        return removed
+    def shutdown(self, wait: bool = False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+        for job in self._jobs.values():
+            if job.status == "queued":
+                job.status, job.error, job.finished_at = "failed", "cancelled at shutdown", time.time()
+    def stats(self) -> dict:
+        statuses = [j.status for j in self._jobs.values()]
+        return {s: statuses.count(s) for s in ("queued", "running", "done", "failed")} | {
+            "workers": self.workers, "deduped": self.deduped, "files_removed": self.removed}
+
+export_jobs = ExportJobManager()
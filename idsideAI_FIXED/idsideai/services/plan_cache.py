@@ -0,0 +1,126 @@
+import hashlib, os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from idsideai import tracing
+from idsideai.services.dsl import DecisionModelSpec, Step, parse_sdl
+from idsideai.services.templates import compile_template
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    """A validated spec plus the lookup structures the engine needs at run time."""
+    spec: DecisionModelSpec
+    step_map: Dict[str, Step]
+    entry: Optional[str]
+    # Each step's dependencies (in spec order) when any step declares depends_on; None keeps the linear `next` walk.
+    deps: Optional[Dict[str, FrozenSet[str]]] = None
+    # The reverse edges: steps to re-check when a step completes.
+    dependents: Optional[Dict[str, Tuple[str, ...]]] = None
+    # Template placeholders that are not step ids; checked against run inputs before any step runs.
+    required_inputs: FrozenSet[str] = frozenset()
+
+def _dag_deps(spec: DecisionModelSpec, step_map: Dict[str, Step]) -> Dict[str, FrozenSet[str]]:
+    deps: Dict[str, set] = {s.id: set(s.depends_on) for s in spec.steps}
+    for s in spec.steps:
+        # A prompt that reads {other_step...} must wait for that step.
+        if s._template is not None:
+            deps[s.id] |= (s._template.roots & step_map.keys()) - {s.id}
+    for s in spec.steps:
+        if s.next:
+            if s.next not in step_map:
+                raise ValueError(f"step '{s.id}' has unknown next '{s.next}'")
+            deps[s.next].add(s.id)
+    for sid, ds in deps.items():
+        unknown = ds - step_map.keys()
+        if unknown:
+            raise ValueError(f"step '{sid}' depends on unknown step(s): {', '.join(sorted(unknown))}")
+    done: set = set()
+    remaining = [s.id for s in spec.steps]
+    while remaining:
+        ready = [sid for sid in remaining if deps[sid] <= done]
+        if not ready:
+            raise ValueError(f"dependency cycle between steps: {', '.join(remaining)}")
+        done.update(ready)
+        remaining = [sid for sid in remaining if sid not in done]
+    return {sid: frozenset(ds) for sid, ds in deps.items()}
+
+def _dependents(deps: Dict[str, FrozenSet[str]]) -> Dict[str, Tuple[str, ...]]:
+    return {sid: tuple(other for other, ds in deps.items() if sid in ds) for sid in deps}
+
+def _linear_steps(step_map: Dict[str, Step], entry: Optional[str]) -> List[Step]:
+    seen, steps, sid = set(), [], entry
+    while sid and sid in step_map and sid not in seen:
+        seen.add(sid); steps.append(step_map[sid])
+        sid = step_map[sid].next
+    return steps
+
+def compile_spec(spec: DecisionModelSpec) -> CompiledPlan:
+    step_map = {s.id: s for s in spec.steps}
+    if len(step_map) != len(spec.steps):
+        raise ValueError("duplicate step ids")
+    for s in spec.steps:
+        if s.type == "prompt" and s._template is None:
+            s._template = compile_template(s.prompt)
+    entry = spec.steps[0].id if spec.steps else None
+    deps = _dag_deps(spec, step_map) if any(s.depends_on for s in spec.steps) else None
+    executed = spec.steps if deps is not None else _linear_steps(step_map, entry)
+    required = frozenset().union(*(s._template.roots for s in executed if s._template is not None)) - step_map.keys()
+    return CompiledPlan(spec=spec, step_map=step_map, entry=entry, deps=deps,
+                        dependents=_dependents(deps) if deps is not None else None, required_inputs=required)
+
+def sdl_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class PlanCache:
+    """Bounded LRU of compiled plans keyed by the SHA-256 of the SDL text."""
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[str, CompiledPlan]" = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+    def get(self, text: str) -> CompiledPlan:
+        key = sdl_key(text)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key); self.hits += 1
+            return plan
+        self.misses += 1
+        with tracing.span("sdl.compile"):
+            plan = compile_spec(parse_sdl(text))
+        if self.maxsize > 0:
+            self._plans[key] = plan
+            if len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False); self.evictions += 1
+        return plan
+    def clear(self):
+        self._plans.clear()
+        self.hits = self.misses = self.evictions = 0
+    def stats(self) -> dict:
+        return {"size": len(self._plans), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+plan_cache = PlanCache(int(os.getenv("SDL_PLAN_CACHE_SIZE", "256")))
+
+class StoredPlanCache:
+    """Compiled plans for stored DecisionModel rows, invalidated by row version."""
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[int, tuple[int, CompiledPlan]]" = OrderedDict()
+        self.hits = self.misses = 0
+    def get(self, model_id: int, version: int) -> Optional[CompiledPlan]:
+        entry = self._plans.get(model_id)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._plans.move_to_end(model_id); self.hits += 1
+        return entry[1]
+    def put(self, model_id: int, version: int, plan: CompiledPlan):
+        self._plans[model_id] = (version, plan)
+        self._plans.move_to_end(model_id)
+        while len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+    def invalidate(self, model_id: int):
+        self._plans.pop(model_id, None)
+    def stats(self) -> dict:
+        return {"size": len(self._plans), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+stored_plans = StoredPlanCache(int(os.getenv("STORED_PLAN_CACHE_SIZE", "256")))
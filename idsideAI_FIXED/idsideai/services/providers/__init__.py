@@ -0,0 +1 @@
+# Providers package
@@ -0,0 +1,37 @@
+from __future__ import annotations
+import time
+from typing import AsyncIterator, Optional
+import httpx
+from idsideai import http
+from idsideai.config import settings
+class AnthropicError(RuntimeError): ...
+async def run_anthropic(prompt: str, model: str, api_key: Optional[str], base_url: Optional[str] = None,
+                        max_tokens: int = 256) -> dict:
+    """Call the Messages API on the shared pooled client.
+
+    Returns ``{"response": <message json>, "latency_ms": float}``.
+    """
+    if not api_key: raise AnthropicError("ANTHROPIC_API_KEY is not configured.")
+    url = f"{(base_url or settings.anthropic_base_url).rstrip('/')}/v1/messages"
+    body = {"model": model, "max_tokens": max_tokens, "messages": [{"role": "user", "content": prompt}]}
+    headers = {"x-api-key": api_key, "anthropic-version": settings.anthropic_version}
+    t0 = time.perf_counter()
+    try:
+        r = await http.apost(url, json=body, headers=headers)
+        r.raise_for_status()
+        return {"response": r.json(), "latency_ms": (time.perf_counter() - t0) * 1000}
+    except (httpx.HTTPError, ValueError) as e:
+        raise AnthropicError(f"Anthropic call failed: {e}") from e
+async def stream_anthropic(prompt: str, model: str, api_key: Optional[str], base_url: Optional[str] = None,
+                           max_tokens: int = 256) -> AsyncIterator[str]:
+    """Yield text deltas from a streamed Messages API call."""
+    if not api_key: raise AnthropicError("ANTHROPIC_API_KEY is not configured.")
+    url = f"{(base_url or settings.anthropic_base_url).rstrip('/')}/v1/messages"
+    body = {"model": model, "max_tokens": max_tokens, "messages": [{"role": "user", "content": prompt}], "stream": True}
+    headers = {"x-api-key": api_key, "anthropic-version": settings.anthropic_version}
+    try:
+        async for event in http.apost_sse(url, json=body, headers=headers):
+            if event.get("type") == "content_block_delta" and event.get("delta", {}).get("type") == "text_delta":
+                yield event["delta"]["text"]
+    except (httpx.HTTPError, ValueError) as e:
+        raise AnthropicError(f"Anthropic call failed: {e}") from e
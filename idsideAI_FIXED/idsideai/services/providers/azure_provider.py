@@ -0,0 +1,38 @@
+from __future__ import annotations
+import time
+from typing import AsyncIterator, Optional
+import httpx
+from idsideai import http
+from idsideai.config import settings
+class AzureOpenAIError(RuntimeError): ...
+async def run_azure_openai(prompt: str, deployment: str, endpoint: Optional[str], api_key: Optional[str],
+                           max_tokens: int = 256) -> dict:
+    """Call an Azure OpenAI chat deployment on the shared pooled client.
+
+    Returns ``{"response": <completion json>, "latency_ms": float}``.
+    """
+    if not endpoint or not api_key: raise AzureOpenAIError("AZURE_OPENAI_ENDPOINT/AZURE_OPENAI_KEY are not configured.")
+    url = f"{endpoint.rstrip('/')}/openai/deployments/{deployment}/chat/completions"
+    body = {"messages": [{"role": "user", "content": prompt}], "max_tokens": max_tokens}
+    t0 = time.perf_counter()
+    try:
+        r = await http.apost(url, json=body, headers={"api-key": api_key},
+                             params={"api-version": settings.azure_openai_api_version})
+        r.raise_for_status()
+        return {"response": r.json(), "latency_ms": (time.perf_counter() - t0) * 1000}
+    except (httpx.HTTPError, ValueError) as e:
+        raise AzureOpenAIError(f"Azure OpenAI call failed: {e}") from e
+async def stream_azure_openai(prompt: str, deployment: str, endpoint: Optional[str], api_key: Optional[str],
+                              max_tokens: int = 256) -> AsyncIterator[str]:
+    """Yield content deltas from a streamed Azure OpenAI chat completion."""
+    if not endpoint or not api_key: raise AzureOpenAIError("AZURE_OPENAI_ENDPOINT/AZURE_OPENAI_KEY are not configured.")
+    url = f"{endpoint.rstrip('/')}/openai/deployments/{deployment}/chat/completions"
+    body = {"messages": [{"role": "user", "content": prompt}], "max_tokens": max_tokens, "stream": True}
+    try:
+        async for chunk in http.apost_sse(url, json=body, headers={"api-key": api_key},
+                                          params={"api-version": settings.azure_openai_api_version}):
+            delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+    except (httpx.HTTPError, ValueError) as e:
+        raise AzureOpenAIError(f"Azure OpenAI call failed: {e}") from e
@@ -1,22 +1,40 @@
 from __future__ import annotations
-import os, anyio
-from typing import Optional
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
+import os, time
+from typing import AsyncIterator, Optional
+import httpx
+from idsideai import http
+from idsideai.config import settings
 class OpenAIError(RuntimeError): ...
-async def run_openai(prompt: str, model: str, api_key: Optional[str]) -> str:
+async def run_openai(prompt: str, model: str, api_key: Optional[str], base_url: Optional[str] = None,
+                     max_tokens: int = 256) -> dict:
+    """Call the chat completions API on the shared pooled client.
+
+    Returns ``{"response": <completion json>, "latency_ms": float}``.
+    """
     if not api_key: raise OpenAIError("OPENAI_API_KEY is not configured.")
-    if OpenAI is None: raise OpenAIError("OpenAI SDK is not installed in this virtualenv.")
-    def _call():
-        client = OpenAI(api_key=api_key)
-        r = client.chat.completions.create(model=model or "gpt-4o",
-                                           messages=[{"role":"user","content":prompt}],max_tokens=256)
-        return (r.choices[0].message.content or "").strip()
+    url = f"{(base_url or settings.openai_base_url).rstrip('/')}/chat/completions"
+    body = {"model": model or "gpt-4o", "messages": [{"role": "user", "content": prompt}], "max_tokens": max_tokens}
+    t0 = time.perf_counter()
     try:
-        return await anyio.to_thread.run_sync(_call)
-    except Exception as e:
+        r = await http.apost(url, json=body, headers={"Authorization": f"Bearer {api_key}"})
+        r.raise_for_status()
+        return {"response": r.json(), "latency_ms": (time.perf_counter() - t0) * 1000}
+    except (httpx.HTTPError, ValueError) as e:
         if os.getenv("OPENAI_FALLBACK","1") in ("1","true","True"):
-            return f"[OPENAI_FALLBACK] {prompt}"
+            return {"response": {"choices": [{"message": {"content": f"[OPENAI_FALLBACK] {prompt}"}}]},
+                    "fallback": True, "error": str(e)}
+        raise OpenAIError(f"OpenAI call failed: {e}") from e
+async def stream_openai(prompt: str, model: str, api_key: Optional[str], base_url: Optional[str] = None,
+                        max_tokens: int = 256) -> AsyncIterator[str]:
+    """Yield content deltas from a streamed chat completion."""
+    if not api_key: raise OpenAIError("OPENAI_API_KEY is not configured.")
+    url = f"{(base_url or settings.openai_base_url).rstrip('/')}/chat/completions"
+    body = {"model": model or "gpt-4o", "messages": [{"role": "user", "content": prompt}], "max_tokens": max_tokens,
+            "stream": True}
+    try:
+        async for chunk in http.apost_sse(url, json=body, headers={"Authorization": f"Bearer {api_key}"}):
+            delta = (chunk.get("choices") or [{}])[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+    except (httpx.HTTPError, ValueError) as e:
         raise OpenAIError(f"OpenAI call failed: {e}") from e
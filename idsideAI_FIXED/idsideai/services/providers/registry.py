@@ -0,0 +1,383 @@
+from __future__ import annotations
+import asyncio, re, time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from idsideai import deadline, tracing
+from idsideai.config import settings
+from idsideai.metrics import engine_metrics
+from idsideai.services.telemetry import Telemetry
+from idsideai.services.providers import openai_provider, anthropic_provider, azure_provider
+from idsideai.services.providers.resilience import AdaptiveLimiter, CircuitBreaker
+
+class ProviderError(RuntimeError): ...
+
+class ProviderUnavailable(ProviderError):
+    """Raised without calling upstream: the provider's breaker is open or its limiter is full."""
+
+class ProviderBusy(ProviderUnavailable):
+    """No concurrency slot freed up within the queue timeout (or the run's deadline)."""
+
+class CircuitOpen(ProviderUnavailable):
+    """The provider's breaker is refusing calls."""
+
+# Marks an answer that did not come from a real provider: never cached, never a success.
+FALLBACK_META = {"provider": "fake", "fallback": True}
+
+class LatencyWindow:
+    """Latencies (ms) of the most recent successful calls and outcomes of the most recent calls for one provider.
+
+    Failures only count towards ``error_rate``: a timeout or a fast error says nothing
+    about how long a good answer takes.
+    """
+    def __init__(self, size: int = 100):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._outcomes: Deque[bool] = deque(maxlen=size)
+    def add(self, ms: float):
+        self._samples.append(ms); self._outcomes.append(True)
+    def fail(self):
+        self._outcomes.append(False)
+    def error_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+    def quantile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    def p95(self) -> float:
+        return self.quantile(0.95)
+    def __len__(self):
+        return len(self._samples)
+
+class Provider:
+    """A completion backend. ``prefixes`` select which step models it can serve.
+
+    ``serves_unmatched`` providers also take models no provider's prefixes match
+    (fine-tunes such as ``ft:gpt-4o-mini:org::id``, legacy names, custom deployments).
+    """
+    name = "provider"
+    prefixes: Tuple[str, ...] = ()
+    serves_unmatched = False
+    def supports(self, model: str) -> bool:
+        return model.startswith(self.prefixes)
+    def available(self) -> bool:
+        return True
+    async def complete(self, prompt: str, model: str) -> dict:
+        raise NotImplementedError
+    async def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        """Yield text deltas; providers without native streaming yield one chunk."""
+        yield (await self.complete(prompt, model))["text"]
+
+def _chat_text(res: dict) -> str:
+    return res.get("response",{}).get("choices",[{}])[0].get("message",{}).get("content","")
+
+class OpenAIProvider(Provider):
+    name = "openai"
+    prefixes = ("gpt-", "o1", "o3", "o4", "chatgpt-")
+    serves_unmatched = True
+    def available(self) -> bool:
+        return bool(settings.openai_api_key)
+    async def complete(self, prompt: str, model: str) -> dict:
+        res = await openai_provider.run_openai(prompt, model, settings.openai_api_key)
+        return {"text": _chat_text(res), "provider_meta": res}
+    def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        return openai_provider.stream_openai(prompt, model, settings.openai_api_key)
+
+class AzureOpenAIProvider(Provider):
+    name = "azure"
+    prefixes = OpenAIProvider.prefixes
+    serves_unmatched = True  # deployment names are free-form
+    def available(self) -> bool:
+        return bool(settings.azure_openai_endpoint and settings.azure_openai_key)
+    async def complete(self, prompt: str, model: str) -> dict:
+        res = await azure_provider.run_azure_openai(prompt, model, settings.azure_openai_endpoint, settings.azure_openai_key)
+        return {"text": _chat_text(res), "provider_meta": res}
+    def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        return azure_provider.stream_azure_openai(prompt, model, settings.azure_openai_endpoint, settings.azure_openai_key)
+
+class AnthropicProvider(Provider):
+    name = "anthropic"
+    prefixes = ("claude",)
+    def available(self) -> bool:
+        return bool(settings.anthropic_api_key)
+    async def complete(self, prompt: str, model: str) -> dict:
+        res = await anthropic_provider.run_anthropic(prompt, model, settings.anthropic_api_key)
+        blocks = res.get("response", {}).get("content", [])
+        text = "".join(b.get("text", "") for b in blocks if b.get("type") == "text")
+        return {"text": text, "provider_meta": res}
+    def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        return anthropic_provider.stream_anthropic(prompt, model, settings.anthropic_api_key)
+
+class FakeProvider(Provider):
+    name = "fake"
+    def supports(self, model: str) -> bool:
+        return True
+    def available(self) -> bool:
+        return settings.allow_fake_provider
+    async def complete(self, prompt: str, model: str) -> dict:
+        Telemetry.log("fake", {"latency_ms": 5})
+        return {"text": f"[FAKE_PROVIDER ECHO]\n{prompt}", "provider_meta": dict(FALLBACK_META)}
+    async def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        for chunk in re.findall(r"\S+\s*|\s+", (await self.complete(prompt, model))["text"]):
+            yield chunk
+
+class ProviderRegistry:
+    """Maps step models to providers and routes each call to the lowest expected latency.
+
+    A model may name its provider explicitly as ``"<provider>:<model>"`` when ``<provider>``
+    is a registered provider; any other ``:`` is part of the model name. Otherwise every
+    available provider whose prefixes match is a candidate; a model no prefix matches goes
+    to the available ``serves_unmatched`` providers (OpenAI first), and ``fake`` is used
+    only when no real provider can take it. Candidates are tried in ``score`` order: the p95 of recent
+    successes divided by the recent success rate, so a provider that fails often is
+    demoted even when its failures are fast. A failure, a fallback result
+    or exceeding ``failover_timeout_ms`` (when another candidate remains) moves to the next.
+    With ``hedge=True`` a call that outlives the provider's p95 (once ``hedge_min_samples``
+    latencies are known) is duplicated to the next candidate, or the same provider.
+
+    Every real provider also gets an adaptive concurrency limiter and a circuit breaker.
+    A call over the limit queues for a slot for up to ``queue_timeout_s`` (and never past
+    the run's deadline), then moves on to the next candidate or raises ``ProviderBusy``.
+    Providers whose breaker is open are skipped; only when every candidate's breaker is
+    open does ``fake`` answer (if enabled), with ``provider_meta["fallback"]`` set.
+    """
+    def __init__(self, failover_timeout_ms: int = 0, window: int = 100, hedge_min_samples: int = 20,
+                 limiter_factory: Callable[[], AdaptiveLimiter] = AdaptiveLimiter,
+                 breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker, queue_timeout_s: float = 10.0):
+        self.failover_timeout_ms, self.queue_timeout_s = failover_timeout_ms, queue_timeout_s
+        self.hedge_min_samples = hedge_min_samples
+        self.hedges = self.fallbacks = 0
+        self._providers: Dict[str, Provider] = {}
+        self._latency: Dict[str, LatencyWindow] = {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._limiter_factory, self._breaker_factory = limiter_factory, breaker_factory
+        self._window = window
+    def register(self, provider: Provider):
+        self._providers[provider.name] = provider
+        self._latency.setdefault(provider.name, LatencyWindow(self._window))
+        if provider.name != "fake":
+            self._limiters.setdefault(provider.name, self._limiter_factory())
+            self._breakers.setdefault(provider.name, self._breaker_factory())
+            self._publish(provider.name)
+    def get(self, name: str) -> Optional[Provider]:
+        return self._providers.get(name)
+    def p95(self, name: str) -> float:
+        return self._latency[name].p95()
+    def error_rate(self, name: str) -> float:
+        return self._latency[name].error_rate()
+    def score(self, name: str) -> float:
+        """Expected ms to a good answer: p95 times the expected attempts (1 / success rate)."""
+        success = 1.0 - self.error_rate(name)
+        return self.p95(name) / success if success > 0 else float("inf")
+    def record(self, name: str, ms: float, ok: bool = True):
+        if ok:
+            self._latency[name].add(ms)
+        else:
+            self._latency[name].fail()
+        engine_metrics.observe_provider(name, ok, ms / 1000)
+    def _fallback(self) -> Optional[Provider]:
+        fake = self._providers.get("fake")
+        return fake if fake is not None and fake.available() else None
+    def _open(self, name: str) -> bool:
+        breaker = self._breakers.get(name)
+        return breaker is not None and breaker.is_open()
+    def candidates(self, model: str) -> Tuple[List[Provider], str]:
+        prefix, sep, rest = model.partition(":")
+        if sep and prefix in self._providers:
+            p = self._providers[prefix]
+            matches, model = ([p] if p.available() else []), rest
+        else:
+            real = [p for p in self._providers.values() if p.name != "fake"]
+            # "Unmatched" means no provider claims the model, configured or not: claude-* never goes to OpenAI.
+            matches = [p for p in real if p.supports(model)] or [p for p in real if p.serves_unmatched]
+            matches = [p for p in matches if p.available()]
+        if matches:
+            closed = [p for p in matches if not self._open(p.name)]
+            if not closed and matches[0].name != "fake":
+                self.fallbacks += 1
+                Telemetry.log("breaker_fallback", {"providers": [p.name for p in matches]})
+            matches = closed
+        if not matches:
+            fake = self._fallback()
+            matches = [fake] if fake is not None else []
+        matches.sort(key=lambda p: self.score(p.name))
+        return matches, model
+    def _publish(self, name: str):
+        """Export the provider's limiter and breaker state as gauges (they change on every admit and settle)."""
+        limiter = self._limiters[name]
+        engine_metrics.provider_state(name, int(limiter.limit), limiter.inflight, self._breakers[name].state)
+    async def _admit(self, provider: Provider):
+        limiter, breaker = self._limiters.get(provider.name), self._breakers.get(provider.name)
+        if limiter is None:
+            return
+        if not breaker.allow():
+            self._publish(provider.name)
+            raise CircuitOpen(f"{provider.name}: circuit open")
+        left = deadline.remaining()
+        timeout = self.queue_timeout_s if left is None else max(0.0, min(self.queue_timeout_s, left))
+        acquired = False
+        try:
+            acquired = await limiter.acquire(timeout)
+        finally:
+            if not acquired:
+                breaker.record(None)  # frees a half-open probe slot we were holding
+            self._publish(provider.name)
+        if not acquired:
+            raise ProviderBusy(f"{provider.name}: concurrency limit reached")
+    def _settle(self, provider: Provider, ok: Optional[bool], elapsed: float):
+        limiter = self._limiters.get(provider.name)
+        if limiter is not None:
+            limiter.release(ok, elapsed)
+            self._breakers[provider.name].record(ok, elapsed)
+            self._publish(provider.name)
+    async def _attempt(self, provider: Provider, prompt: str, model_name: str, timeout: Optional[float]) -> dict:
+        await self._admit(provider)
+        t0 = time.perf_counter()
+        try:
+            with tracing.span("provider.complete", {"provider": provider.name, "model": model_name}):
+                result = await asyncio.wait_for(provider.complete(prompt, model_name), timeout)
+        except asyncio.CancelledError:
+            self._settle(provider, None, 0.0)
+            raise
+        except Exception as e:
+            elapsed = (time.perf_counter() - t0) * 1000
+            self.record(provider.name, elapsed, ok=False)
+            self._settle(provider, False, elapsed)
+            Telemetry.log(provider.name, {"model": model_name, "latency_ms": elapsed, "error": type(e).__name__})
+            raise
+        elapsed = (time.perf_counter() - t0) * 1000
+        ok = provider.name == "fake" or not result.get("provider_meta", {}).get("fallback")
+        self.record(provider.name, elapsed, ok)
+        self._settle(provider, ok, elapsed)
+        if provider.name != "fake":
+            Telemetry.log(provider.name, {"model": model_name, "latency_ms": elapsed})
+        return result
+    async def _hedged(self, primary: Provider, backup: Provider, prompt: str, model_name: str,
+                      timeout: Optional[float]) -> dict:
+        """Send to ``primary``; if it has not answered within its p95, also send to ``backup``.
+
+        The first successful answer wins and the other request is cancelled.
+        """
+        tasks = [asyncio.ensure_future(self._attempt(primary, prompt, model_name, timeout))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.p95(primary.name) / 1000)
+            if not done:
+                self.hedges += 1
+                Telemetry.log("hedge", {"provider": primary.name, "backup": backup.name})
+                tasks.append(asyncio.ensure_future(self._attempt(backup, prompt, model_name, timeout)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        return t.result()
+            return tasks[0].result()  # every attempt failed: re-raise the primary's error
+        finally:
+            for t in tasks:
+                t.cancel()
+    async def complete(self, prompt: str, model: str, hedge: bool = False) -> dict:
+        providers, model_name = self.candidates(model)
+        if not providers:
+            raise RuntimeError("No provider configured and fake provider disabled.")
+        last = len(providers) - 1
+        for i, provider in enumerate(providers):
+            timeout = self.failover_timeout_ms / 1000 if self.failover_timeout_ms and i < last else None
+            try:
+                if hedge and len(self._latency[provider.name]) >= self.hedge_min_samples:
+                    backup = providers[i + 1] if i < last else provider
+                    result = await self._hedged(provider, backup, prompt, model_name, timeout)
+                else:
+                    result = await self._attempt(provider, prompt, model_name, timeout)
+            except CircuitOpen:
+                if i == last:
+                    fake = self._fallback()
+                    if fake is None or provider is fake:
+                        raise
+                    self.fallbacks += 1
+                    return await self._attempt(fake, prompt, model_name, None)
+                continue
+            except ProviderBusy:  # a healthy provider at its limit: never answer with fake
+                if i == last:
+                    raise
+                continue
+            except Exception:
+                if i == last:
+                    raise
+                continue
+            if result.get("provider_meta", {}).get("fallback") and i < last:
+                continue
+            return result
+        raise ProviderError("all providers failed")  # unreachable: the last candidate returns or raises
+    async def stream_complete(self, prompt: str, model: str, on_delta: Callable[[str], Awaitable[None]]) -> dict:
+        """Like ``complete`` but forwards text deltas to ``on_delta`` as they arrive.
+
+        Failover only happens before the first delta has been forwarded.
+        """
+        providers, model_name = self.candidates(model)
+        if not providers:
+            raise RuntimeError("No provider configured and fake provider disabled.")
+        last = len(providers) - 1
+        for i, provider in enumerate(providers):
+            parts: List[str] = []
+            try:
+                await self._admit(provider)
+            except CircuitOpen:
+                fake = self._fallback()
+                if i == last and fake is not None and provider is not fake:
+                    self.fallbacks += 1
+                    providers.append(fake); last += 1
+                elif i == last:
+                    raise
+                continue
+            except ProviderBusy:
+                if i == last:
+                    raise
+                continue
+            t0 = time.perf_counter()
+            try:
+                with tracing.span("provider.stream", {"provider": provider.name, "model": model_name}):
+                    async for delta in provider.stream(prompt, model_name):
+                        parts.append(delta)
+                        await on_delta(delta)
+            except asyncio.CancelledError:
+                self._settle(provider, None, 0.0)
+                raise
+            except Exception as e:
+                elapsed = (time.perf_counter() - t0) * 1000
+                self.record(provider.name, elapsed, ok=False)
+                self._settle(provider, False, elapsed)
+                Telemetry.log(provider.name, {"model": model_name, "latency_ms": elapsed, "error": type(e).__name__})
+                if parts or i == last:
+                    raise
+                continue
+            elapsed = (time.perf_counter() - t0) * 1000
+            self.record(provider.name, elapsed)
+            self._settle(provider, True, elapsed)
+            if provider.name != "fake":
+                Telemetry.log(provider.name, {"model": model_name, "latency_ms": elapsed})
+                return {"text": "".join(parts), "provider_meta": {"provider": provider.name, "streamed": True}}
+            return {"text": "".join(parts), "provider_meta": dict(FALLBACK_META)}
+        raise ProviderError("all providers failed")
+    def stats(self) -> dict:
+        out = {}
+        for name, p in self._providers.items():
+            out[name] = {"available": p.available(), "samples": len(self._latency[name]), "p95_ms": self.p95(name),
+                         "error_rate": round(self.error_rate(name), 4)}
+            if name in self._limiters:
+                out[name]["limiter"] = self._limiters[name].stats()
+                out[name]["breaker"] = self._breakers[name].stats()
+        return out
+
+def build_default_registry() -> ProviderRegistry:
+    reg = ProviderRegistry(
+        failover_timeout_ms=settings.provider_failover_timeout_ms, queue_timeout_s=settings.provider_queue_timeout_s,
+        limiter_factory=lambda: AdaptiveLimiter(initial=settings.provider_limit_initial, max_limit=settings.provider_limit_max,
+                                                latency_target_ms=settings.provider_latency_target_ms),
+        breaker_factory=lambda: CircuitBreaker(min_calls=settings.breaker_min_calls, error_rate=settings.breaker_error_rate,
+                                               open_s=settings.breaker_open_s, slow_ms=settings.breaker_slow_ms),
+    )
+    for provider in (OpenAIProvider(), AzureOpenAIProvider(), AnthropicProvider(), FakeProvider()):
+        reg.register(provider)
+    return reg
+
+registry = build_default_registry()
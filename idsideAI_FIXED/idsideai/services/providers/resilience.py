@@ -0,0 +1,122 @@
+from __future__ import annotations
+import asyncio, time
+from collections import deque
+from typing import Deque, Optional
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one provider.
+
+    Each success adds ``1/limit`` (about +1 per full window of calls); each failure, or a
+    success slower than ``latency_target_ms``, multiplies the limit by ``backoff``.
+    ``try_acquire`` rejects callers over the limit immediately; ``acquire`` queues them
+    (first come, first served) for up to ``timeout`` seconds.
+    """
+    def __init__(self, initial: int = 20, min_limit: int = 1, max_limit: int = 200,
+                 backoff: float = 0.9, latency_target_ms: float = 0.0):
+        self.limit = float(initial)
+        self.min_limit, self.max_limit = min_limit, max_limit
+        self.backoff, self.latency_target_ms = backoff, latency_target_ms
+        self.inflight = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+    def try_acquire(self) -> bool:
+        if self.inflight >= int(self.limit) or self._waiters:
+            self.rejected += 1
+            return False
+        self.inflight += 1
+        return True
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take a slot, waiting up to ``timeout`` seconds (None: no bound) for one to free up."""
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            return True
+        if timeout is not None and timeout <= 0:
+            self.rejected += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        granted = False
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            granted = True
+            return True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            if not granted:
+                if waiter.done() and not waiter.cancelled():
+                    self.release(None)  # handed a slot just as we gave up: pass it on
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+    def _wake(self):
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+    def release(self, ok: Optional[bool], latency_ms: float = 0.0):
+        """``ok=None`` releases without adjusting the limit (e.g. the call was cancelled)."""
+        self.inflight -= 1
+        if ok is not None:
+            if not ok or (self.latency_target_ms and latency_ms > self.latency_target_ms):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+    def stats(self) -> dict:
+        return {"limit": int(self.limit), "inflight": self.inflight, "waiting": len(self._waiters), "rejected": self.rejected}
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a window of recent call outcomes.
+
+    Opens when at least ``min_calls`` of the last ``window`` calls are known and the share
+    of failures (errors, or calls slower than ``slow_ms`` when set) reaches ``error_rate``.
+    After ``open_s`` seconds one probe call is let through; its outcome closes or re-opens it.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    def __init__(self, window: int = 20, min_calls: int = 10, error_rate: float = 0.5,
+                 open_s: float = 30.0, slow_ms: float = 0.0):
+        self.min_calls, self.error_rate, self.open_s, self.slow_ms = min_calls, error_rate, open_s, slow_ms
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = self.short_circuited = 0
+    def is_open(self) -> bool:
+        """True while calls would be refused (open and still cooling down, or probe in flight)."""
+        if self.state == self.OPEN:
+            return time.monotonic() - self._opened_at < self.open_s
+        return self.state == self.HALF_OPEN and self._probing
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_s:
+            self.state, self._probing = self.HALF_OPEN, False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.short_circuited += 1
+        return False
+    def record(self, ok: Optional[bool], latency_ms: float = 0.0):
+        """``ok=None`` frees a half-open probe without counting an outcome."""
+        if ok is None:
+            self._probing = False
+            return
+        failed = not ok or bool(self.slow_ms and latency_ms > self.slow_ms)
+        if self.state == self.HALF_OPEN:
+            if failed:
+                self._trip()
+            else:
+                self.state, self._probing = self.CLOSED, False
+                self._outcomes.clear()
+            return
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.error_rate:
+            self._trip()
+    def _trip(self):
+        self.state, self._opened_at, self._probing = self.OPEN, time.monotonic(), False
+        self._outcomes.clear()
+        self.opened += 1
+    def stats(self) -> dict:
+        return {"state": self.state, "opened": self.opened, "short_circuited": self.short_circuited}
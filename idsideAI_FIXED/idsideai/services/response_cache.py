@@ -0,0 +1,88 @@
+import hashlib, json, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import anyio
+from idsideai.config import settings
+from idsideai.metrics import engine_metrics
+
+class ResponseCache:
+    """Provider response cache: in-memory LRU bounded by bytes with TTL, plus an optional SQLite tier.
+
+    Keys hash (provider, model, rendered prompt, parameters). Values are the plain result
+    dicts returned by the provider registry and are shared between callers, so they must
+    be treated as read-only.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_s: float = 3600, disk_path: Optional[str] = None):
+        self.max_bytes, self.ttl_s = max_bytes, ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._bytes = 0
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()
+        self._disk_writes = 0
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            self._disk.commit()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+    @staticmethod
+    def key(provider: str, model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        raw = json.dumps([provider, model, prompt, params or {}], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    async def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key); self.hits += 1
+                engine_metrics.cache_lookup("hit")
+                return entry[2]
+            self._drop(key)
+        if self._disk is not None:
+            row = await anyio.to_thread.run_sync(self._disk_get, key, now)
+            if row is not None:
+                value = json.loads(row[0])
+                self._store(key, value, len(row[0]), row[1])
+                self.hits += 1; self.disk_hits += 1
+                engine_metrics.cache_lookup("disk_hit")
+                return value
+        self.misses += 1
+        engine_metrics.cache_lookup("miss")
+        return None
+    async def set(self, key: str, value: dict):
+        raw = json.dumps(value, default=str)
+        expires = time.time() + self.ttl_s
+        self._store(key, value, len(raw), expires)
+        if self._disk is not None:
+            await anyio.to_thread.run_sync(self._disk_set, key, raw, expires)
+    def _store(self, key: str, value: dict, size: int, expires: float):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            old_key = next(iter(self._entries))
+            self._drop(old_key); self.evictions += 1
+    def _drop(self, key: str):
+        self._bytes -= self._entries.pop(key)[1]
+    def _disk_get(self, key: str, now: float):
+        with self._disk_lock:
+            return self._disk.execute("SELECT value, expires FROM responses WHERE key = ? AND expires > ?", (key, now)).fetchone()
+    def _disk_set(self, key: str, raw: str, expires: float):
+        with self._disk_lock:
+            self._disk.execute("INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)", (key, raw, expires))
+            self._disk_writes += 1
+            if self._disk_writes % 1000 == 0:
+                self._disk.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+            self._disk.commit()
+    def clear(self):
+        self._entries.clear(); self._bytes = 0
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "disk": self._disk is not None}
+
+response_cache = ResponseCache(settings.response_cache_max_bytes, settings.response_cache_ttl_s, settings.response_cache_path)
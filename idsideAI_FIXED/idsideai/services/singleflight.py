@@ -0,0 +1,46 @@
+import asyncio, contextvars
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight task.
+
+    Every waiter awaits the shared task through ``asyncio.shield``, so cancelling or timing
+    out one waiter does not affect the others. The shared task is cancelled only once all
+    of its waiters have gone away. The task runs in ``context`` when given (a copy of it,
+    as for any task), otherwise in a copy of the first caller's context.
+    """
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = self.shared = 0
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None,
+                 context: Optional[contextvars.Context] = None) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = context.run(asyncio.ensure_future, fn()) if context is not None else asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.calls += 1
+        else:
+            self.shared += 1
+        self._waiters[key] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0 and not task.done():
+                    task.cancel()
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters that timed out never saw it
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "calls": self.calls, "shared": self.shared}
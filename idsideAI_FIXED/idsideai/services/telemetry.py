@@ -1,10 +1,175 @@
-from datetime import datetime
-from typing import Dict, Any, List
+import math, os, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Optional
+
+class Event:
+    __slots__ = ("seq", "ts", "provider", "metrics")
+    def __init__(self, seq: int, ts: float, provider: str, metrics: Dict[str, Any]):
+        self.seq, self.ts, self.provider, self.metrics = seq, ts, provider, metrics
+    def as_dict(self) -> Dict[str, Any]:
+        return {"ts": datetime.fromtimestamp(self.ts, timezone.utc).isoformat(), "provider": self.provider, **self.metrics}
+
+class RunContext:
+    """Events and per-step timings attributed to a single decision run."""
+    __slots__ = ("events", "steps")
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.steps: Dict[str, Dict[str, float]] = {}
+    def _step(self, step_id: str) -> Dict[str, float]:
+        timing = self.steps.get(step_id)
+        if timing is None:
+            timing = self.steps[step_id] = {"wall_ms": 0.0, "provider_ms": 0.0}
+        return timing
+
+_current_run: ContextVar[Optional[RunContext]] = ContextVar("idsideai_run", default=None)
+_current_step: ContextVar[Optional[str]] = ContextVar("idsideai_step", default=None)
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch (DDSketch-style) with bounded relative error."""
+    __slots__ = ("_ln_gamma", "_buckets", "_zero", "count", "sum")
+    def __init__(self, rel_err: float = 0.01):
+        self._ln_gamma = math.log((1 + rel_err) / (1 - rel_err))
+        self._buckets: Dict[int, int] = {}
+        self._zero = 0
+        self.count = 0
+        self.sum = 0.0
+    def add(self, v: float):
+        self.count += 1; self.sum += v
+        if v <= 0:
+            self._zero += 1
+            return
+        k = math.ceil(math.log(v) / self._ln_gamma)
+        self._buckets[k] = self._buckets.get(k, 0) + 1
+    def merge(self, other: "QuantileSketch"):
+        self.count += other.count; self.sum += other.sum; self._zero += other._zero
+        for k, n in other._buckets.items():
+            self._buckets[k] = self._buckets.get(k, 0) + n
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self._zero
+        if rank < seen:
+            return 0.0
+        gamma = math.exp(self._ln_gamma)
+        for k in sorted(self._buckets):
+            seen += self._buckets[k]
+            if seen > rank:
+                return 2 * gamma ** k / (gamma + 1)
+        return 2 * gamma ** max(self._buckets) / (gamma + 1)
+
 class Telemetry:
-    _events: List[Dict[str, Any]] = []
+    """Fixed-capacity event ring plus rolling per-provider aggregates.
+
+    ``log`` overwrites the oldest slot once the ring is full, so memory is bounded by
+    ``TELEMETRY_CAPACITY``. Numeric metrics also feed per-provider sketches kept in two
+    generations of ``TELEMETRY_WINDOW_S`` seconds, so aggregates cover the last one to two
+    windows and are served without touching the raw events.
+    """
+    capacity: int = int(os.getenv("TELEMETRY_CAPACITY", "10000"))
+    window_s: float = float(os.getenv("TELEMETRY_WINDOW_S", "300"))
+    _ring: List[Optional[Event]] = [None] * capacity
+    _seq: int = 0
+    _current: Dict[str, Dict[str, QuantileSketch]] = {}
+    _previous: Dict[str, Dict[str, QuantileSketch]] = {}
+    _window_start: float = time.monotonic()
+    @classmethod
+    def _rotate(cls, now: float):
+        """Advance the windows to ``now``; generations older than one window are dropped."""
+        windows = int((now - cls._window_start) // cls.window_s)
+        if windows >= 1:
+            cls._previous = cls._current if windows == 1 else {}
+            cls._current = {}
+            cls._window_start += windows * cls.window_s
     @classmethod
     def log(cls, provider: str, metrics: Dict[str, Any]):
-        cls._events.append({"ts": datetime.utcnow().isoformat(), "provider": provider, **metrics})
+        seq = cls._seq
+        event = Event(seq, time.time(), provider, metrics)
+        cls._ring[seq % cls.capacity] = event
+        cls._seq = seq + 1
+        run = _current_run.get()
+        if run is not None:
+            cls._attribute(run, event.as_dict())
+        cls._rotate(time.monotonic())
+        per_metric = cls._current.setdefault(provider, {})
+        per_metric.setdefault("__events__", QuantileSketch()).add(1)
+        for name, value in metrics.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                sketch = per_metric.get(name)
+                if sketch is None:
+                    sketch = per_metric[name] = QuantileSketch()
+                sketch.add(value)
+    @staticmethod
+    def _attribute(run: RunContext, record: Dict[str, Any]):
+        step_id = _current_step.get()
+        if step_id is not None:
+            record["step"] = step_id
+            latency = record.get("latency_ms")
+            if isinstance(latency, (int, float)):
+                run._step(step_id)["provider_ms"] += latency
+        run.events.append(record)
+    @classmethod
+    def attach(cls, records: List[Dict[str, Any]]):
+        """Attribute events captured in another run scope (a shared upstream call) to the current run and step."""
+        run = _current_run.get()
+        if run is not None:
+            for record in records:
+                cls._attribute(run, dict(record))
+    @classmethod
+    @contextmanager
+    def run_scope(cls) -> Iterator[RunContext]:
+        """Attribute every ``log`` call in this context (and tasks spawned from it) to a new run."""
+        run = RunContext()
+        token = _current_run.set(run)
+        try:
+            yield run
+        finally:
+            _current_run.reset(token)
+    @classmethod
+    @contextmanager
+    def step_scope(cls, step_id: str) -> Iterator[None]:
+        token = _current_step.set(step_id)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current_step.reset(token)
+            run = _current_run.get()
+            if run is not None:
+                run._step(step_id)["wall_ms"] += (time.perf_counter() - t0) * 1000
+    @classmethod
+    def cursor(cls) -> int:
+        return cls._seq
+    @classmethod
+    def since(cls, cursor: int) -> List[Dict[str, Any]]:
+        start = max(cursor, cls._seq - cls.capacity, 0)
+        return [cls._ring[i % cls.capacity].as_dict() for i in range(start, cls._seq)]
+    @classmethod
+    def recent(cls, limit: int) -> List[Dict[str, Any]]:
+        return cls.since(cls._seq - max(0, limit))
     @classmethod
     def dump(cls) -> List[Dict[str, Any]]:
-        return list(cls._events)
+        return cls.since(0)
+    @classmethod
+    def aggregates(cls) -> Dict[str, Dict[str, Any]]:
+        cls._rotate(time.monotonic())  # after an idle period the stored windows may be stale
+        merged: Dict[str, Dict[str, QuantileSketch]] = {}
+        for generation in (cls._previous, cls._current):
+            for provider, per_metric in generation.items():
+                target = merged.setdefault(provider, {})
+                for name, sketch in per_metric.items():
+                    target.setdefault(name, QuantileSketch()).merge(sketch)
+        out: Dict[str, Dict[str, Any]] = {}
+        for provider, per_metric in merged.items():
+            events = per_metric.pop("__events__")
+            out[provider] = {"count": events.count, **{
+                name: {"count": s.count, "sum": s.sum, "p50": s.quantile(0.5), "p95": s.quantile(0.95), "p99": s.quantile(0.99)}
+                for name, s in per_metric.items()}}
+        return out
+    @classmethod
+    def reset(cls):
+        cls._ring = [None] * cls.capacity
+        cls._seq = 0
+        cls._current, cls._previous, cls._window_start = {}, {}, time.monotonic()
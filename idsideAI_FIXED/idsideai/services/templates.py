@@ -0,0 +1,85 @@
+from collections.abc import Mapping
+from string import Formatter
+from typing import FrozenSet, List, Optional, Tuple, Union
+
+_formatter = Formatter()
+
+def split_field_name(field: str) -> Tuple[str, Tuple[Tuple[bool, Union[int, str]], ...]]:
+    """Split ``a.b[0][key]`` into ``("a", ((True, "b"), (False, 0), (False, "key")))`` as ``str.format`` does.
+
+    Each lookup is ``(is_attr, key)``; all-decimal index keys become ints.
+    """
+    end = min((i for i in (field.find("."), field.find("[")) if i >= 0), default=len(field))
+    root, i = field[:end], end
+    lookups: List[Tuple[bool, Union[int, str]]] = []
+    while i < len(field):
+        if field[i] == ".":
+            j = min((k for k in (field.find(".", i + 1), field.find("[", i + 1)) if k >= 0), default=len(field))
+            if j == i + 1:
+                raise ValueError("Empty attribute in format string")
+            lookups.append((True, field[i + 1:j]))
+        elif field[i] == "[":
+            j = field.find("]", i + 1)
+            if j < 0:
+                raise ValueError("Missing ']' in format string")
+            if j == i + 1:
+                raise ValueError("Empty attribute in format string")
+            key = field[i + 1:j]
+            lookups.append((False, int(key) if key.isdecimal() else key))
+            j += 1
+            if j < len(field) and field[j] not in ".[":
+                raise ValueError("Only '.' or '[' may follow ']' in format field specifier")
+        else:
+            raise ValueError("Only '.' or '[' may follow ']' in format field specifier")
+        i = j
+    return root, tuple(lookups)
+
+class PromptTemplate:
+    """A prompt string parsed once into literal text and placeholder lookups.
+
+    Placeholders follow ``str.format`` syntax. ``{step.field}`` reads a key from a dict
+    (typically an earlier step's result) and falls back to attribute access, so
+    ``{summarise.text}`` works on step outputs. Templates without attribute access render
+    through ``str.format_map`` on the live context, which avoids copying it.
+    """
+    __slots__ = ("source", "roots", "_parts", "_fast")
+    def __init__(self, source: str):
+        self.source = source
+        parts = []
+        fast = True
+        for literal, field, conversion, spec in _formatter.parse(source):
+            if field is None:
+                parts.append((literal, None, None, None, None))
+                continue
+            if field == "" or field.isdigit():
+                raise ValueError(f"positional placeholder '{{{field}}}' is not supported in prompts")
+            if spec and "{" in spec:
+                raise ValueError(f"nested placeholders in format spec of '{{{field}}}' are not supported")
+            root, lookups = split_field_name(field)
+            if any(is_attr for is_attr, _ in lookups):
+                fast = False
+            parts.append((literal, root, lookups, conversion, spec or ""))
+        self._parts: Tuple = tuple(parts)
+        self._fast = fast
+        self.roots: FrozenSet[str] = frozenset(p[1] for p in parts if p[1] is not None)
+    def render(self, context: Mapping) -> str:
+        if self._fast:
+            return self.source.format_map(context)
+        out = []
+        for literal, root, lookups, conversion, spec in self._parts:
+            out.append(literal)
+            if root is None:
+                continue
+            value = context[root]
+            for is_attr, key in lookups:
+                if is_attr and not isinstance(value, Mapping):
+                    value = getattr(value, key)
+                else:
+                    value = value[key]
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            out.append(format(value, spec))
+        return "".join(out)
+
+def compile_template(source: Optional[str]) -> PromptTemplate:
+    return PromptTemplate(source or "")
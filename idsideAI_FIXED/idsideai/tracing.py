@@ -0,0 +1,176 @@
+"""OpenTelemetry tracing for HTTP requests, decision runs, steps and provider calls.
+
+Tracing is off until ``configure`` (or ``init_from_env`` at app startup) installs a tracer;
+until then ``span`` returns a shared no-op context manager, and nothing here requires the
+opentelemetry packages to be installed.
+
+Sampling is two-stage. A head sampler keeps ``ratio`` of traces (respecting the caller's
+``traceparent`` decision). When ``slow_ms`` is set, the other traces are still recorded
+(not exported) and ``TailSamplingProcessor`` exports them after all, whole, if their local
+root span failed or took at least ``slow_ms``.
+"""
+import os, threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from idsideai.metrics import route_template
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+    from opentelemetry.sdk.trace.sampling import Decision, Sampler, SamplingResult, TraceIdRatioBased
+    from opentelemetry.trace import SpanContext, SpanKind, StatusCode, TraceFlags
+    _OTEL = True
+except ImportError:  # opentelemetry-sdk not installed: tracing stays a no-op
+    _OTEL = False
+    SpanProcessor = Sampler = object
+
+_NOOP = nullcontext()
+_tracer = None
+_provider = None
+
+def enabled() -> bool:
+    return _tracer is not None
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """Context manager for a child span of the current one; a no-op while tracing is off."""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+class HeadSampler(Sampler):
+    """Parent-based ratio sampler that records, rather than drops, unsampled traces when asked to."""
+    def __init__(self, ratio: float, record_unsampled: bool = False):
+        self._ratio = TraceIdRatioBased(ratio)
+        self._unsampled = Decision.RECORD_ONLY if record_unsampled else Decision.DROP
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        parent = trace.get_current_span(parent_context).get_span_context()
+        if parent.is_valid:
+            sampled = parent.trace_flags.sampled
+        else:
+            sampled = self._ratio.should_sample(parent_context, trace_id, name).decision is Decision.RECORD_AND_SAMPLE
+        state = parent.trace_state if parent.is_valid else None
+        if sampled:
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, state)
+        return SamplingResult(self._unsampled, None, state)
+    def get_description(self) -> str:
+        return f"HeadSampler{{{self._ratio.get_description()}}}"
+
+def _as_sampled(s: "ReadableSpan") -> "ReadableSpan":
+    ctx = s.context
+    return ReadableSpan(
+        name=s.name, parent=s.parent, resource=s.resource, attributes=s.attributes, events=s.events,
+        links=s.links, kind=s.kind, status=s.status, start_time=s.start_time, end_time=s.end_time,
+        instrumentation_scope=s.instrumentation_scope,
+        context=SpanContext(ctx.trace_id, ctx.span_id, ctx.is_remote, TraceFlags(TraceFlags.SAMPLED), ctx.trace_state),
+    )
+
+class TailSamplingProcessor(SpanProcessor):
+    """Passes head-sampled spans to ``delegate``; buffers unsampled ones per trace.
+
+    When an unsampled trace's local root ends with an error status or after ``slow_ms``,
+    its buffered spans are marked sampled and handed to ``delegate``; otherwise they are
+    discarded. At most ``max_traces`` traces are buffered (oldest evicted first).
+    """
+    def __init__(self, delegate: "SpanProcessor", slow_ms: float, max_traces: int = 2048):
+        self.delegate, self.slow_ms, self.max_traces = delegate, slow_ms, max_traces
+        self._pending: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.kept = self.discarded = self.evicted = 0
+    def on_start(self, span, parent_context=None):
+        self.delegate.on_start(span, parent_context=parent_context)
+    def on_end(self, span: "ReadableSpan"):
+        if span.context.trace_flags.sampled:
+            return self.delegate.on_end(span)
+        trace_id = span.context.trace_id
+        with self._lock:
+            if span.parent is not None and not span.parent.is_remote:
+                buffered = self._pending.get(trace_id)
+                if buffered is None:
+                    buffered = self._pending[trace_id] = []
+                    if len(self._pending) > self.max_traces:
+                        self._pending.popitem(last=False); self.evicted += 1
+                buffered.append(span)
+                return
+            buffered = self._pending.pop(trace_id, [])
+        slow = (span.end_time - span.start_time) / 1e6 >= self.slow_ms
+        if span.status.status_code is StatusCode.ERROR or slow:
+            self.kept += 1
+            for s in buffered + [span]:
+                self.delegate.on_end(_as_sampled(s))
+        else:
+            self.discarded += 1
+    def shutdown(self):
+        self.delegate.shutdown()
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+def configure(exporter: "SpanExporter", ratio: float = 0.1, slow_ms: float = 1000.0,
+              service_name: str = "idsideai") -> bool:
+    """Install a tracer exporting through a BatchSpanProcessor. Returns False without the SDK."""
+    global _tracer, _provider
+    if not _OTEL:
+        return False
+    shutdown()
+    _provider = TracerProvider(sampler=HeadSampler(ratio, record_unsampled=slow_ms > 0),
+                               resource=Resource.create({"service.name": service_name}))
+    processor = BatchSpanProcessor(exporter)
+    _provider.add_span_processor(TailSamplingProcessor(processor, slow_ms) if slow_ms > 0 else processor)
+    _tracer = _provider.get_tracer("idsideai")
+    return True
+
+def init_from_env() -> bool:
+    """Enable OTLP export when OTEL_EXPORTER_OTLP_ENDPOINT is set (see docs/TELEMETRY.md)."""
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("OTEL_SDK_DISABLED", "false").lower() == "true":
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        print(f"OTLP exporter not installed, tracing disabled: {e}")
+        return False
+    return configure(OTLPSpanExporter(),  # endpoint and headers come from the standard OTEL_* env vars
+                     ratio=float(os.getenv("OTEL_TRACES_SAMPLER_ARG", "0.1")),
+                     slow_ms=float(os.getenv("OTEL_TAIL_SLOW_MS", "1000")),
+                     service_name=os.getenv("OTEL_SERVICE_NAME", "idsideai"))
+
+def force_flush() -> bool:
+    return _provider.force_flush() if _provider is not None else True
+
+def shutdown():
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = _provider = None
+
+class TracingMiddleware:
+    """Server span per HTTP request, continuing an incoming ``traceparent``.
+
+    The span is renamed to ``"<METHOD> <route template>"`` once routing has matched.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if _tracer is None or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        with _tracer.start_as_current_span(f"{scope['method']} {scope['path']}", context=propagate.extract(carrier),
+                                           kind=SpanKind.SERVER,
+                                           attributes={"http.request.method": scope["method"], "url.path": scope["path"]}) as s:
+            status = 500
+            async def send_traced(message: Message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                await send(message)
+            try:
+                await self.app(scope, receive, send_traced)
+            finally:
+                route = route_template(scope)
+                s.update_name(f"{scope['method']} {route}")
+                s.set_attribute("http.route", route)
+                s.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    s.set_status(StatusCode.ERROR)
@@ -0,0 +1,61 @@
+"""Response encoding throughput for the run and telemetry endpoints: FastAPI default vs FastRoute.
+
+Usage: python perf/bench_json_responses.py [requests]
+
+"default" is an APIRouter with JSONResponse (jsonable_encoder + stdlib json); "fast" is the
+FastRoute/FastJSONResponse pair idsideai.main and backend.app use. Payloads are real: a
+20-step plan run on the fake provider and the resulting /telemetry body. Requests are
+driven straight through the ASGI app, so the numbers are routing plus encoding.
+"""
+import asyncio, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import APIRouter, FastAPI
+from idsideai.responses import FastJSONResponse, FastRoute
+from idsideai.services.dsl import parse_sdl
+from idsideai.services.engine import run_plan
+from idsideai.services.plan_cache import compile_spec
+from idsideai.services.telemetry import Telemetry
+
+SDL = "name: bench\nsteps:\n" + "".join(f"  - id: s{i}\n    type: prompt\n    prompt: \"Step {i}: {{text}}\"\n"
+                                         + (f"    next: s{i + 1}\n" if i < 19 else "") for i in range(20))
+
+def build(fast: bool, run_result: dict) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse) if fast else FastAPI()
+    router = APIRouter(route_class=FastRoute) if fast else APIRouter()
+    @router.post("/run")
+    async def run():
+        return run_result
+    @router.get("/telemetry")
+    async def telemetry():
+        return {"events": Telemetry.recent(1000), "aggregates": Telemetry.aggregates()}
+    app.include_router(router)
+    return app
+
+async def drive(app, method: str, path: str, n: int):
+    scope = {"type": "http", "method": method, "path": path, "raw_path": path.encode(), "query_string": b"",
+             "headers": [(b"host", b"bench")], "scheme": "http", "server": ("bench", 80), "http_version": "1.1"}
+    size = 0
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - start, size // n
+
+async def main(n: int):
+    plan = compile_spec(parse_sdl(SDL))
+    for i in range(50):  # fills the telemetry ring so /telemetry returns a realistic body
+        result = await run_plan(plan, {"text": f"input {i}"})
+    apps = {"default": build(False, result), "fast": build(True, result)}
+    for method, path in (("POST", "/run"), ("GET", "/telemetry")):
+        for name, app in apps.items():
+            await drive(app, method, path, 10)
+            elapsed, size = await drive(app, method, path, n)
+            print(f"{method} {path:<11} {name:<8} {n / elapsed:9.0f} req/s {size:7d} B  {n * size / elapsed / 1e6:8.1f} MB/s")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,100 @@
+"""Per-request overhead of the security middleware stack, BaseHTTPMiddleware vs pure ASGI.
+
+Usage: python perf/bench_middleware.py [requests]
+
+Requests are driven straight through the ASGI callable (no server, no HTTP client), so
+the numbers are the cost of the middleware layers plus a trivial endpoint. "before" are
+the BaseHTTPMiddleware implementations that security_toolkit.hardening used to ship.
+"""
+import asyncio, os, sys, time, uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from security_toolkit import hardening
+
+class OldRequestID(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        req_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+        request.state.request_id = req_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = req_id
+        return response
+
+class OldMaxBody(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        if int(request.headers.get("content-length", "0")) > hardening.DEFAULT_MAX_BODY:
+            return Response(status_code=413)
+        return await call_next(request)
+
+class OldStripServer(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for h in ["server", "x-powered-by"]:
+            if h in response.headers:
+                del response.headers[h]
+        response.headers["Referrer-Policy"] = "no-referrer"
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["Cross-Origin-Opener-Policy"] = "same-origin"
+        response.headers["Cross-Origin-Embedder-Policy"] = "require-corp"
+        response.headers["Cross-Origin-Resource-Policy"] = "same-origin"
+        response.headers["Permissions-Policy"] = "accelerometer=(), camera=(), geolocation=(), gyroscope=(), microphone=(), usb=(), fullscreen=(self)"
+        return response
+
+async def plain(request):
+    return PlainTextResponse("ok")
+
+async def stream(request):
+    async def gen():
+        for _ in range(10):
+            yield b"x" * 1024
+    return StreamingResponse(gen())
+
+def build(middlewares):
+    app = Starlette(routes=[Route("/plain", plain), Route("/stream", stream)])
+    for mw in middlewares:
+        app.add_middleware(mw)
+    return app
+
+STACKS = {
+    "none": [],
+    "before": [OldMaxBody, OldRequestID, OldStripServer],
+    "after": [hardening.MaxBodySizeMiddleware, hardening.RequestIDMiddleware, hardening.StripServerHeaderMiddleware],
+}
+
+async def drive(app, path: str, n: int) -> float:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+    idle = asyncio.Event()  # never set: the client stays connected, as under a real server
+    async def request():
+        sent = False
+        async def receive():
+            nonlocal sent
+            if sent:
+                await idle.wait()
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await app(dict(scope), receive, send)
+    async def send(message):
+        pass
+    for _ in range(min(n, 200)):  # warm up
+        await request()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await request()
+    return (time.perf_counter() - t0) / n * 1e6
+
+async def main(n: int):
+    print(f"{'stack':<8} {'path':<8} {'us/req':>8} {'overhead':>9}")
+    for path in ("/plain", "/stream"):
+        base = None
+        for name, mws in STACKS.items():
+            us = await drive(build(mws), path, n)
+            base = us if base is None else base
+            print(f"{name:<8} {path:<8} {us:8.1f} {us - base:9.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,95 @@
+"""Concurrent run logging: SQLAlchemy's default engine vs idsideai.database.make_engine.
+
+Usage: python perf/bench_run_logging.py [runs] [concurrency] [readers] [postgresql:// url]
+
+Each simulated run commits one ExecutionLog row (the write a worker does per decision
+run) while ``readers`` tasks keep querying the latest rows, as the API's read endpoints
+do. Without a URL it runs against fresh SQLite files in a temporary directory. To
+benchmark the asyncpg pool, pass a Postgres URL (or set BENCH_DATABASE_URL); the app's
+own POSTGRES_URI is never used. Tables are created in a throwaway ``bench_*`` schema
+that is dropped afterwards, so the database's own tables are not touched.
+"""
+import asyncio, os, statistics, sys, tempfile, time, uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import insert, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from idsideai.database import Base, async_url, make_engine
+from idsideai.models import ExecutionLog
+
+OUTPUT = {"trace": [{"id": f"s{i}", "type": "prompt", "result": {"text": "x" * 200}} for i in range(5)]}
+
+async def run(name: str, writer: AsyncEngine, reader: AsyncEngine, runs: int, concurrency: int, readers: int,
+              schema: str = None):
+    if schema is not None:  # unqualified table names resolve to the throwaway schema
+        opts = {"schema_translate_map": {None: schema}}
+        translated = writer.execution_options(**opts)
+        reader = translated if reader is writer else reader.execution_options(**opts)
+        writer = translated
+        async with writer.begin() as conn:
+            await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Writes, Reads = async_sessionmaker(writer), async_sessionmaker(reader)
+    errors, read_ms = 0, []
+    todo = iter(range(runs))
+    async def log_runs():
+        nonlocal errors
+        for i in todo:
+            try:
+                async with Writes() as s:
+                    await s.execute(insert(ExecutionLog).values(input_payload={"i": i}, output_payload=OUTPUT, telemetry={"ms": i}))
+                    await s.commit()
+            except Exception:
+                errors += 1
+    async def read_recent(done: asyncio.Event):
+        nonlocal errors
+        while not done.is_set():
+            t0 = time.perf_counter()
+            try:
+                async with Reads() as s:
+                    (await s.execute(select(ExecutionLog).order_by(ExecutionLog.id.desc()).limit(50))).all()
+                read_ms.append((time.perf_counter() - t0) * 1000)
+            except Exception:
+                errors += 1
+            await asyncio.sleep(0.01)  # a steady stream of reads, not a busy loop
+    try:
+        done = asyncio.Event()
+        reading = [asyncio.create_task(read_recent(done)) for _ in range(readers)]
+        start = time.perf_counter()
+        await asyncio.gather(*(log_runs() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set(); await asyncio.gather(*reading)
+    finally:
+        if schema is not None:
+            async with writer.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        await writer.dispose()
+        if reader is not writer:
+            await reader.dispose()
+    q = statistics.quantiles(read_ms, n=100) if len(read_ms) > 1 else [0.0] * 99
+    print(f"{name:<22} {runs / elapsed:8.0f} runs/s  errors {errors:4d}  reads {len(read_ms):6d}  "
+          f"read p50 {q[49]:6.1f} ms  p99 {q[98]:6.1f} ms")
+
+async def main(runs: int, concurrency: int, readers: int, url: str = None):
+    if url is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            default = create_async_engine(f"sqlite+aiosqlite:///{tmp}/default.db")
+            await run("sqlite default", default, default, runs, concurrency, readers)
+            tuned = f"sqlite+aiosqlite:///{tmp}/tuned.db"
+            await run("sqlite tuned", make_engine(tuned), make_engine(tuned, read_only=True), runs, concurrency, readers)
+        return
+    url = async_url(url)
+    if make_url(url).get_backend_name() != "postgresql":
+        sys.exit("only postgresql:// URLs are benchmarked against a server; SQLite runs in a temporary directory")
+    schema = f"bench_{uuid.uuid4().hex[:12]}"
+    default = create_async_engine(url)
+    await run("postgresql default", default, default, runs, concurrency, readers, schema + "_default")
+    tuned = make_engine(url)
+    await run("postgresql tuned", tuned, tuned, runs, concurrency, readers, schema + "_tuned")
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    asyncio.run(main(runs, concurrency, readers, sys.argv[4] if len(sys.argv) > 4 else os.getenv("BENCH_DATABASE_URL")))
@@ -0,0 +1,44 @@
+"""Microbenchmark: cost of applying the security headers to one response start message.
+
+Usage: python perf/bench_security_headers.py [iterations]
+
+"per-key" is the previous StripServerHeaderMiddleware logic (two lookups/deletes and seven
+assignments through MutableHeaders); "block" is the current single-pass merge of the
+precomputed raw header list.
+"""
+import os, sys, timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from starlette.datastructures import MutableHeaders
+from security_toolkit.hardening import build_security_headers
+
+RESPONSE_HEADERS = [(b"content-type", b"application/json"), (b"content-length", b"27"),
+                    (b"server", b"uvicorn"), (b"x-request-id", b"0123456789abcdef0123456789abcdef")]
+
+def per_key():
+    message = {"type": "http.response.start", "status": 200, "headers": list(RESPONSE_HEADERS)}
+    headers = MutableHeaders(scope=message)
+    for h in ["server", "x-powered-by"]:
+        if h in headers:
+            del headers[h]
+    headers["Referrer-Policy"] = "no-referrer"
+    headers["X-Content-Type-Options"] = "nosniff"
+    headers["X-Frame-Options"] = "DENY"
+    headers["Cross-Origin-Opener-Policy"] = "same-origin"
+    headers["Cross-Origin-Embedder-Policy"] = "require-corp"
+    headers["Cross-Origin-Resource-Policy"] = "same-origin"
+    headers["Permissions-Policy"] = "accelerometer=(), camera=(), geolocation=(), gyroscope=(), microphone=(), usb=(), fullscreen=(self)"
+    return message
+
+STATIC = build_security_headers()
+DROP = frozenset(name for name, _ in STATIC) | {b"server", b"x-powered-by"}
+
+def block():
+    message = {"type": "http.response.start", "status": 200, "headers": list(RESPONSE_HEADERS)}
+    message["headers"] = [h for h in message.get("headers", ()) if h[0].lower() not in DROP] + STATIC
+    return message
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for name, fn in (("per-key", per_key), ("block", block)):
+        best = min(timeit.repeat(fn, number=n, repeat=5)) / n * 1e9
+        print(f"{name:<8} {best:8.0f} ns/response")
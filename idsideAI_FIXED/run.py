@@ -17,10 +17,12 @@ async def ensure_database():
     try:
         from idsideai.database import engine, Base
         from idsideai.models import DecisionModel, ExecutionLog
+        from idsideai.migrations import upgrade_schema
         
         # Create tables if they don't exist
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade_schema)  # column changes create_all does not apply
         print("✅ Database ready!")
         
     except Exception as e:
@@ -1,16 +1,16 @@
 # Comprehensive security hardening for FastAPI/Starlette apps
 import os
-from typing import Callable
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp, Receive, Scope, Send
-from starlette.requests import Request
-from starlette.responses import Response
+from typing import List, Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from starlette.middleware import Middleware
 # from starlette.middleware.security import SecurityMiddleware  # Not available
 from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.cors import CORSMiddleware
+from security_toolkit.ratelimit import RateLimiter, RateLimitMiddleware, build_store
 import uuid
 
 DEFAULT_MAX_BODY = int(os.getenv("MAX_REQUEST_BODY_BYTES", "10485760"))  # 10 MB
@@ -18,42 +18,122 @@ DEFAULT_ALLOWED_HOSTS = [h.strip() for h in os.getenv("ALLOWED_HOSTS", "localhos
 DEFAULT_CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()]
 RATE_LIMITS_BURST = os.getenv("RATE_LIMITS_BURST", "10/second")
 RATE_LIMITS_SUSTAINED = os.getenv("RATE_LIMITS_SUSTAINED", "60/minute")
+RATE_LIMIT_BATCH_FRACTION = float(os.getenv("RATE_LIMIT_BATCH_FRACTION", "0.1"))
+RATE_LIMIT_MIN_BATCH = int(os.getenv("RATE_LIMIT_MIN_BATCH", "5"))
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
-        req_id = request.headers.get("x-request-id") or uuid.uuid4().hex
-        # attach to state and response
-        request.state.request_id = req_id
-        response: Response = await call_next(request)
-        response.headers["X-Request-ID"] = req_id
-        return response
-
-class MaxBodySizeMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
-        # deny if content-length exceeds cap (best-effort; still stream-guards)
+class PayloadTooLarge(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=413, detail="Payload too large")
+
+_TOO_LARGE_BODY = b'{"detail":"Payload too large"}'
+
+async def _send_too_large(send: Send):
+    await send({"type": "http.response.start", "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(_TOO_LARGE_BODY)).encode())]})
+    await send({"type": "http.response.body", "body": _TOO_LARGE_BODY})
+
+# The middlewares below are plain ASGI callables: they wrap ``send``/``receive`` instead of
+# going through BaseHTTPMiddleware, so streaming responses pass through untouched and no
+# extra task is spawned per request.
+
+class RequestIDMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        req_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex
+        # attach to state (request.state.request_id) and response
+        scope.setdefault("state", {})["request_id"] = req_id
+        raw = req_id.encode("latin-1")
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                headers = [h for h in message.get("headers", ()) if h[0].lower() != b"x-request-id"]
+                headers.append((b"x-request-id", raw))
+                message["headers"] = headers
+            await send(message)
+        await self.app(scope, receive, send_with_id)
+
+class MaxBodySizeMiddleware:
+    """Rejects bodies over ``max_body`` bytes with 413.
+
+    A declared ``content-length`` over the cap is refused up front; otherwise the bytes
+    actually received are counted, so chunked uploads and lying clients are capped too.
+    """
+    def __init__(self, app: ASGIApp, max_body: int = DEFAULT_MAX_BODY):
+        self.app = app
+        self.max_body = max_body
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        cl = Headers(scope=scope).get("content-length")
+        if cl is not None and cl.isdigit() and int(cl) > self.max_body:
+            return await _send_too_large(send)
+        received = 0
+        started = False
+        async def counted_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    raise PayloadTooLarge()
+            return message
+        async def tracked_send(message: Message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
         try:
-            cl = int(request.headers.get("content-length", "0"))
-            if cl > DEFAULT_MAX_BODY:
-                return Response(status_code=413, content='{"detail":"Payload too large"}', media_type="application/json")
-        except Exception as e:
-            print(f"Error in MaxBodySizeMiddleware: {e}")
-        return await call_next(request)
-
-class StripServerHeaderMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
-        response: Response = await call_next(request)
-        # Remove or overwrite identifying headers
-        for h in ["server", "x-powered-by"]:
-            if h in response.headers:
-                del response.headers[h]
-        response.headers["Referrer-Policy"] = "no-referrer"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["Cross-Origin-Opener-Policy"] = "same-origin"
-        response.headers["Cross-Origin-Embedder-Policy"] = "require-corp"
-        response.headers["Cross-Origin-Resource-Policy"] = "same-origin"
-        response.headers["Permissions-Policy"] = "accelerometer=(), camera=(), geolocation=(), gyroscope=(), microphone=(), usb=(), fullscreen=(self)"
-        return response
+            await self.app(scope, counted_receive, tracked_send)
+        except PayloadTooLarge:
+            if started:
+                raise
+            await _send_too_large(send)
+
+def _app_setting(name: str) -> Optional[str]:
+    try:
+        from idsideai.settings import settings as app_settings
+        return getattr(app_settings, name)
+    except Exception:  # pydantic-settings missing or required settings unset
+        return os.getenv(name)
+
+def _csp() -> Optional[str]:
+    return _app_setting("CSP")
+
+def build_security_headers() -> List[Tuple[bytes, bytes]]:
+    """Static response headers as raw ASGI pairs, computed once per middleware instance."""
+    headers = {
+        "referrer-policy": os.getenv("REFERRER_POLICY", "no-referrer"),
+        "x-content-type-options": "nosniff",
+        "x-frame-options": os.getenv("X_FRAME_OPTIONS", "DENY"),
+        "cross-origin-opener-policy": "same-origin",
+        "cross-origin-embedder-policy": os.getenv("COEP", "require-corp"),
+        "cross-origin-resource-policy": "same-origin",
+        "permissions-policy": os.getenv("PERMISSIONS_POLICY", "accelerometer=(), camera=(), geolocation=(), gyroscope=(), microphone=(), usb=(), fullscreen=(self)"),
+        "content-security-policy": _csp(),
+        "strict-transport-security": os.getenv("STRICT_TRANSPORT_SECURITY"),
+    }
+    return [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items() if v]
+
+class StripServerHeaderMiddleware:
+    """Drops identifying headers and sets the security header block in one pass.
+
+    Any header the app set under one of the managed names is replaced, not duplicated.
+    """
+    def __init__(self, app: ASGIApp, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+        self.app = app
+        self.headers = build_security_headers() if headers is None else headers
+        self._drop = frozenset(name for name, _ in self.headers) | {b"server", b"x-powered-by"}
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        drop, static = self._drop, self.headers
+        async def send_hardened(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [h for h in message.get("headers", ()) if h[0].lower() not in drop] + static
+            await send(message)
+        await self.app(scope, receive, send_hardened)
 
 def wire_security_full(app):
     # HTTPS redirect (enable if behind TLS or proxy that sets X-Forwarded-Proto)
@@ -84,20 +164,10 @@ def wire_security_full(app):
     app.add_middleware(RequestIDMiddleware)
     app.add_middleware(StripServerHeaderMiddleware)
 
-    # Rate limiting (burst + sustained) if slowapi present
-    try:
-        from slowapi import Limiter
-        from slowapi.util import get_remote_address
-        from slowapi.errors import RateLimitExceeded
-        from slowapi.middleware import SlowAPIMiddleware
-
-        limiter = Limiter(key_func=get_remote_address, default_limits=[RATE_LIMITS_BURST, RATE_LIMITS_SUSTAINED])
-        app.state.limiter = limiter
-        app.add_exception_handler(RateLimitExceeded, lambda req, exc: (
-            __import__('fastapi').responses.JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"})
-        ))
-        app.add_middleware(SlowAPIMiddleware)
-    except Exception as e:
-        print(f"slowapi not installed, rate limiting disabled: {e}")
+    # Rate limiting (burst + sustained), shared across workers when REDIS_URL is set
+    limiter = RateLimiter([RATE_LIMITS_BURST, RATE_LIMITS_SUSTAINED], store=build_store(_app_setting("REDIS_URL")),
+                          batch_fraction=RATE_LIMIT_BATCH_FRACTION, min_batch=RATE_LIMIT_MIN_BATCH)
+    app.state.limiter = limiter
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
 
     return app
@@ -0,0 +1,193 @@
+# Token-bucket rate limiting shared across workers/replicas through a Redis-compatible store
+import math, re, time
+from typing import Callable, Dict, List, Optional, Tuple
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_limit(text: str) -> Tuple[int, float]:
+    """``"10/second"`` or ``"60 per minute"`` -> (count, period seconds)."""
+    m = re.fullmatch(r"\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*", text)
+    if not m:
+        raise ValueError(f"invalid rate limit: {text!r}")
+    return int(m.group(1)), int(m.group(2) or 1) * _PERIODS[m.group(3)]
+
+Bucket = Tuple[str, int, float]  # (name, capacity, refill rate per second)
+
+class InMemoryStore:
+    """Process-local store with the same semantics as the Redis script; also the test fake.
+
+    A bucket untouched for ``capacity / rate`` seconds is full again, so it is evicted
+    (every ``prune_every`` calls), like the Redis keys' PEXPIRE.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic, prune_every: int = 1024):
+        self.clock = clock
+        self.prune_every = prune_every
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}  # name -> (tokens, updated, idle expiry)
+        self.calls = 0
+    async def take(self, buckets: List[Bucket], requested: int, refund: int = 0) -> Tuple[int, List[float]]:
+        """Refill every bucket (plus ``refund`` unspent tokens), take up to ``requested`` whole
+        tokens from all of them at once; return (granted, tokens left per bucket)."""
+        self.calls += 1
+        now = self.clock()
+        if self.calls % self.prune_every == 0:
+            self.prune(now)
+        tokens = []
+        for name, capacity, rate in buckets:
+            left, ts, _ = self._buckets.get(name, (float(capacity), now, now))
+            tokens.append(min(capacity, left + (now - ts) * rate + refund))
+        granted = min(requested, int(min(tokens)))
+        for (name, capacity, rate), t in zip(buckets, tokens):
+            self._buckets[name] = (t - granted, now, now + capacity / rate)
+        return granted, [t - granted for t in tokens]
+    def prune(self, now: Optional[float] = None) -> int:
+        now = self.clock() if now is None else now
+        before = len(self._buckets)
+        self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+        return before - len(self._buckets)
+
+_TAKE_LUA = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local requested, refund = tonumber(ARGV[1]), tonumber(ARGV[2])
+local tokens, granted = {}, requested
+for i, key in ipairs(KEYS) do
+  local capacity, rate = tonumber(ARGV[2 * i + 1]), tonumber(ARGV[2 * i + 2])
+  local b = redis.call('HMGET', key, 'tokens', 'ts')
+  local t = tonumber(b[1]) or capacity
+  local ts = tonumber(b[2]) or now
+  t = math.min(capacity, t + math.max(0, now - ts) * rate + refund)
+  tokens[i] = t
+  granted = math.min(granted, math.floor(t))
+end
+local out = {granted}
+for i, key in ipairs(KEYS) do
+  local capacity, rate = tonumber(ARGV[2 * i + 1]), tonumber(ARGV[2 * i + 2])
+  local t = tokens[i] - granted
+  redis.call('HSET', key, 'tokens', tostring(t), 'ts', tostring(now))
+  redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+  out[i + 1] = tostring(t)
+end
+return out
+"""
+
+class RedisStore:
+    """Shared bucket state in Redis; all of a client's buckets are refilled and taken from
+    atomically in one Lua script call (bucket names share a ``{key}`` hash tag for Cluster)."""
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis  # optional dependency, only needed when REDIS_URL is set
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(_TAKE_LUA)
+        self.calls = 0
+    async def take(self, buckets: List[Bucket], requested: int, refund: int = 0) -> Tuple[int, List[float]]:
+        self.calls += 1
+        args: list = [requested, refund]
+        for _, capacity, rate in buckets:
+            args += [capacity, rate]
+        out = await self._take(keys=[self.prefix + name for name, _, _ in buckets], args=args)
+        return int(out[0]), [float(t) for t in out[1:]]
+
+class _Lease:
+    __slots__ = ("tokens", "expires")
+    def __init__(self, tokens: int, expires: float):
+        self.tokens, self.expires = tokens, expires
+
+class RateLimiter:
+    """Global token buckets with a local fast path.
+
+    Each (client key, limit) pair is a bucket in ``store`` holding ``count`` tokens that
+    refill over ``period``; every request spends one token from each of the key's buckets.
+    Workers lease tokens for all of a key's limits in one store call, in batches of
+    ``batch_fraction`` of the smallest limit (at least ``min_batch``, at most ``max_batch``
+    and never more than that limit), and spend them locally, so most requests never leave
+    the process. A lease lasts one refill period of the shortest limit (``lease_s``); the
+    tokens left when it lapses go back to the buckets with the key's next lease, so they
+    are not lost. If the store is unreachable the limiter falls back to per-process
+    buckets rather than failing requests.
+    """
+    def __init__(self, limits: List[str], store=None, batch_fraction: float = 0.1, min_batch: int = 5,
+                 max_batch: int = 50, lease_s: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.limits = [parse_limit(l) for l in limits]
+        self.store = store if store is not None else InMemoryStore(clock)
+        self._local = InMemoryStore(clock)
+        smallest = min(count for count, _ in self.limits)
+        self.batch = max(1, min(smallest, max_batch, max(min_batch, int(smallest * batch_fraction))))
+        self.lease_s = lease_s if lease_s is not None else min(period for _, period in self.limits)
+        self.clock = clock
+        self._leases: Dict[str, _Lease] = {}
+        self._hits = 0
+        self.allowed = self.rejected = self.store_errors = 0
+    def _buckets(self, key: str) -> List[Bucket]:
+        return [(f"{{{key}}}:{count}/{period:g}", count, count / period) for count, period in self.limits]
+    async def _lease(self, key: str, refund: int) -> Tuple[int, float]:
+        buckets = self._buckets(key)
+        try:
+            granted, left = await self.store.take(buckets, self.batch, refund)
+        except Exception as e:
+            self.store_errors += 1
+            if self.store_errors == 1:
+                print(f"Rate limit store unavailable, using per-process limits: {e}")
+            granted, left = await self._local.take(buckets, self.batch, refund)
+        if granted:
+            return granted, 0.0
+        return granted, max((1 - t) / rate for (_, _, rate), t in zip(buckets, left) if t < 1)
+    async def hit(self, key: str) -> Tuple[bool, float]:
+        """Consume one request for ``key``; return (allowed, seconds until a retry may pass)."""
+        now = self.clock()
+        self._hits += 1
+        if self._hits % 10000 == 0:
+            self._leases = {k: l for k, l in self._leases.items() if l.expires > now and l.tokens > 0}
+        lease = self._leases.get(key)
+        if lease is not None and lease.expires > now and lease.tokens >= 1:
+            lease.tokens -= 1
+            self.allowed += 1
+            return True, 0.0
+        refund = 0
+        if lease is not None:  # lapsed or spent: hand back what is left with the next lease
+            refund, lease.tokens = lease.tokens, 0
+        granted, retry_after = await self._lease(key, refund)
+        if not granted:
+            self.rejected += 1
+            return False, retry_after
+        now = self.clock()
+        lease = self._leases.get(key)  # another request may have leased meanwhile
+        if lease is None or lease.expires <= now:
+            lease = self._leases[key] = _Lease(0, now + self.lease_s)
+        lease.tokens += granted - 1
+        self.allowed += 1
+        return True, 0.0
+    def stats(self) -> dict:
+        return {"allowed": self.allowed, "rejected": self.rejected, "store_calls": self.store.calls,
+                "store_errors": self.store_errors, "leases": len(self._leases), "batch": self.batch}
+
+def client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "anonymous"
+
+_LIMITED_BODY = b'{"detail":"Rate limit exceeded"}'
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, limiter: RateLimiter, key_func: Callable[[Scope], str] = client_ip,
+                 exempt: Tuple[str, ...] = ()):
+        self.app = app
+        self.limiter, self.key_func, self.exempt = limiter, key_func, exempt
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            return await self.app(scope, receive, send)
+        allowed, retry_after = await self.limiter.hit(self.key_func(scope))
+        if allowed:
+            return await self.app(scope, receive, send)
+        await send({"type": "http.response.start", "status": 429,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(_LIMITED_BODY)).encode()),
+                                (b"retry-after", str(max(1, math.ceil(retry_after))).encode())]})
+        await send({"type": "http.response.body", "body": _LIMITED_BODY})
+
+def build_store(redis_url: Optional[str]):
+    if not redis_url:
+        return InMemoryStore()
+    try:
+        return RedisStore(redis_url)
+    except Exception as e:
+        print(f"redis not available, rate limits are per process: {e}")
+        return InMemoryStore()
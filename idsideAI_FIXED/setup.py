@@ -14,6 +14,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from idsideai.database import engine, Base
 from idsideai.models import DecisionModel, ExecutionLog
+from idsideai.migrations import upgrade_schema
 from idsideai.config import settings
 
 async def setup_database():
@@ -21,6 +22,7 @@ async def setup_database():
     print("Setting up database...")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)  # column changes create_all does not apply
     print("Database setup complete!")
 
 def create_env_file():
@@ -0,0 +1,54 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import pytest_asyncio
+from idsideai import http
+
+class StubServer:
+    """Local HTTP server that answers every POST with ``self.reply`` and records requests."""
+    def __init__(self):
+        self.reply = {}
+        self.sse = None  # list of JSON events to send as a text/event-stream body instead of ``reply``
+        self.status = 200
+        self.requests = []
+        self.peers = set()
+        stub = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("content-length", "0")))
+                stub.requests.append({"path": self.path, "headers": dict(self.headers), "json": json.loads(body or b"{}")})
+                stub.peers.add(self.client_address)
+                if stub.sse is not None:
+                    payload = "".join(f"data: {json.dumps(e)}\n\n" for e in stub.sse).encode() + b"data: [DONE]\n\n"
+                    content_type = "text/event-stream"
+                else:
+                    payload, content_type = json.dumps(stub.reply).encode(), "application/json"
+                self.send_response(stub.status)
+                self.send_header("content-type", content_type)
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            def log_message(self, *args):
+                pass
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 128  # the default backlog of 5 drops bursts of concurrent connects
+        self.httpd = Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    def close(self):
+        self.httpd.shutdown(); self.httpd.server_close()
+
+@pytest.fixture()
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
+
+@pytest_asyncio.fixture()
+async def pooled_client():
+    # The shared client is bound to the event loop that created it.
+    await http.shutdown()
+    yield await http.get_client()
+    await http.shutdown()
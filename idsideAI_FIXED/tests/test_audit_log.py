@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from idsideai.database import Base
+from idsideai.migrations import upgrade_schema
+from idsideai.models import ExecutionLog
+from idsideai.services.audit_log import ExecutionLogWriter
+
+@pytest.mark.asyncio
+async def test_write_behind_batches_and_drains(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'log.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    writer = ExecutionLogWriter(Session, max_queue=1000, batch_size=100, flush_interval=10)
+    assert not await writer.submit(None, {}, {}, {})  # not started: nothing is queued
+    await writer.start()
+    for i in range(250):
+        assert await writer.submit(None, {"i": i}, {"trace": []}, {"events": []})
+    await writer.stop()
+    async with Session() as s:
+        assert await s.scalar(select(func.count()).select_from(ExecutionLog)) == 250
+    assert writer.stats()["written"] == 250 and writer.flushes == 3
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_after_timeout():
+    writer = ExecutionLogWriter(max_queue=1, batch_size=1, flush_interval=10, put_timeout=0.01)
+    async def _stuck_flush(batch):
+        await asyncio.Event().wait()
+    writer._flush = _stuck_flush
+    await writer.start()
+    results = [await writer.submit(None, {}, {}, {}) for _ in range(4)]
+    assert results[:2] == [True, True] and writer.dropped == 2
+    writer._task.cancel()
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_row_inserts(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'log.db'}")
+    event.listen(engine.sync_engine, "connect", lambda c, _: c.execute("PRAGMA foreign_keys=ON"))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    writer = ExecutionLogWriter(Session, batch_size=10, flush_interval=10)
+    await writer.start()
+    for i in range(5):
+        await writer.submit(None if i != 2 else 99, {"i": i}, {}, {})  # model 99 does not exist
+    await writer.stop()
+    async with Session() as s:
+        assert await s.scalar(select(func.count()).select_from(ExecutionLog)) == 4
+    assert writer.written == 4 and writer.failed == 1
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_upgrade_schema_relaxes_old_execution_log_fk(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    async with engine.begin() as conn:  # the schema create_all made before decision_model_id was nullable
+        await conn.execute(text("CREATE TABLE decision_models (id INTEGER PRIMARY KEY, name VARCHAR(200), description TEXT, "
+                                "sdl JSON, version INTEGER, created_at DATETIME)"))
+        await conn.execute(text("CREATE TABLE execution_logs (id INTEGER PRIMARY KEY, decision_model_id INTEGER NOT NULL "
+                                "REFERENCES decision_models (id), input_payload JSON NOT NULL, output_payload JSON NOT NULL, "
+                                "telemetry JSON NOT NULL, created_at DATETIME NOT NULL)"))
+        await conn.execute(text("INSERT INTO decision_models (id, name) VALUES (1, 'm')"))
+        await conn.execute(text("INSERT INTO execution_logs VALUES (1, 1, '{}', '{}', '{}', '2026-01-01 00:00:00')"))
+    async with engine.begin() as conn:
+        assert await conn.run_sync(upgrade_schema) == ["execution_log_model_fk"]
+        assert await conn.run_sync(upgrade_schema) == []
+        column = await conn.run_sync(lambda c: next(col for col in inspect(c).get_columns("execution_logs")
+                                                    if col["name"] == "decision_model_id"))
+        assert column["nullable"]
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.execute(text("DELETE FROM decision_models WHERE id = 1"))
+        assert (await conn.execute(text("SELECT id, decision_model_id FROM execution_logs"))).all() == [(1, None)]
+    await engine.dispose()
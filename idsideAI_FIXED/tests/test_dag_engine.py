@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from idsideai.services import engine
+from idsideai.services.dsl import parse_sdl
+from idsideai.services.plan_cache import compile_spec
+
+FAN_OUT = """name: scoring
+steps:
+  - id: a
+    type: prompt
+    prompt: "A {text}"
+  - id: b
+    type: prompt
+    prompt: "B {text}"
+  - id: c
+    type: prompt
+    prompt: "C {text}"
+  - id: total
+    type: decision
+    depends_on: [a, b, c]
+"""
+
+def test_compile_deps():
+    plan = compile_spec(parse_sdl(FAN_OUT))
+    assert plan.deps == {"a": set(), "b": set(), "c": set(), "total": {"a", "b", "c"}}
+    assert plan.dependents == {"a": ("total",), "b": ("total",), "c": ("total",), "total": ()}
+
+def test_compile_rejects_cycles_and_unknown_deps():
+    with pytest.raises(ValueError, match="cycle"):
+        compile_spec(parse_sdl(FAN_OUT.replace("    type: prompt\n    prompt: \"A", "    type: prompt\n    depends_on: [total]\n    prompt: \"A")))
+    with pytest.raises(ValueError, match="unknown"):
+        compile_spec(parse_sdl(FAN_OUT.replace("[a, b, c]", "[a, zz]")))
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit,expected_peak", [(None, 3), (2, 2)])
+async def test_ready_steps_run_concurrently(monkeypatch, limit, expected_peak):
+    active = peak = 0
+    async def fake_execute(step, context):
+        nonlocal active, peak
+        active += 1; peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {"deps_seen": sorted(k for k in ("a", "b", "c") if k in context)}
+    monkeypatch.setattr(engine, "execute_step", fake_execute)
+    out = await engine.run_plan(compile_spec(parse_sdl(FAN_OUT)), {"text": "x"}, max_concurrency=limit)
+    assert peak == expected_peak
+    assert [t["id"] for t in out["trace"]] == ["a", "b", "c", "total"]
+    assert out["trace"][-1]["result"]["deps_seen"] == ["a", "b", "c"]
+
+CHAIN_AND_SLOW = """name: chain
+steps:
+  - id: a
+    type: tool
+  - id: b
+    type: tool
+    depends_on: [a]
+  - id: c
+    type: tool
+    depends_on: [b]
+  - id: slow
+    type: tool
+"""
+
+@pytest.mark.asyncio
+async def test_steps_start_when_their_own_dependencies_finish(monkeypatch):
+    delays = {"a": 0.05, "b": 0.05, "c": 0.05, "slow": 0.2}
+    async def fake_execute(step, context):
+        await asyncio.sleep(delays[step.id])
+        return {}
+    monkeypatch.setattr(engine, "execute_step", fake_execute)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    out = await engine.run_plan(compile_spec(parse_sdl(CHAIN_AND_SLOW)), {})
+    elapsed = loop.time() - t0
+    # Waves would take slow + b + c = 0.3s; the chain runs alongside slow instead.
+    assert elapsed < 0.27
+    assert [t["id"] for t in out["trace"]] == ["a", "b", "c", "slow"]
+
+@pytest.mark.asyncio
+async def test_failed_step_cancels_the_rest(monkeypatch):
+    cancelled = []
+    async def fake_execute(step, context):
+        if step.id == "a":
+            raise RuntimeError("boom")
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(step.id); raise
+    monkeypatch.setattr(engine, "execute_step", fake_execute)
+    with pytest.raises(RuntimeError, match="boom"):
+        await engine.run_plan(compile_spec(parse_sdl(CHAIN_AND_SLOW)), {})
+    await asyncio.sleep(0)
+    assert cancelled == ["slow"]
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from idsideai import database
+from idsideai.database import Base, async_url, make_engine
+from idsideai.models import ExecutionLog
+
+def test_async_url():
+    assert async_url("postgres://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_url("postgresql://db/app") == "postgresql+asyncpg://db/app"
+    assert async_url("postgresql+psycopg://db/app") == "postgresql+psycopg://db/app"
+    assert async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+def test_postgres_engine_pool_is_sized():
+    pytest.importorskip("asyncpg")
+    engine = make_engine("postgresql+asyncpg://u:p@localhost/app")
+    assert engine.pool.size() == database.settings.db_pool_size and engine.pool._max_overflow == database.settings.db_max_overflow
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas_and_read_write_split(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'app.db'}"
+    writer, reader = make_engine(url), make_engine(url, read_only=True)
+    try:
+        async with writer.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with writer.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+            assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == database.settings.sqlite_busy_timeout_ms
+        assert writer.pool.size() == 1 and reader.pool.size() == database.settings.sqlite_read_pool
+        async with reader.connect() as conn:
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.execute(insert(ExecutionLog).values(input_payload={}, output_payload={}, telemetry={}))
+
+        Writes, Reads = async_sessionmaker(writer), async_sessionmaker(reader)
+        async def write(i):
+            async with Writes() as s:
+                await s.execute(insert(ExecutionLog).values(input_payload={"i": i}, output_payload={}, telemetry={}))
+                await s.commit()
+        async def read():
+            async with Reads() as s:
+                return await s.scalar(select(func.count()).select_from(ExecutionLog))
+        results = await asyncio.gather(*(write(i) for i in range(50)), *(read() for _ in range(50)))
+        assert all(0 <= n <= 50 for n in results[50:])
+        assert await read() == 50
+    finally:
+        await writer.dispose(); await reader.dispose()
@@ -0,0 +1,79 @@
+import asyncio
+import time
+import pytest
+from idsideai import deadline, http
+from idsideai.services import engine
+from idsideai.services.dsl import parse_sdl
+from idsideai.services.plan_cache import compile_spec
+from idsideai.services.providers.registry import Provider, ProviderRegistry
+
+SDL = """name: slow
+steps:
+  - id: s1
+    type: prompt
+    timeout_ms: 50
+    prompt: "hi"
+    next: s2
+  - id: s2
+    type: prompt
+    prompt: "again"
+"""
+
+@pytest.fixture()
+def slow_provider(monkeypatch):
+    async def slow_complete(prompt, model, **kw):
+        await asyncio.sleep(0.5)
+        return {"text": prompt}
+    monkeypatch.setattr(engine.providers, "complete", slow_complete)
+
+@pytest.mark.asyncio
+async def test_step_timeout(slow_provider):
+    with pytest.raises(engine.StepTimeout) as exc:
+        await engine.run_plan(compile_spec(parse_sdl(SDL)), {})
+    assert exc.value.step_id == "s1"
+
+@pytest.mark.asyncio
+async def test_run_deadline_caps_later_steps(slow_provider):
+    plan = compile_spec(parse_sdl(SDL.replace("timeout_ms: 50", "timeout_ms: 5000")))
+    t0 = time.perf_counter()
+    with pytest.raises(engine.StepTimeout):
+        await engine.run_plan(plan, {}, deadline_ms=80)
+    assert time.perf_counter() - t0 < 0.3
+
+def test_deadline_is_propagated_to_http_timeouts():
+    assert "timeout" not in http._bounded({})
+    with deadline.scope(5), deadline.scope(0.5), deadline.scope(10):
+        assert 0 < http._bounded({})["timeout"] <= 0.5
+
+class LocalProvider(Provider):
+    prefixes = ("gpt-",)
+    def __init__(self, name, delays):
+        self.name, self.delays, self.cancelled = name, list(delays), 0
+    async def complete(self, prompt, model):
+        try:
+            await asyncio.sleep(self.delays.pop(0))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"text": self.name}
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_stuck_primary():
+    reg = ProviderRegistry(hedge_min_samples=5)
+    primary, backup = LocalProvider("primary", [1.0]), LocalProvider("backup", [0.0])
+    reg.register(primary); reg.register(backup)
+    for _ in range(5):
+        reg.record("primary", 20.0); reg.record("backup", 30.0)
+    t0 = time.perf_counter()
+    res = await reg.complete("x", "gpt-4o", hedge=True)
+    assert res["text"] == "backup" and reg.hedges == 1
+    assert time.perf_counter() - t0 < 0.5
+    await asyncio.sleep(0)
+    assert primary.cancelled == 1
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_primary_is_fast():
+    reg = ProviderRegistry(hedge_min_samples=1)
+    only = LocalProvider("only", [0.0])
+    reg.register(only); reg.record("only", 100.0)
+    assert (await reg.complete("x", "gpt-4o", hedge=True))["text"] == "only" and reg.hedges == 0
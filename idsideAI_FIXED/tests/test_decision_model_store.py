@@ -0,0 +1,111 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from idsideai import database
+from idsideai.database import Base, get_read_session, get_session
+from idsideai import models  # noqa: F401  (registers tables)
+from idsideai.routers import decision_models
+from idsideai.services import engine
+from idsideai.services.plan_cache import stored_plans
+
+SDL = """name: demo
+steps:
+  - id: s1
+    type: prompt
+    prompt: "Echo: {text}"
+"""
+
+@pytest.fixture()
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async def _init():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(_init())
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async def _session():
+        async with Session() as s:
+            yield s
+    app = FastAPI()
+    app.include_router(decision_models.router)
+    app.dependency_overrides[get_session] = app.dependency_overrides[get_read_session] = _session
+    with TestClient(app) as c:
+        yield c
+    asyncio.run(engine.dispose())
+
+def test_crud_and_run_by_id(client):
+    r = client.post("/decision-models", json={"name": "demo", "sdl_text": SDL})
+    assert r.status_code == 201
+    mid = r.json()["id"]
+    assert client.get(f"/decision-models/{mid}").json()["version"] == 1
+
+    r = client.post(f"/decision-models/{mid}/run", json={"inputs": {"text": "hi"}})
+    assert r.status_code == 200 and "Echo: hi" in r.json()["trace"][0]["result"]["text"]
+    hits = stored_plans.hits
+    client.post(f"/decision-models/{mid}/run", json={"inputs": {"text": "again"}})
+    assert stored_plans.hits == hits + 1
+
+    r = client.put(f"/decision-models/{mid}", json={"name": "demo", "sdl_text": SDL.replace("Echo", "Say")})
+    assert r.json()["version"] == 2
+    r = client.post(f"/decision-models/{mid}/run", json={"inputs": {"text": "hi"}})
+    assert "Say: hi" in r.json()["trace"][0]["result"]["text"]
+
+    assert client.delete(f"/decision-models/{mid}").status_code == 204
+    assert client.post(f"/decision-models/{mid}/run", json={"inputs": {}}).status_code == 404
+
+def test_create_rejects_invalid_sdl(client):
+    r = client.post("/decision-models", json={"name": "bad", "sdl": {"steps": []}})
+    assert r.status_code == 400
+
+def test_run_batch_json_and_ndjson(client):
+    inputs = [{"text": "a"}, {}, {"text": "c"}]
+    r = client.post("/decision-models/run-batch", json={"sdl_text": SDL, "inputs": inputs})
+    results = r.json()["results"]
+    assert [x["index"] for x in results] == [0, 1, 2]
+    assert results[0]["ok"] and "Echo: a" in results[0]["result"]["trace"][0]["result"]["text"]
+    assert results[1] == {"index": 1, "ok": False, "status": 422, "error": "Missing input: text"}
+
+    mid = client.post("/decision-models", json={"name": "demo", "sdl_text": SDL}).json()["id"]
+    r = client.post("/decision-models/run-batch", json={"model_id": mid, "inputs": inputs, "concurrency": 2},
+                    headers={"Accept": "application/x-ndjson"})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(x["index"] for x in lines) == [0, 1, 2]
+
+def test_run_batch_requires_one_source(client):
+    assert client.post("/decision-models/run-batch", json={"inputs": [{}]}).status_code == 400
+
+@pytest.mark.asyncio
+async def test_stored_runs_do_not_hold_read_connections(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.settings, "sqlite_read_pool", 2)
+    monkeypatch.setattr(database.settings, "db_pool_timeout_s", 0.2)
+    url = f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}"
+    writer, reader = database.make_engine(url), database.make_engine(url, read_only=True)
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Writes, Reads = async_sessionmaker(writer, expire_on_commit=False), async_sessionmaker(reader, expire_on_commit=False)
+    async def _write():
+        async with Writes() as s:
+            yield s
+    async def _read():
+        async with Reads() as s:
+            yield s
+    async def slow_complete(prompt, model, **kw):
+        await asyncio.sleep(0.5)  # longer than the pool timeout
+        return {"text": prompt}
+    monkeypatch.setattr(engine.providers, "complete", slow_complete)
+    app = FastAPI()
+    app.include_router(decision_models.router)
+    app.dependency_overrides[get_session], app.dependency_overrides[get_read_session] = _write, _read
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            mid = (await c.post("/decision-models", json={"name": "demo", "sdl_text": SDL})).json()["id"]
+            runs = [c.post(f"/decision-models/{mid}/run", json={"inputs": {"text": str(i)}}) for i in range(4)]
+            runs.append(c.post("/decision-models/run-batch", json={"model_id": mid, "inputs": [{"text": "b"}]}))
+            assert [r.status_code for r in await asyncio.gather(*runs)] == [200] * 5
+    finally:
+        await writer.dispose(); await reader.dispose()
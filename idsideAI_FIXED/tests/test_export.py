@@ -0,0 +1,64 @@
+import csv, gzip, io, json
+from datetime import datetime
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from idsideai.database import Base
+from idsideai.models import ExecutionLog
+from idsideai.services import export
+
+@pytest_asyncio.fixture
+async def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'logs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as s:
+        await s.execute(insert(ExecutionLog), [
+            {"decision_model_id": None, "input_payload": {"i": i}, "output_payload": {"trace": [{"id": "s1"}]},
+             "telemetry": {"ms": i}, "created_at": datetime(2026, 1, 1)} for i in range(2500)])
+        await s.commit()
+    yield Session
+    await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_ndjson_gz_export_streams_in_batches(sessions, tmp_path):
+    seen = []
+    out = tmp_path / "out" / "runs.ndjson.gz"
+    n = await export.export_execution_logs(str(out), batch_size=1000, session_factory=sessions, progress=seen.append)
+    assert n == 2500 and seen == [1000, 2000, 2500]
+    lines = gzip.decompress(out.read_bytes()).decode().splitlines()
+    first = json.loads(lines[0])
+    assert len(lines) == 2500 and first["input_payload"] == {"i": 0} and first["created_at"] == "2026-01-01T00:00:00"
+    assert [p.name for p in out.parent.iterdir()] == ["runs.ndjson.gz"]
+
+@pytest.mark.asyncio
+async def test_csv_and_parquet_exports(sessions, tmp_path):
+    n = await export.export_execution_logs(str(tmp_path / "runs.csv"), batch_size=700, session_factory=sessions)
+    rows = list(csv.DictReader(io.StringIO((tmp_path / "runs.csv").read_text())))
+    assert n == len(rows) == 2500 and json.loads(rows[-1]["telemetry"]) == {"ms": 2499}
+    pq = pytest.importorskip("pyarrow.parquet")
+    await export.export_execution_logs(str(tmp_path / "runs.parquet"), batch_size=1000, session_factory=sessions)
+    f = pq.ParquetFile(tmp_path / "runs.parquet")
+    assert f.metadata.num_rows == 2500 and f.metadata.num_row_groups == 3
+
+@pytest.mark.asyncio
+async def test_failed_export_leaves_no_partial_file(sessions, tmp_path, monkeypatch):
+    target = tmp_path / "runs.ndjson"
+    target.write_text("previous export\n")
+    def boom(self, rows):
+        raise OSError("disk full")
+    monkeypatch.setattr(export.NDJSONWriter, "write", boom)
+    with pytest.raises(OSError):
+        await export.export_execution_logs(str(target), session_factory=sessions)
+    assert target.read_text() == "previous export\n" and [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+def test_legacy_helpers_stream_and_reject_unknown_formats(tmp_path):
+    export.export_csv(str(tmp_path / "a.csv"), ({"k": i, "v": {"n": i}} for i in range(2500)))
+    rows = list(csv.DictReader(open(tmp_path / "a.csv", newline="")))
+    assert len(rows) == 2500 and rows[1] == {"k": "1", "v": '{"n":1}'}
+    export.export_json(str(tmp_path / "a.json"), {"when": datetime(2026, 1, 1)})
+    assert json.loads((tmp_path / "a.json").read_text()) == {"when": "2026-01-01T00:00:00"}
+    with pytest.raises(ValueError):
+        export.detect_format("runs.xlsx")
@@ -0,0 +1,86 @@
+import asyncio, gzip, json, os, time
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from idsideai.database import Base
+from idsideai.models import ExecutionLog
+from idsideai.routers import exports
+from idsideai.services.export_jobs import ExportJobManager
+
+@pytest.fixture
+def db_url(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'logs.db'}"
+    async def seed():
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine)() as s:
+            await s.execute(insert(ExecutionLog), [{"decision_model_id": i % 2, "input_payload": {"i": i}, "output_payload": {},
+                                                    "telemetry": {}} for i in range(1200)])
+            await s.commit()
+        await engine.dispose()
+    asyncio.run(seed())
+    return url
+
+@pytest.fixture
+def manager(tmp_path, db_url):
+    m = ExportJobManager(directory=str(tmp_path / "exports"), workers=2, retention_s=3600, dedupe_s=60,
+                         batch_size=500, database_url=db_url)
+    yield m
+    m.shutdown(wait=True)
+
+def wait_done(job, timeout=10):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+def test_job_runs_in_background_and_dedupes_identical_requests(manager):
+    job = manager.submit("ndjson", compress=True)
+    assert manager.submit("ndjson", compress=True) is job and manager.deduped == 1
+    assert wait_done(job).status == "done" and job.rows == job.total == 1200
+    assert job.to_dict()["progress"] == 1.0
+    lines = gzip.decompress(manager.path(job).read_bytes()).splitlines()
+    assert len(lines) == 1200 and json.loads(lines[0])["input_payload"] == {"i": 0}
+    assert manager.submit("ndjson", compress=True) is job  # still fresh: same file
+    other = wait_done(manager.submit("csv", compress=False, decision_model_id=1))
+    assert other is not job and other.rows == 600 and manager.path(other).name.endswith(".csv")
+
+def test_failed_job_is_reported_and_not_reused(tmp_path):
+    m = ExportJobManager(directory=str(tmp_path / "exports"), database_url=f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+    job = wait_done(m.submit("csv"))
+    assert job.status == "failed" and "no such table" in job.error
+    assert m.submit("csv") is not job
+    m.shutdown(wait=True)
+
+def test_retention_cleanup_removes_old_files_and_jobs(manager):
+    job = wait_done(manager.submit("csv"))
+    unrelated = manager.directory / "keep.txt"
+    unrelated.write_text("x")
+    old = time.time() - 7200
+    os.utime(manager.path(job), (old, old)); os.utime(unrelated, (old, old))
+    assert manager.cleanup() == 1
+    assert not manager.path(job).exists() and unrelated.exists()
+    assert manager.cleanup(now=time.time() + 7200) == 0 and manager.get(job.id) is None
+
+@pytest.mark.asyncio
+async def test_export_job_api(manager, monkeypatch):
+    monkeypatch.setattr(exports, "export_jobs", manager)
+    app = FastAPI()
+    app.include_router(exports.router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        r = await c.post("/export-jobs", json={"format": "csv", "compress": False})
+        assert r.status_code == 202
+        job_id = r.json()["id"]
+        for _ in range(500):
+            status = (await c.get(f"/export-jobs/{job_id}")).json()
+            if status["status"] == "done":
+                break
+            await asyncio.sleep(0.01)
+        assert status["rows"] == 1200 and status["download_url"] == f"/export-jobs/{job_id}/download"
+        r = await c.get(status["download_url"])
+        assert r.status_code == 200 and r.text.count("\n") == 1201
+        assert (await c.get("/export-jobs/nope")).status_code == 404
+        assert (await c.post("/export-jobs", json={"format": "xml"})).status_code == 422
@@ -0,0 +1,70 @@
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from security_toolkit.hardening import MaxBodySizeMiddleware, RequestIDMiddleware, StripServerHeaderMiddleware
+
+def make_app():
+    app = FastAPI()
+    @app.post("/echo")
+    async def echo(request: Request):
+        body = await request.body()
+        return {"size": len(body), "request_id": request.state.request_id}
+    @app.get("/stream")
+    async def stream():
+        async def gen():
+            for i in range(3):
+                yield f"chunk{i}\n"
+        return StreamingResponse(gen(), media_type="text/plain", headers={"Server": "uvicorn", "X-Powered-By": "py"})
+    app.add_middleware(MaxBodySizeMiddleware, max_body=16)
+    app.add_middleware(RequestIDMiddleware)
+    app.add_middleware(StripServerHeaderMiddleware)
+    return app
+
+@pytest.fixture
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test")
+
+@pytest.mark.asyncio
+async def test_request_id_propagates_and_security_headers_set(client):
+    r = await client.post("/echo", content=b"abc", headers={"X-Request-ID": "req-1"})
+    assert r.status_code == 200 and r.json() == {"size": 3, "request_id": "req-1"}
+    assert r.headers["x-request-id"] == "req-1"
+    assert r.headers["x-frame-options"] == "DENY" and r.headers["referrer-policy"] == "no-referrer"
+    generated = (await client.post("/echo", content=b"")).headers["x-request-id"]
+    assert len(generated) == 32
+
+@pytest.mark.asyncio
+async def test_body_limit_enforced_on_declared_and_streamed_size(client):
+    r = await client.post("/echo", content=b"x" * 17)
+    assert r.status_code == 413 and r.json() == {"detail": "Payload too large"}
+    async def chunks():  # no content-length: sent chunked
+        for _ in range(4):
+            yield b"x" * 8
+    r = await client.post("/echo", content=chunks())
+    assert "content-length" not in r.request.headers
+    assert r.status_code == 413
+
+@pytest.mark.asyncio
+async def test_streaming_response_passes_through(client):
+    r = await client.get("/stream")
+    assert r.text == "chunk0\nchunk1\nchunk2\n"
+    assert "server" not in r.headers and "x-powered-by" not in r.headers
+    assert r.headers["cross-origin-opener-policy"] == "same-origin"
+
+@pytest.mark.asyncio
+async def test_security_header_block_replaces_app_headers(monkeypatch):
+    from security_toolkit import hardening
+    monkeypatch.setattr(hardening, "_csp", lambda: "default-src 'self'")
+    monkeypatch.setenv("X_FRAME_OPTIONS", "SAMEORIGIN")
+    block = hardening.build_security_headers()
+    assert (b"content-security-policy", b"default-src 'self'") in block
+    app = FastAPI()
+    @app.get("/")
+    async def root():
+        return PlainTextResponse("ok", headers={"X-Frame-Options": "ALLOW", "X-Custom": "1"})
+    app.add_middleware(StripServerHeaderMiddleware, headers=block)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        r = await c.get("/")
+    assert r.headers.get_list("x-frame-options") == ["SAMEORIGIN"]
+    assert r.headers["content-security-policy"] == "default-src 'self'" and r.headers["x-custom"] == "1"
@@ -0,0 +1,58 @@
+import os
+import httpx
+import pytest
+from fastapi import FastAPI
+from prometheus_client import CollectorRegistry, values
+from starlette.responses import PlainTextResponse
+from idsideai.metrics import EngineMetrics, HttpMetrics, PrometheusMiddleware, render_latest
+
+def make_app(metrics):
+    app = FastAPI()
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+    sub = FastAPI()
+    sub.add_route("/file", lambda request: PlainTextResponse("x" * 1000))
+    app.mount("/static", sub)
+    app.add_middleware(PrometheusMiddleware, metrics=metrics)
+    return app
+
+@pytest.mark.asyncio
+async def test_labels_use_route_templates():
+    reg = CollectorRegistry()
+    metrics = HttpMetrics(reg)
+    transport = httpx.ASGITransport(app=make_app(metrics), raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        for i in range(5):
+            assert (await c.get(f"/items/{i}")).status_code == 200
+        assert (await c.get("/nope/123")).status_code == 404
+        assert (await c.get("/static/file")).status_code == 200
+        assert (await c.get("/boom")).status_code == 500
+    sample = reg.get_sample_value
+    assert sample("http_requests_total", {"method": "GET", "path": "/items/{item_id}", "status": "200"}) == 5
+    assert sample("http_requests_total", {"method": "GET", "path": "<unmatched>", "status": "404"}) == 1
+    assert sample("http_requests_total", {"method": "GET", "path": "/static", "status": "200"}) == 1
+    assert sample("http_requests_total", {"method": "GET", "path": "/boom", "status": "500"}) == 1
+    assert sample("http_request_latency_seconds_count", {"path": "/items/{item_id}"}) == 5
+    assert sample("http_response_size_bytes_sum", {"path": "/static"}) == 1000
+    assert sample("http_requests_in_flight", {"method": "GET"}) == 0
+    paths = {s.labels["path"] for m in reg.collect() if m.name == "http_requests" for s in m.samples}
+    assert not any("/items/1" in p for p in paths)
+    assert len(metrics._children) == 4
+
+def test_multiprocess_scrape_aggregates_workers(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    dead_pid = 4194304 + 7  # above Linux pid_max: never a live process
+    for pid in (os.getpid(), dead_pid):
+        monkeypatch.setattr(values, "ValueClass", values.MultiProcessValue(lambda pid=pid: pid))
+        reg = CollectorRegistry()
+        EngineMetrics(reg).cache_lookup("hit")
+        HttpMetrics(reg).inflight_for("GET").inc()
+    assert any(f.endswith(f"_{dead_pid}.db") and f.startswith("gauge_live") for f in os.listdir(tmp_path))
+    text = render_latest(str(tmp_path)).decode()
+    assert 'idsideai_response_cache_lookups_total{result="hit"} 2.0' in text
+    assert 'http_requests_in_flight{method="GET"} 1.0' in text
+    assert not any(f.startswith("gauge_live") and f.endswith(f"_{dead_pid}.db") for f in os.listdir(tmp_path))
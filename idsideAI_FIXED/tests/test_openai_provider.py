@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from idsideai.services.providers.openai_provider import run_openai, OpenAIError
+
+COMPLETION = {"choices": [{"message": {"content": "pong"}}]}
+
+@pytest.mark.asyncio
+async def test_run_openai_reuses_pooled_connections(stub_server, pooled_client):
+    stub_server.reply = COMPLETION
+    for _ in range(3):
+        res = await run_openai("ping", "gpt-4o-mini", "sk-test", base_url=stub_server.url)
+        assert res["response"] == COMPLETION and res["latency_ms"] >= 0
+    req = stub_server.requests[0]
+    assert req["path"] == "/chat/completions"
+    assert req["headers"]["Authorization"] == "Bearer sk-test"
+    assert req["json"]["messages"] == [{"role": "user", "content": "ping"}]
+    assert len(stub_server.peers) == 1  # keep-alive: one TCP connection for sequential calls
+
+@pytest.mark.asyncio
+async def test_run_openai_concurrent_calls(stub_server, pooled_client):
+    stub_server.reply = COMPLETION
+    results = await asyncio.gather(*(run_openai(f"p{i}", "m", "sk", base_url=stub_server.url) for i in range(20)))
+    assert len(results) == 20 and len(stub_server.requests) == 20
+
+@pytest.mark.asyncio
+async def test_run_openai_error_and_fallback(stub_server, pooled_client, monkeypatch):
+    stub_server.status = 500
+    monkeypatch.setenv("OPENAI_FALLBACK", "1")
+    res = await run_openai("hi", "m", "sk", base_url=stub_server.url)
+    assert res["fallback"] and "[OPENAI_FALLBACK] hi" in res["response"]["choices"][0]["message"]["content"]
+    monkeypatch.setenv("OPENAI_FALLBACK", "0")
+    with pytest.raises(OpenAIError):
+        await run_openai("hi", "m", "sk", base_url=stub_server.url)
+
+@pytest.mark.asyncio
+async def test_stream_openai_yields_deltas(stub_server, pooled_client):
+    from idsideai.services.providers.openai_provider import stream_openai
+    stub_server.sse = [{"choices": [{"delta": {"content": "po"}}]}, {"choices": [{"delta": {}}]},
+                       {"choices": [{"delta": {"content": "ng"}}]}]
+    deltas = [d async for d in stream_openai("ping", "gpt-4o-mini", "sk", base_url=stub_server.url)]
+    assert deltas == ["po", "ng"] and stub_server.requests[0]["json"]["stream"] is True
@@ -0,0 +1,27 @@
+import pytest
+from idsideai.services.plan_cache import PlanCache
+from idsideai.services.engine import run_plan
+
+SDL = """name: demo
+steps:
+  - id: s1
+    type: prompt
+    prompt: "Echo: {text}"
+"""
+
+def test_plan_cache_hits_and_evictions():
+    cache = PlanCache(maxsize=1)
+    first = cache.get(SDL)
+    assert cache.get(SDL) is first
+    assert first.entry == "s1" and set(first.step_map) == {"s1"}
+    cache.get(SDL.replace("demo", "other"))
+    assert cache.stats() == {"size": 1, "maxsize": 1, "hits": 1, "misses": 2, "evictions": 1}
+
+def test_plan_cache_rejects_bad_sdl():
+    with pytest.raises(ValueError):
+        PlanCache().get("name: [unclosed")
+
+@pytest.mark.asyncio
+async def test_run_plan_from_cache():
+    out = await run_plan(PlanCache().get(SDL), {"text": "hi"})
+    assert out["trace"][0]["id"] == "s1"
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from idsideai.config import settings
+from idsideai.services.providers.registry import Provider, ProviderRegistry, FakeProvider, AnthropicProvider, build_default_registry
+
+class LocalProvider(Provider):
+    prefixes = ("gpt-",)
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name, self.delay, self.fail, self.calls = name, delay, fail, 0
+    async def complete(self, prompt, model):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"text": f"{self.name}:{prompt}", "provider_meta": {"model": model}}
+
+@pytest.mark.asyncio
+async def test_routes_to_lowest_p95():
+    reg = ProviderRegistry()
+    slow, fast = LocalProvider("slow"), LocalProvider("fast")
+    reg.register(slow); reg.register(fast)
+    for _ in range(5):
+        reg.record("slow", 200.0); reg.record("fast", 10.0)
+    res = await reg.complete("hi", "gpt-4o")
+    assert res["text"] == "fast:hi" and slow.calls == 0
+
+@pytest.mark.asyncio
+async def test_failover_on_error_and_on_slow_provider():
+    reg = ProviderRegistry(failover_timeout_ms=50)
+    broken, stuck, ok = LocalProvider("broken", fail=True), LocalProvider("stuck", delay=1.0), LocalProvider("ok")
+    for p in (broken, stuck, ok):
+        reg.register(p)
+    reg.record("ok", 100.0)  # make "ok" the last choice
+    res = await reg.complete("hi", "gpt-4o")
+    assert res["text"] == "ok:hi" and broken.calls == stuck.calls == 1
+    assert len(reg._latency["stuck"]) == 0 and reg.error_rate("stuck") == 1.0  # timeouts are not latency samples
+    assert [p.name for p in reg.candidates("gpt-4o")[0]] == ["ok", "broken", "stuck"]
+
+@pytest.mark.asyncio
+async def test_error_rate_demotes_fast_failing_provider():
+    reg = ProviderRegistry()
+    flaky, steady = LocalProvider("flaky"), LocalProvider("steady")
+    reg.register(flaky); reg.register(steady)
+    for i in range(10):
+        reg.record("flaky", 10.0, ok=i % 2 == 0)  # fast, but half its calls fail
+        reg.record("steady", 15.0)
+    assert reg.p95("flaky") == 10.0 and reg.error_rate("flaky") == 0.5 and reg.score("flaky") == 20.0
+    assert (await reg.complete("hi", "gpt-4o"))["text"] == "steady:hi" and flaky.calls == 0
+
+@pytest.mark.asyncio
+async def test_fallback_result_is_recorded_as_failure():
+    class Degraded(LocalProvider):
+        async def complete(self, prompt, model):
+            return {"text": "", "provider_meta": {"fallback": True}}
+    reg = ProviderRegistry()
+    degraded = Degraded("degraded")
+    reg.register(degraded)
+    await reg.complete("hi", "gpt-4o")
+    assert len(reg._latency["degraded"]) == 0 and reg.stats()["degraded"]["error_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_explicit_provider_and_fake_fallback():
+    reg = ProviderRegistry()
+    a, b = LocalProvider("a"), LocalProvider("b")
+    for p in (a, b, FakeProvider()):
+        reg.register(p)
+    assert (await reg.complete("x", "b:gpt-4o"))["text"] == "b:x"
+    assert (await reg.complete("x", "claude-3-5-sonnet"))["text"] == "[FAKE_PROVIDER ECHO]\nx"
+
+@pytest.mark.asyncio
+async def test_anthropic_provider_against_stub(stub_server, pooled_client, monkeypatch):
+    monkeypatch.setattr(settings, "anthropic_api_key", "ak-test")
+    monkeypatch.setattr(settings, "anthropic_base_url", stub_server.url)
+    stub_server.reply = {"content": [{"type": "text", "text": "hello"}]}
+    reg = ProviderRegistry()
+    reg.register(AnthropicProvider())
+    res = await reg.complete("hi", "claude-3-5-haiku")
+    assert res["text"] == "hello"
+    req = stub_server.requests[0]
+    assert req["path"] == "/v1/messages" and req["headers"]["x-api-key"] == "ak-test"
+
+@pytest.mark.parametrize("model", ["ft:gpt-4o-mini:acme::abc123", "davinci-002", "my-azure-deployment"])
+def test_unmatched_models_go_to_a_configured_real_provider(monkeypatch, model):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    monkeypatch.setattr(settings, "anthropic_api_key", "ak-test")
+    providers, model_name = build_default_registry().candidates(model)
+    assert [p.name for p in providers] == ["openai"] and model_name == model
+    monkeypatch.setattr(settings, "openai_api_key", None)
+    assert [p.name for p in build_default_registry().candidates(model)[0]] == ["fake"]
+
+def test_explicit_provider_prefix_must_be_registered(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    monkeypatch.setattr(settings, "anthropic_api_key", None)
+    reg = build_default_registry()
+    providers, model_name = reg.candidates("anthropic:claude-3-5-haiku")  # named, but not configured
+    assert [p.name for p in providers] == ["fake"] and model_name == "claude-3-5-haiku"
+    assert [p.name for p in reg.candidates("fake:echo")[0]] == ["fake"]
+    assert [p.name for p in reg.candidates("claude-3-5-haiku")[0]] == ["fake"]  # Anthropic models stay with Anthropic
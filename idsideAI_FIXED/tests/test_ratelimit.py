@@ -0,0 +1,102 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from security_toolkit.ratelimit import InMemoryStore, RateLimiter, RateLimitMiddleware, parse_limit
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+    def __call__(self):
+        return self.now
+
+class BrokenStore:
+    calls = 0
+    async def take(self, *args):
+        raise ConnectionError("store down")
+
+def test_parse_limit():
+    assert parse_limit("10/second") == (10, 1)
+    assert parse_limit("60 per minute") == (60, 60)
+    assert parse_limit("100/5 minutes") == (100, 300)
+    with pytest.raises(ValueError):
+        parse_limit("lots")
+
+@pytest.mark.asyncio
+async def test_local_lease_batches_store_calls():
+    clock = Clock()
+    store = InMemoryStore(clock)
+    lim = RateLimiter(["5/second"], store=store, batch_fraction=0.4, min_batch=1, clock=clock)
+    results = [await lim.hit("1.2.3.4") for _ in range(6)]
+    assert [ok for ok, _ in results] == [True] * 5 + [False]
+    assert store.calls == 4  # batches of 2, 2, 1, then the refused lease
+    assert results[-1][1] == pytest.approx(0.2)
+    clock.now += 1.0
+    assert (await lim.hit("1.2.3.4"))[0] and (await lim.hit("5.6.7.8"))[0]
+
+@pytest.mark.asyncio
+async def test_default_limits_need_one_store_call_per_batch():
+    clock = Clock()
+    store = InMemoryStore(clock)
+    lim = RateLimiter(["10/second", "60/minute"], store=store, clock=clock)
+    allowed = 0
+    for _ in range(50):  # 5 requests a second for 10 seconds
+        allowed += (await lim.hit("ip"))[0]
+        clock.now += 0.2
+    assert allowed == 50 and lim.batch == 5 and store.calls == 10
+
+@pytest.mark.asyncio
+async def test_lapsed_lease_tokens_are_returned():
+    clock = Clock()
+    lim = RateLimiter(["10/second", "20/minute"], store=InMemoryStore(clock), clock=clock)
+    allowed = 0
+    for _ in range(20):  # each lease of 5 lapses with 4 unspent tokens
+        allowed += (await lim.hit("ip"))[0]
+        clock.now += 1.1
+    assert allowed == 20
+
+def test_idle_buckets_are_evicted():
+    clock = Clock()
+    store = InMemoryStore(clock, prune_every=10**9)
+    for i in range(100):
+        asyncio.run(store.take([(f"{{ip{i}}}:10/60", 10, 10 / 60)], 1))
+    clock.now += 59
+    assert store.prune() == 0
+    clock.now += 2  # untouched for a full refill period: the bucket would be full anyway
+    assert store.prune() == 100 and not store._buckets
+
+@pytest.mark.asyncio
+async def test_workers_sharing_a_store_respect_global_limit():
+    clock = Clock()
+    store = InMemoryStore(clock)
+    workers = [RateLimiter(["10/second", "20/minute"], store=store, batch_fraction=0.2, clock=clock) for _ in range(3)]
+    allowed = sum([(await w.hit("ip"))[0] for _ in range(10) for w in workers])
+    assert allowed == 10
+    clock.now += 1.0
+    allowed = sum([(await w.hit("ip"))[0] for _ in range(10) for w in workers])
+    assert allowed == 10  # 20/minute overall
+    clock.now += 1.0
+    assert not any([(await w.hit("ip"))[0] for w in workers])
+
+@pytest.mark.asyncio
+async def test_store_outage_falls_back_to_local_buckets():
+    lim = RateLimiter(["2/second"], store=BrokenStore())
+    assert [(await lim.hit("ip"))[0] for _ in range(3)] == [True, True, False]
+    assert lim.stats()["store_errors"] == 2  # one lease of 2, then the refused one
+
+@pytest.mark.asyncio
+async def test_middleware_returns_429_with_retry_after():
+    app = FastAPI()
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(["1/minute"]), exempt=("/healthz",))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        assert (await c.get("/ping")).status_code == 200
+        r = await c.get("/ping")
+        assert r.status_code == 429 and r.json() == {"detail": "Rate limit exceeded"}
+        assert 1 <= int(r.headers["retry-after"]) <= 60
+        assert (await c.get("/healthz")).status_code == 200
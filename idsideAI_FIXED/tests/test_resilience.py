@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from prometheus_client import REGISTRY
+from idsideai import deadline
+from idsideai.services.providers.registry import FakeProvider, Provider, ProviderBusy, ProviderRegistry
+from idsideai.services.providers.resilience import AdaptiveLimiter, CircuitBreaker
+
+class FlakyProvider(Provider):
+    name = "flaky"
+    prefixes = ("gpt-",)
+    def __init__(self, fail=True, delay=0.0):
+        self.fail, self.delay, self.calls = fail, delay, 0
+    async def complete(self, prompt, model):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream 503")
+        return {"text": f"flaky:{prompt}"}
+
+def test_limiter_grows_on_success_and_backs_off_on_failure():
+    lim = AdaptiveLimiter(initial=4, backoff=0.5, latency_target_ms=100)
+    assert all(lim.try_acquire() for _ in range(4)) and not lim.try_acquire()
+    assert lim.stats()["rejected"] == 1
+    for _ in range(4):
+        lim.release(True, 10.0)
+    assert lim.limit == pytest.approx(5.0, abs=0.1) and lim.inflight == 0
+    lim.try_acquire(); lim.release(False)
+    assert int(lim.limit) == 2
+    before = lim.limit
+    lim.try_acquire(); lim.release(True, 500.0)  # too slow counts as a drop
+    assert lim.limit == pytest.approx(before * 0.5)
+    before = lim.limit
+    lim.try_acquire(); lim.release(None)  # cancelled: no adjustment
+    assert lim.limit == before
+
+def test_breaker_opens_probes_and_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("idsideai.services.providers.resilience.time.monotonic", lambda: now[0])
+    br = CircuitBreaker(window=10, min_calls=4, error_rate=0.5, open_s=30)
+    for ok in (True, False, True, False):
+        assert br.allow(); br.record(ok)
+    assert br.state == "open" and br.is_open() and not br.allow()
+    now[0] += 31
+    assert not br.is_open() and br.allow() and br.state == "half_open"
+    assert not br.allow()  # only one probe at a time
+    br.record(False)
+    assert br.state == "open" and br.opened == 2
+    now[0] += 31
+    assert br.allow(); br.record(True)
+    assert br.state == "closed" and br.allow()
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast_to_fake():
+    reg = ProviderRegistry(breaker_factory=lambda: CircuitBreaker(min_calls=2, error_rate=0.5, open_s=60))
+    flaky = FlakyProvider()
+    reg.register(flaky); reg.register(FakeProvider())
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await reg.complete("x", "gpt-4o")
+    res = await reg.complete("x", "gpt-4o")
+    assert res["text"] == "[FAKE_PROVIDER ECHO]\nx" and flaky.calls == 2
+    assert res["provider_meta"] == {"provider": "fake", "fallback": True}
+    stats = reg.stats()
+    assert stats["flaky"]["breaker"]["state"] == "open" and "limiter" not in stats["fake"]
+    assert reg.fallbacks == 1
+
+@pytest.mark.asyncio
+async def test_saturated_limiter_queues_instead_of_answering_with_fake():
+    reg = ProviderRegistry(limiter_factory=lambda: AdaptiveLimiter(initial=2, max_limit=2))
+    slow = FlakyProvider(fail=False, delay=0.05)
+    reg.register(slow); reg.register(FakeProvider())
+    results = await asyncio.gather(*(reg.complete(str(i), "gpt-4o") for i in range(6)))
+    assert [r["text"] for r in results] == [f"flaky:{i}" for i in range(6)]
+    assert slow.calls == 6 and reg.fallbacks == 0
+    assert reg.stats()["flaky"]["limiter"] == {"limit": 2, "inflight": 0, "waiting": 0, "rejected": 0}
+
+@pytest.mark.asyncio
+async def test_busy_provider_raises_after_queue_timeout_or_deadline():
+    reg = ProviderRegistry(limiter_factory=lambda: AdaptiveLimiter(initial=1, max_limit=1), queue_timeout_s=0.01)
+    reg.register(FlakyProvider(fail=False, delay=0.05)); reg.register(FakeProvider())
+    results = await asyncio.gather(reg.complete("a", "gpt-4o"), reg.complete("b", "gpt-4o"), return_exceptions=True)
+    assert results[0]["text"] == "flaky:a" and isinstance(results[1], ProviderBusy)
+    reg.queue_timeout_s = 10
+    async def under_deadline():
+        with deadline.scope(0.01):
+            return await reg.complete("b", "gpt-4o")
+    loop = asyncio.get_running_loop(); t0 = loop.time()
+    results = await asyncio.gather(reg.complete("a", "gpt-4o"), under_deadline(), return_exceptions=True)
+    assert isinstance(results[1], ProviderBusy) and loop.time() - t0 < 1
+    assert reg.stats()["flaky"]["limiter"]["rejected"] == 2
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = AdaptiveLimiter(initial=1)
+    assert await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire(1))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    limiter.release(True)
+    assert limiter.inflight == 0 and limiter.stats()["waiting"] == 0 and limiter.try_acquire()
+
+@pytest.mark.asyncio
+async def test_limiter_and_breaker_state_are_exported_as_gauges():
+    class GaugedProvider(FlakyProvider):
+        name = "gauged"
+    reg = ProviderRegistry(limiter_factory=lambda: AdaptiveLimiter(initial=4),
+                           breaker_factory=lambda: CircuitBreaker(min_calls=2, error_rate=0.5, open_s=60))
+    provider = GaugedProvider(fail=False, delay=0.05)
+    reg.register(provider)
+    sample = lambda metric: REGISTRY.get_sample_value(metric, {"provider": "gauged"})
+    assert sample("idsideai_provider_concurrency_limit") == 4 and sample("idsideai_provider_breaker_state") == 0
+    call = asyncio.ensure_future(reg.complete("x", "gpt-4o"))
+    await asyncio.sleep(0.01)
+    assert sample("idsideai_provider_in_flight") == 1
+    await call
+    assert sample("idsideai_provider_in_flight") == 0
+    provider.fail, provider.delay = True, 0.0
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await reg.complete("x", "gpt-4o")
+    assert sample("idsideai_provider_breaker_state") == 2 and sample("idsideai_provider_concurrency_limit") == 3
+
+@pytest.mark.asyncio
+async def test_open_breaker_fallback_is_not_cached(monkeypatch):
+    from idsideai.services import engine
+    from idsideai.services.dsl import parse_sdl
+    from idsideai.services.plan_cache import compile_spec
+    from idsideai.services.response_cache import response_cache
+    reg = ProviderRegistry(breaker_factory=lambda: CircuitBreaker(min_calls=2, error_rate=0.5, open_s=0.05))
+    flaky = FlakyProvider()
+    reg.register(flaky); reg.register(FakeProvider())
+    monkeypatch.setattr(engine, "providers", reg)
+    response_cache.clear()
+    plan = compile_spec(parse_sdl("name: c\nsteps:\n  - id: s1\n    type: prompt\n    model: gpt-4o\n    cache: true\n"
+                                  "    prompt: \"Q {q}\"\n"))
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await engine.run_plan(plan, {"q": 1})
+    out = await engine.run_plan(plan, {"q": 1})  # breaker open: fake answers, flagged as a fallback
+    assert out["trace"][0]["result"]["provider_meta"]["fallback"] and response_cache.stats()["entries"] == 0
+    await asyncio.sleep(0.06)
+    flaky.fail = False
+    out = await engine.run_plan(plan, {"q": 1})  # recovered: the real answer, not a cached fake one
+    assert out["trace"][0]["result"]["text"] == "flaky:Q 1"
+    assert (await engine.run_plan(plan, {"q": 1}))["telemetry"][0]["provider"] == "cache"
+    response_cache.clear()
@@ -0,0 +1,54 @@
+import pytest
+from idsideai.services import engine
+from idsideai.services.dsl import parse_sdl
+from idsideai.services.plan_cache import compile_spec
+from idsideai.services.response_cache import ResponseCache, response_cache
+
+@pytest.mark.asyncio
+async def test_lru_ttl_and_byte_cap(monkeypatch):
+    cache = ResponseCache(max_bytes=60, ttl_s=10)
+    k1, k2 = ResponseCache.key("openai", "gpt", "a"), ResponseCache.key("openai", "gpt", "b")
+    assert k1 != k2 and k1 == ResponseCache.key("openai", "gpt", "a", {})
+    await cache.set(k1, {"text": "x" * 20})
+    await cache.set(k2, {"text": "y" * 20})
+    assert await cache.get(k1) is None and cache.evictions == 1  # byte cap evicted the oldest
+    assert (await cache.get(k2))["text"] == "y" * 20
+    now = __import__("time").time()
+    monkeypatch.setattr("idsideai.services.response_cache.time.time", lambda: now + 11)
+    assert await cache.get(k2) is None
+    assert cache.stats()["hit_rate"] == pytest.approx(1 / 3)
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "responses.db")
+    key = ResponseCache.key("fake", "echo", "hi")
+    await ResponseCache(disk_path=path).set(key, {"text": "hello"})
+    fresh = ResponseCache(disk_path=path)
+    assert await fresh.get(key) == {"text": "hello"} and fresh.disk_hits == 1
+
+SDL = """name: cached
+steps:
+  - id: s1
+    type: prompt
+    model: fake:echo
+    cache: true
+    prompt: "Policy summary for {region}"
+"""
+
+@pytest.mark.asyncio
+async def test_cached_step_skips_provider(monkeypatch):
+    response_cache.clear()
+    calls = []
+    async def fake_complete(prompt, model, **kw):
+        calls.append(prompt)
+        return {"text": prompt.upper()}
+    monkeypatch.setattr(engine.providers, "complete", fake_complete)
+    plan = compile_spec(parse_sdl(SDL))
+    first = await engine.run_plan(plan, {"region": "eu"})
+    second = await engine.run_plan(plan, {"region": "eu"})
+    assert calls == ["Policy summary for eu"]
+    assert second["trace"][0]["result"] == first["trace"][0]["result"]
+    assert second["telemetry"][0]["provider"] == "cache"
+    no_cache = compile_spec(parse_sdl(SDL.replace("cache: true", "cache: false")))
+    await engine.run_plan(no_cache, {"region": "eu"})
+    assert len(calls) == 2
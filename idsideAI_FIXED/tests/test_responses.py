@@ -0,0 +1,62 @@
+from datetime import datetime
+from decimal import Decimal
+import httpx
+import orjson
+import pytest
+from fastapi import APIRouter, FastAPI
+from pydantic import BaseModel
+from idsideai import responses
+from idsideai.responses import FastJSONResponse, FastRoute
+
+class Item(BaseModel):
+    name: str
+    at: datetime
+
+def make_app():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    router = APIRouter(route_class=FastRoute)
+    @router.get("/run")
+    async def run():
+        return {"trace": [{"id": "s1", "provider_meta": {"usage": {"tokens": 3}}}], "at": datetime(2026, 1, 2),
+                "item": Item(name="x", at=datetime(2026, 1, 3)), "cost": Decimal("1.5"), 7: "int key"}
+    @router.post("/made", status_code=201)
+    def made():
+        return [1, 2]
+    @router.get("/item", response_model=Item)
+    async def item():
+        return {"name": "y", "at": "2026-01-04T00:00:00", "extra": 1}
+    app.include_router(router)
+    return app
+
+@pytest.fixture
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test")
+
+@pytest.mark.asyncio
+async def test_plain_dicts_skip_jsonable_encoder(client, monkeypatch):
+    import fastapi.routing
+    calls = []
+    real = fastapi.routing.jsonable_encoder
+    monkeypatch.setattr(fastapi.routing, "jsonable_encoder", lambda *a, **k: calls.append(a) or real(*a, **k))
+    r = await client.get("/run")
+    assert r.status_code == 200 and r.headers["content-type"] == "application/json" and not calls
+    assert r.json() == {"trace": [{"id": "s1", "provider_meta": {"usage": {"tokens": 3}}}], "at": "2026-01-02T00:00:00",
+                        "item": {"name": "x", "at": "2026-01-03T00:00:00"}, "cost": 1.5, "7": "int key"}
+    r = await client.post("/made")
+    assert r.status_code == 201 and r.json() == [1, 2] and not calls
+    r = await client.get("/item")  # response_model routes are still validated and filtered
+    assert r.json() == {"name": "y", "at": "2026-01-04T00:00:00"}
+
+def test_accept_negotiation():
+    assert responses._quality("application/json, application/msgpack;q=0.5", responses.MSGPACK_TYPES) == 0.5
+    assert responses._quality("text/html", responses.MSGPACK_TYPES) == 0.0
+    assert orjson.loads(FastJSONResponse({"a": datetime(2026, 1, 1)}).body) == {"a": "2026-01-01T00:00:00"}
+
+@pytest.mark.asyncio
+async def test_msgpack_when_preferred(client):
+    msgpack = pytest.importorskip("msgpack")
+    r = await client.get("/run", headers={"Accept": "application/msgpack"})
+    assert r.headers["content-type"] == "application/msgpack" and r.headers["vary"] == "Accept"
+    assert msgpack.unpackb(r.content, strict_map_key=False)["trace"][0]["id"] == "s1"
+    r = await client.get("/run", headers={"Accept": "application/json, application/msgpack;q=0.1"})
+    assert r.headers["content-type"] == "application/json"
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from idsideai.services import engine
+from idsideai.services.dsl import parse_sdl
+from idsideai.services.plan_cache import compile_spec
+from idsideai.services.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream():
+    sf, calls = SingleFlight(), []
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"text": "ok"}
+    results = await asyncio.gather(*(sf.do("k", upstream) for _ in range(10)))
+    assert len(calls) == 1 and all(r is results[0] for r in results)
+    assert sf.stats() == {"inflight": 0, "calls": 1, "shared": 9}
+
+@pytest.mark.asyncio
+async def test_waiter_timeout_and_cancel_are_independent():
+    sf = SingleFlight()
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return "done"
+    impatient = asyncio.ensure_future(sf.do("k", upstream, timeout=0.01))
+    cancelled = asyncio.ensure_future(sf.do("k", upstream))
+    patient = asyncio.ensure_future(sf.do("k", upstream))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.TimeoutError):
+        await impatient
+    assert await patient == "done"
+
+@pytest.mark.asyncio
+async def test_abandoned_call_is_cancelled():
+    sf, started = SingleFlight(), asyncio.Event()
+    async def upstream():
+        started.set()
+        await asyncio.sleep(10)
+    waiter = asyncio.ensure_future(sf.do("k", upstream))
+    await started.wait()
+    task = sf._inflight["k"]
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert task.cancelled() or task.cancelling()
+
+@pytest.mark.asyncio
+async def test_engine_coalesces_identical_prompts(monkeypatch):
+    calls = []
+    async def slow_complete(prompt, model, **kw):
+        calls.append(prompt)
+        await asyncio.sleep(0.02)
+        return {"text": prompt}
+    monkeypatch.setattr(engine.providers, "complete", slow_complete)
+    plan = compile_spec(parse_sdl("name: d\nsteps:\n  - id: s\n    type: prompt\n    prompt: 'Summary of {doc}'\n"))
+    outs = await asyncio.gather(*(engine.run_plan(plan, {"doc": "policy"}) for _ in range(5)))
+    assert calls == ["Summary of policy"]
+    assert sum(e["provider"] == "singleflight" for o in outs for e in o["telemetry"]) == 4
+
+@pytest.mark.asyncio
+async def test_coalesced_call_does_not_inherit_the_first_callers_budget(monkeypatch):
+    from idsideai import deadline
+    seen = []
+    async def slow_complete(prompt, model, **kw):
+        seen.append(deadline.remaining())
+        await asyncio.sleep(0.2)
+        return {"text": prompt}
+    monkeypatch.setattr(engine.providers, "complete", slow_complete)
+    sdl = "name: d\nsteps:\n  - id: s\n    type: prompt\n    timeout_ms: {}\n    prompt: 'Summary of {{doc}}'\n"
+    leader, follower = (compile_spec(parse_sdl(sdl.format(ms))) for ms in (50, 5000))
+    outs = await asyncio.gather(engine.run_plan(leader, {"doc": "policy"}), engine.run_plan(follower, {"doc": "policy"}),
+                                return_exceptions=True)
+    assert isinstance(outs[0], engine.StepTimeout)
+    assert outs[1]["trace"][0]["result"] == {"text": "Summary of policy"}
+    assert seen == [None]  # one upstream call, bounded by its waiters rather than the leader's deadline
+    assert any(e["provider"] == "singleflight" for e in outs[1]["telemetry"])
+
+@pytest.mark.asyncio
+async def test_hedged_and_plain_prompts_are_not_coalesced(monkeypatch):
+    calls = []
+    async def slow_complete(prompt, model, hedge=False):
+        calls.append(hedge)
+        await asyncio.sleep(0.02)
+        return {"text": prompt}
+    monkeypatch.setattr(engine.providers, "complete", slow_complete)
+    sdl = "name: d\nsteps:\n  - id: s\n    type: prompt\n    hedge: {}\n    prompt: 'x'\n"
+    plans = [compile_spec(parse_sdl(sdl.format(h))) for h in ("true", "false")]
+    await asyncio.gather(*(engine.run_plan(p, {}) for p in plans))
+    assert sorted(calls) == [False, True]
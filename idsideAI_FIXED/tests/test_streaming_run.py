@@ -0,0 +1,65 @@
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from idsideai.routers import decision_models
+from idsideai.services import engine
+from idsideai.services.providers.registry import ProviderBusy
+
+app = FastAPI()
+app.include_router(decision_models.router)
+client = TestClient(app)
+
+SDL = """name: demo
+steps:
+  - id: s1
+    type: prompt
+    model: fake:echo
+    prompt: "Echo: {text}"
+    next: s2
+  - id: s2
+    type: decision
+"""
+
+def test_run_streams_ndjson_tokens_then_steps():
+    r = client.post("/decision-models/run", json={"sdl_text": SDL, "inputs": {"text": "hello world"}},
+                    headers={"Accept": "application/x-ndjson"})
+    events = [json.loads(line) for line in r.text.splitlines()]
+    kinds = [e["event"] for e in events]
+    assert kinds[0] == "token" and kinds[-1] == "done"
+    assert kinds.index("step") > kinds.index("token")
+    tokens = "".join(e["delta"] for e in events if e["event"] == "token")
+    step = next(e for e in events if e["event"] == "step" and e["id"] == "s1")
+    assert tokens == step["result"]["text"] == "[FAKE_PROVIDER ECHO]\nEcho: hello world"
+    assert set(events[-1]["timings"]) == {"s1", "s2"}
+
+def test_run_streams_sse_errors():
+    r = client.post("/decision-models/run", json={"sdl_text": SDL, "inputs": {}},
+                    headers={"Accept": "text/event-stream"})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.text.startswith("event: error\ndata: ")
+    assert json.loads(r.text.split("data: ", 1)[1])["status"] == 422
+
+def test_run_without_stream_accept_is_plain_json():
+    r = client.post("/decision-models/run", json={"sdl_text": SDL, "inputs": {"text": "x"}})
+    assert [t["id"] for t in r.json()["trace"]] == ["s1", "s2"]
+
+def test_streamed_run_is_audited(monkeypatch):
+    submitted = []
+    class Log:
+        async def submit(self, *record):
+            submitted.append(record)
+            return True
+    monkeypatch.setattr(decision_models, "execution_log", Log())
+    r = client.post("/decision-models/run", json={"sdl_text": SDL, "inputs": {"text": "hi"}},
+                    headers={"Accept": "application/x-ndjson"})
+    assert r.text.splitlines()[-1].startswith('{"event": "done"')
+    (model_id, inputs, output, telemetry), = submitted
+    assert model_id is None and inputs == {"text": "hi"}
+    assert [t["id"] for t in output["trace"]] == ["s1", "s2"] and set(telemetry["timings"]) == {"s1", "s2"}
+
+def test_busy_provider_is_a_503(monkeypatch):
+    async def busy(*args, **kwargs):
+        raise ProviderBusy("openai: concurrency limit reached")
+    monkeypatch.setattr(engine.providers, "complete", busy)
+    r = client.post("/decision-models/run", json={"sdl_text": SDL.replace("fake:echo", "gpt-4o"), "inputs": {"text": "x"}})
+    assert r.status_code == 503 and "concurrency limit" in r.json()["detail"]
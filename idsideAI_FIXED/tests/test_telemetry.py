@@ -0,0 +1,76 @@
+import random
+from idsideai.services.telemetry import Telemetry, QuantileSketch
+
+def test_ring_buffer_is_bounded(monkeypatch):
+    monkeypatch.setattr(Telemetry, "capacity", 4)
+    Telemetry.reset()
+    for i in range(10):
+        Telemetry.log("p", {"i": i})
+    assert [e["i"] for e in Telemetry.dump()] == [6, 7, 8, 9]
+    cursor = Telemetry.cursor()
+    Telemetry.log("p", {"i": 10})
+    assert [e["i"] for e in Telemetry.since(cursor)] == [10]
+    assert [e["i"] for e in Telemetry.recent(2)] == [9, 10]
+    Telemetry.reset(); Telemetry.log("p", {"i": 0})
+    assert [e["i"] for e in Telemetry.recent(3)] == [0]  # fewer events than asked for
+    monkeypatch.undo(); Telemetry.reset()
+
+def test_aggregates_quantiles():
+    Telemetry.reset()
+    for ms in range(1, 101):
+        Telemetry.log("openai", {"latency_ms": float(ms), "model": "gpt"})
+    agg = Telemetry.aggregates()["openai"]
+    assert agg["count"] == 100 and "model" not in agg
+    lat = agg["latency_ms"]
+    assert lat["count"] == 100 and lat["sum"] == 5050
+    assert abs(lat["p50"] - 50) / 50 < 0.03 and abs(lat["p99"] - 99) / 99 < 0.03
+    Telemetry.reset()
+
+def test_aggregates_expire_after_idle_windows(monkeypatch):
+    from idsideai.services import telemetry
+    now = [1000.0]
+    monkeypatch.setattr(telemetry.time, "monotonic", lambda: now[0])
+    Telemetry.reset()
+    Telemetry.log("openai", {"latency_ms": 5.0})
+    now[0] += Telemetry.window_s * 1.5  # previous window: still reported
+    assert Telemetry.aggregates()["openai"]["count"] == 1
+    now[0] += Telemetry.window_s  # no logs since: everything is older than two windows
+    assert Telemetry.aggregates() == {}
+    Telemetry.log("openai", {"latency_ms": 7.0})
+    assert Telemetry.aggregates()["openai"]["latency_ms"]["count"] == 1
+    monkeypatch.undo(); Telemetry.reset()
+
+def test_sketch_relative_error():
+    values = [random.lognormvariate(3, 1) for _ in range(5000)]
+    sketch = QuantileSketch()
+    for v in values:
+        sketch.add(v)
+    exact = sorted(values)[int(0.95 * 4999)]
+    assert abs(sketch.quantile(0.95) - exact) / exact < 0.05
+
+import asyncio
+import pytest
+from idsideai.services.dsl import parse_sdl
+from idsideai.services.engine import run_model
+
+SDL = """name: demo
+steps:
+  - id: s1
+    type: prompt
+    model: fake:echo
+    prompt: "Echo: {text}"
+    next: s2
+  - id: s2
+    type: tool
+    model: lookup
+"""
+
+@pytest.mark.asyncio
+async def test_concurrent_runs_only_see_their_own_events():
+    spec = parse_sdl(SDL)
+    Telemetry.log("outside", {"latency_ms": 1})
+    outs = await asyncio.gather(*(run_model(spec, {"text": str(i)}) for i in range(5)))
+    for out in outs:
+        assert [(e["provider"], e["step"]) for e in out["telemetry"]] == [("fake", "s1"), ("tool", "s2")]
+        assert out["timings"]["s1"]["provider_ms"] == 5
+        assert out["timings"]["s2"]["wall_ms"] >= 0
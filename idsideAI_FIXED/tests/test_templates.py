@@ -0,0 +1,73 @@
+import pytest
+from idsideai.services import engine
+from idsideai.services.dsl import parse_sdl
+from idsideai.services.plan_cache import compile_spec
+from idsideai.services.templates import PromptTemplate, split_field_name
+
+def test_render_matches_str_format_for_plain_fields():
+    t = PromptTemplate("Hi {name!r:>8} {{literal}} {items[0]}")
+    ctx = {"name": "bob", "items": ["x"], "unused": object()}
+    assert t.render(ctx) == "Hi {name!r:>8} {{literal}} {items[0]}".format(**ctx)
+    assert t.roots == {"name", "items"}
+
+def test_dotted_access_into_step_results():
+    t = PromptTemplate("Improve: {summarise.text} ({summarise.meta.words} words)")
+    assert t.render({"summarise": {"text": "short", "meta": {"words": 1}}}) == "Improve: short (1 words)"
+    with pytest.raises(KeyError):
+        t.render({"summarise": {"text": "short"}})
+
+@pytest.mark.parametrize("field,expected", [
+    ("a", ("a", ())),
+    ("a.b[0].c", ("a", ((True, "b"), (False, 0), (True, "c")))),
+    ("a[x:y][01]", ("a", ((False, "x:y"), (False, 1)))),
+    ("a[-1]", ("a", ((False, "-1"),))),
+])
+def test_split_field_name_matches_str_format(field, expected):
+    assert split_field_name(field) == expected
+
+@pytest.mark.parametrize("field", ["a.", "a..b", "a[]", "a[0", "a[0]x"])
+def test_split_field_name_rejects_what_str_format_rejects(field):
+    with pytest.raises(ValueError):
+        ("{" + field + "}").format(a={0: 1, "b": 1})
+    with pytest.raises(ValueError):
+        split_field_name(field)
+
+def test_positional_placeholders_rejected():
+    with pytest.raises(ValueError):
+        PromptTemplate("{} and {0}")
+
+SDL = """name: chain
+steps:
+  - id: summarise
+    type: prompt
+    model: fake:echo
+    prompt: "Summarise {text} for {audience}"
+    next: improve
+  - id: improve
+    type: prompt
+    model: fake:echo
+    prompt: "Improve: {summarise.text}"
+"""
+
+def test_required_inputs_exclude_step_ids():
+    assert compile_spec(parse_sdl(SDL)).required_inputs == {"text", "audience"}
+
+@pytest.mark.asyncio
+async def test_missing_input_fails_before_any_step(monkeypatch):
+    calls = []
+    async def fake_execute(step, context):
+        calls.append(step.id)
+        return {}
+    monkeypatch.setattr(engine, "execute_step", fake_execute)
+    with pytest.raises(KeyError, match="audience"):
+        await engine.run_plan(compile_spec(parse_sdl(SDL)), {"text": "t"})
+    assert calls == []
+
+@pytest.mark.asyncio
+async def test_dotted_step_reference_end_to_end():
+    out = await engine.run_plan(compile_spec(parse_sdl(SDL)), {"text": "t", "audience": "a"})
+    assert out["trace"][1]["result"]["text"].endswith("Improve: [FAKE_PROVIDER ECHO]\nSummarise t for a")
+
+def test_template_roots_become_dag_dependencies():
+    sdl = SDL.replace("    next: improve\n", "") + "  - id: other\n    type: tool\n    depends_on: [summarise]\n"
+    assert compile_spec(parse_sdl(sdl)).deps == {"summarise": set(), "improve": {"summarise"}, "other": {"summarise"}}
@@ -0,0 +1,68 @@
+import uuid
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from idsideai import tracing
+from idsideai.routers import decision_models
+
+pytest.importorskip("opentelemetry.sdk")
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+app = FastAPI()
+app.include_router(decision_models.router)
+app.add_middleware(tracing.TracingMiddleware)
+client = TestClient(app)
+
+def sdl(prompt="Echo: {text}"):
+    return f"""name: trace-{uuid.uuid4().hex}
+steps:
+  - id: s1
+    type: prompt
+    model: fake:echo
+    prompt: "{prompt}"
+"""
+
+@pytest.fixture
+def exporter():
+    exp = InMemorySpanExporter()
+    yield exp
+    tracing.shutdown()
+
+def spans(exporter):
+    tracing.force_flush()
+    return {s.name: s for s in exporter.get_finished_spans()}
+
+def test_disabled_tracing_is_a_shared_noop():
+    assert not tracing.enabled()
+    assert tracing.span("a") is tracing.span("b")
+
+def test_request_run_step_and_provider_spans_nest(exporter):
+    tracing.configure(exporter, ratio=1.0, slow_ms=0)
+    parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    r = client.post("/decision-models/run", json={"sdl_text": sdl(), "inputs": {"text": "hi"}}, headers={"traceparent": parent})
+    assert r.status_code == 200
+    by_name = spans(exporter)
+    server = by_name["POST /decision-models/run"]
+    assert server.attributes["http.response.status_code"] == 200
+    assert format(server.context.trace_id, "032x") == "0af7651916cd43dd8448eb211c80319c"
+    assert by_name["decision.run"].parent.span_id == server.context.span_id
+    assert by_name["decision.step"].parent.span_id == by_name["decision.run"].context.span_id
+    assert by_name["provider.complete"].attributes["provider"] == "fake"
+    assert by_name["sdl.parse"].parent.span_id == by_name["sdl.compile"].context.span_id
+    assert len({s.context.trace_id for s in by_name.values()}) == 1
+
+def test_head_sampling_drops_fast_traces_and_tail_keeps_failures(exporter):
+    tracing.configure(exporter, ratio=0.0, slow_ms=60_000)
+    assert client.post("/decision-models/run", json={"sdl_text": sdl(), "inputs": {"text": "hi"}}).status_code == 200
+    assert spans(exporter) == {}
+    r = client.post("/decision-models/run", json={"sdl_text": sdl("{x.attr}"), "inputs": {"x": 5}})
+    assert r.status_code == 500
+    kept = spans(exporter)
+    assert {"POST /decision-models/run", "decision.run", "decision.step"} <= set(kept)
+    assert all(s.context.trace_flags.sampled for s in kept.values())
+
+def test_unsampled_parent_is_respected(exporter):
+    tracing.configure(exporter, ratio=1.0, slow_ms=0)
+    parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00"
+    client.post("/decision-models/run", json={"sdl_text": sdl(), "inputs": {"text": "hi"}}, headers={"traceparent": parent})
+    assert spans(exporter) == {}